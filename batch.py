@@ -0,0 +1,344 @@
+# batch.py - пакетная обработка многих тендерных файлов одним пулом браузеров
+#
+# Файлы читаются по очереди в одном прогоне ScrapeEngine: браузеры и авторизация
+# запускаются один раз на весь пакет, одинаковый товар из разных тендеров (и повторы
+# внутри тендера) парсится один раз, а выгрузка тендера пишется отдельным потоком,
+# как только готовы все его товары - не дожидаясь остальных файлов пакета.
+
+import os
+import glob
+import time
+import queue
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import run_context
+from run_context import RunContext
+from results import ProductResult, ResultStore
+
+logger = logging.getLogger(__name__)
+
+TENDER_EXTENSIONS = ('.xlsx', '.xlsm')
+# Суффикс выгрузки: <тендер>_results.xlsx (такие файлы при поиске тендеров пропускаются)
+OUTPUT_SUFFIX = "_results"
+
+
+def find_tender_files(*patterns: str) -> List[str]:
+    """Файлы тендеров по каталогам и шаблонам glob; выгрузки и временные файлы Excel пропускаются"""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        for path in candidates:
+            name = os.path.basename(path)
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in TENDER_EXTENSIONS or name.startswith("~$") or stem.endswith(OUTPUT_SUFFIX):
+                continue
+            if os.path.isfile(path):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_path_for(input_file: str, output_dir: str) -> str:
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir, f"{stem}{OUTPUT_SUFFIX}.xlsx")
+
+
+def product_key(name: str) -> str:
+    """Ключ дедупликации товаров: регистр и пробелы не различаются"""
+    return " ".join(name.split()).casefold()
+
+
+class TenderJob:
+    """Тендер пакета: его результаты и число товаров, ещё ждущих парсинга"""
+
+    def __init__(self, input_file: str, output_file: str):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.name = os.path.basename(input_file)
+        self.results = ResultStore()
+        # Отдельный контекст - чтобы экстренный снимок при сигнале сохранил и этот тендер
+        self.context = RunContext(input_file, output_file, name=self.name)
+        self.context.results = self.results
+        self.tender_id: Optional[int] = None
+        self.waiting = 0
+        self.read_done = False
+        self.queued = False
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def summary(self) -> dict:
+        return {
+            'input_file': self.input_file,
+            'output_file': self.output_file if self.finished and not self.error else None,
+            'items': len(self.results),
+            'priced': self.results.priced_count(),
+            'reused': len(self.results.reused()),
+            'tender_id': self.tender_id,
+            'duration_s': round((self.finished or time.time()) - self.started, 1),
+            'error': self.error,
+        }
+
+
+class TenderBatch:
+    """Раздаёт товары пакета движку и собирает результаты обратно по тендерам.
+
+    items(files) - генератор (уникальный индекс, название) для ScrapeEngine.run,
+    on_result - его обратный вызов. Готовые тендеры пишет поток "tender-writer".
+    db - PriceDB (история и выгрузка из неё), refresh_older_than - режим обновления.
+    """
+
+    def __init__(self, output_dir: str, db=None, refresh_older_than: Optional[float] = None):
+        self.output_dir = output_dir
+        self.db = db
+        self.refresh_older_than = refresh_older_than
+        self.jobs: List[TenderJob] = []
+        self.scraped = 0
+        self.reused = 0
+        self.duplicates = 0
+        self._unique: Dict[str, int] = {}
+        # уникальный индекс -> (результат, время цены из истории или 0, id строки истории)
+        self._done: Dict[int, Tuple[ProductResult, float, Optional[int]]] = {}
+        self._waiters: Dict[int, List[Tuple[TenderJob, int]]] = {}
+        self._lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="tender-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def unique_count(self) -> int:
+        return len(self._unique)
+
+    # --- товары и результаты ---
+
+    def items(self, files: Iterable[str]):
+        """Товары всех файлов по мере чтения; повторы и свежие цены из истории не выдаются"""
+        for path in files:
+            if run_context.current().stopped:
+                return
+            job = TenderJob(path, output_path_for(path, self.output_dir))
+            with self._lock:
+                self.jobs.append(job)
+            if self.db is not None:
+                job.tender_id = self.db.start_tender(path, job.output_file)
+            logger.info(f"📂 {job.name}: чтение")
+
+            try:
+                for item in self._read(path):
+                    name = item['name']
+                    with self._lock:
+                        position = job.results.add(name)
+                        key = product_key(name)
+                        uidx = self._unique.get(key)
+                        new = uidx is None
+                        if new:
+                            uidx = self._unique[key] = len(self._unique)
+                            self._lookup(uidx, name)
+                        else:
+                            self.duplicates += 1
+                        if uidx in self._done:
+                            self._fill(job, position, *self._done[uidx])
+                            new = False
+                        else:
+                            self._waiters.setdefault(uidx, []).append((job, position))
+                            job.waiting += 1
+                    if new:
+                        yield uidx, name
+            except Exception as e:
+                job.error = str(e)
+                logger.error(f"❌ {job.name}: {e}")
+
+            with self._lock:
+                job.read_done = True
+                if self.db is not None:
+                    self.db.add_items(job.tender_id, job.results.names)
+                logger.info(f"📦 {job.name}: прочитано {len(job.results)} товаров, ждут парсинга {job.waiting}")
+                self._check(job)
+
+    @staticmethod
+    def _read(path: str):
+        from utils import iter_products_from_excel
+        return iter_products_from_excel(path)
+
+    def _lookup(self, uidx: int, name: str):
+        """Режим обновления: свежая цена товара из истории считается готовым результатом (под self._lock)"""
+        if self.refresh_older_than is None or self.db is None:
+            return
+        cached = self.db.reusable(name, self.refresh_older_than)
+        if cached is not None:
+            price_id, result, scraped_at = cached
+            self._done[uidx] = (result, scraped_at, price_id)
+            self.reused += 1
+
+    def on_result(self, uidx: int, result: ProductResult):
+        with self._lock:
+            self._done[uidx] = (result, 0.0, None)
+            self.scraped += 1
+            for job, position in self._waiters.pop(uidx, []):
+                self._fill(job, position, result, 0.0, None)
+                job.waiting -= 1
+                self._check(job)
+
+    def _fill(self, job: TenderJob, position: int, result: ProductResult,
+              cached_at: float, price_id: Optional[int]):
+        """Результат в позицию тендера и в историю (под self._lock)"""
+        job.results.set(position, result, cached_at)
+        if self.db is None:
+            return
+        try:
+            if cached_at:
+                self.db.reuse(job.tender_id, position, job.results.names[position], price_id)
+            else:
+                self.db.record(job.tender_id, position, job.results.names[position], result)
+        except Exception as e:
+            logger.warning(f"Ошибка записи в историю цен: {e}")
+
+    def _check(self, job: TenderJob):
+        """Тендер прочитан и все его товары готовы - в очередь на запись (под self._lock)"""
+        if job.read_done and job.waiting == 0 and not job.queued:
+            job.queued = True
+            self._writes.put(job)
+
+    # --- выгрузка ---
+
+    def flush(self):
+        """Остановка или ошибка прогона: недописанные тендеры сохраняются с тем, что успели получить"""
+        with self._lock:
+            for job in self.jobs:
+                if not job.queued:
+                    if not job.read_done and self.db is not None:
+                        self.db.add_items(job.tender_id, job.results.names)  # файл прочитан не до конца
+                    job.queued = True
+                    self._writes.put(job)
+
+    def close(self):
+        """Ждёт записи всех тендеров из очереди"""
+        self._writes.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        while True:
+            job = self._writes.get()
+            if job is None:
+                return
+            self._write(job)
+
+    def _write(self, job: TenderJob):
+        try:
+            if job.error:
+                return
+            if not len(job.results):
+                job.error = "Не найдены товары в файле"
+                logger.warning(f"⚠️ {job.name}: товары не найдены")
+                return
+            if self.db is not None:
+                self.db.finish_tender(job.tender_id, len(job.results))
+                self.db.export_tender(job.tender_id, job.output_file)
+            else:
+                from utils import save_results_into_tender_format
+                if not save_results_into_tender_format(job.input_file, job.output_file, job.results.to_dataframe()):
+                    raise RuntimeError(f"не удалось записать {job.output_file}")
+            job.finished = time.time()
+            partial = f", не готово {job.waiting}" if job.waiting else ""
+            logger.info(f"✅ {job.name}: {len(job.results)} товаров (из истории {len(job.results.reused())}{partial}) "
+                        f"за {job.finished - job.started:.0f} с → {job.output_file}")
+        except Exception as e:
+            job.error = str(e)
+            logger.error(f"❌ {job.name}: ошибка выгрузки: {e}")
+        finally:
+            job.finished = job.finished or time.time()
+            job.context.results = None
+
+
+def parse_tender_batch(files: List[str], output_dir: str, headless: bool = True,
+                       workers: int = 1, driver_path: Optional[str] = None,
+                       use_business_auth: bool = False, recycle_policy=None,
+                       item_budget: float = 90.0, db_path: Optional[str] = None,
+                       refresh_older_than: Optional[float] = None,
+                       timings_file: Optional[str] = None, trace_webdriver: bool = False,
+                       context: Optional[RunContext] = None) -> dict:
+    """Парсит пакет тендеров одним движком; выгрузки - <output_dir>/<тендер>_results.xlsx.
+
+    Возвращает сводку: по тендерам (список summary()) и по пакету (уникальных товаров,
+    повторов, взято из истории, статистика движка). timings_file и trace_webdriver -
+    как в parse_tender_excel, сводки замеров и команд - в stage_timings/webdriver_calls.
+    """
+    import timing
+    import driver_tracer
+    from scrape_engine import ScrapeEngine
+    from tender_parser import setup_signal_handlers, prepare_browsers, cleanup_profiles
+
+    if refresh_older_than is not None and not db_path:
+        raise ValueError("Режим обновления работает только с базой истории цен (db_path)")
+
+    own_timer = timings_file is not None and timing.TIMER is None
+    if own_timer:
+        timing.enable_timing(timings_file)
+        logger.info(f"⏱️ Замеры этапов включены: {timings_file}")
+    own_tracer = trace_webdriver and driver_tracer.TRACER is None
+    if own_tracer:
+        driver_tracer.enable_tracing()
+        logger.info("🔌 Трассировка команд WebDriver включена")
+
+    try:
+        setup_signal_handlers()
+        os.makedirs(output_dir, exist_ok=True)
+        context = context or RunContext(name="batch")
+
+        db = None
+        if db_path:
+            from price_db import PriceDB
+            db = PriceDB(db_path)
+
+        engine = ScrapeEngine(headless=headless, driver_path=driver_path, use_auth=use_business_auth,
+                              workers=workers, policy=recycle_policy, item_budget=item_budget,
+                              context=context)
+        engine.prestart(prepare=prepare_browsers)
+        logger.info(f"📚 Пакет: {len(files)} файлов → {output_dir}")
+
+        batch = TenderBatch(output_dir, db=db, refresh_older_than=refresh_older_than)
+        started = time.time()
+        try:
+            run_stats = engine.run(batch.items(files), batch.on_result)
+            if context.stopped:
+                logger.info("Пакет остановлен, сохраняю готовое")
+        finally:
+            # И при остановке, и при ошибке движка недописанные тендеры сохраняются с тем, что есть
+            batch.flush()
+            batch.close()
+            cleanup_profiles(context)
+            if db is not None:
+                db.close()
+
+        tenders = [job.summary() for job in batch.jobs]
+        summary = {
+            'tenders': tenders,
+            'files': len(files),
+            'written': sum(1 for t in tenders if t['output_file']),
+            'unique_items': batch.unique_count,
+            'duplicates': batch.duplicates,
+            'scraped': batch.scraped,
+            'reused': batch.reused,
+            'duration_s': round(time.time() - started, 1),
+            'run_stats': run_stats,
+        }
+        logger.info(f"📚 Пакет готов: тендеров {summary['written']}/{len(files)}, уникальных товаров "
+                    f"{summary['unique_items']} (повторов {batch.duplicates}, из истории {batch.reused}), "
+                    f"за {summary['duration_s']} с")
+
+        if driver_tracer.TRACER is not None:
+            driver_tracer.TRACER.log_report()
+            summary['webdriver_calls'] = driver_tracer.TRACER.summary()
+        if timing.TIMER is not None:
+            timing.TIMER.log_summary()
+            summary['stage_timings'] = timing.TIMER.summary()
+        return summary
+    finally:
+        if own_tracer:
+            driver_tracer.disable_tracing()
+        if own_timer:
+            timing.disable_timing()
@@ -0,0 +1,139 @@
+# bench_e2e.py - сквозной бенчмарк parse_tender_excel против локального стенда маркета
+#
+# Пример (Linux, без сети):
+#   python bench/bench_e2e.py --items 30 --workers 2 --driver-path /usr/bin/msedgedriver
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from market_server import MarketConfig, start_server
+from synthetic_tender import make_tender
+
+
+class MemorySampler:
+    """Фоновый замер RSS процесса и всех дочерних (msedgedriver, браузеры), МБ"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.last_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="memory-sampler", daemon=True)
+
+    def sample(self) -> float:
+        import psutil
+        root = psutil.Process()
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return total / (1024 * 1024)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.last_mb = self.sample()
+            self.peak_mb = max(self.peak_mb, self.last_mb)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        return False
+
+
+def run_benchmark(items: int, workers: int, driver_path: str, headless: bool = True,
+                  latency: float = 0.2, jitter: float = 0.1, captcha_rate: float = 0.0,
+                  item_budget: float = 90.0, workdir: str = None) -> dict:
+    """Прогоняет синтетический тендер через стенд; возвращает метрики"""
+    import tender_parser
+    from results import is_priced
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_e2e_")
+    input_file = make_tender(os.path.join(workdir, "tender.xlsx"), items=items)
+    output_file = os.path.join(workdir, "result.xlsx")
+    timings_file = os.path.join(workdir, "timings.jsonl")
+
+    config = MarketConfig(latency=latency, jitter=jitter, captcha_rate=captcha_rate)
+    server, base_url = start_server(config=config)
+    tender_parser.set_market_url(base_url)
+
+    try:
+        with MemorySampler() as memory:
+            started = time.time()
+            df = tender_parser.parse_tender_excel(input_file, output_file, headless=headless,
+                                                  workers=workers, driver_path=driver_path,
+                                                  auto_save=False, item_budget=item_budget,
+                                                  timings_file=timings_file)
+            duration = time.time() - started
+    finally:
+        server.shutdown()
+
+    stages = df.attrs.get('stage_timings', {})
+    run_stats = df.attrs.get('run_stats', {})
+    done = sum(1 for p in df['цена'] if is_priced(p))
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'items': len(df),
+        'priced': done,
+        'workers': workers,
+        'latency': latency,
+        'jitter': jitter,
+        'captcha_rate': captcha_rate,
+        'captchas_served': config.captchas,
+        'duration_s': round(duration, 2),
+        'items_per_min': round(len(df) / duration * 60, 2) if duration else 0,
+        'item_p50_s': stages.get('item', {}).get('p50', 0),
+        'item_p95_s': stages.get('item', {}).get('p95', 0),
+        'memory_peak_mb': round(memory.peak_mb, 1),
+        'memory_last_mb': round(memory.last_mb, 1),
+        'run_stats': run_stats,
+        'stages': stages,
+        'workdir': workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк парсера на локальном стенде")
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--driver-path", default=os.environ.get("EDGE_DRIVER_PATH"),
+                        help="Путь к msedgedriver (на Linux - без .exe)")
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--item-budget", type=float, default=90.0)
+    parser.add_argument("--out", default=None, help="JSON с результатом (по умолчанию bench_e2e_<время>.json)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.items, args.workers, args.driver_path, headless=not args.no_headless,
+                           latency=args.latency, jitter=args.jitter, captcha_rate=args.captcha_rate,
+                           item_budget=args.item_budget)
+
+    out = args.out or f"bench_e2e_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"\n📊 Товаров: {result['items']} (с ценой: {result['priced']}), потоков: {result['workers']}")
+    print(f"⚡ {result['items_per_min']} товаров/мин, p95 товара {result['item_p95_s']} с")
+    print(f"🧠 Память: пик {result['memory_peak_mb']} МБ, в конце {result['memory_last_mb']} МБ")
+    print(f"💾 {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# bench_engine.py - накладные расходы оркестрации на фейковом драйвере (без браузера и сети)
+#
+# Драйвер отвечает мгновенно, паузы между действиями отключены - остаётся только
+# стоимость самого парсера: чтение Excel, очередь, сессии, логи, автосохранения, запись.
+#
+#   python bench/bench_engine.py --items 10000 --workers 4
+#   python bench/bench_engine.py --items 2000 --target gui
+
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import tempfile
+import importlib
+import threading
+from collections import Counter
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from fake_driver import FakeMarket
+from synthetic_tender import make_tender
+
+
+class _Var:
+    """Замена tk.Variable для запуска parse_worker без окна"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def _prepare(items: int, workdir: str = None, latency: float = 0.0, captcha_rate: float = 0.0):
+    import tender_parser
+    import waits
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_engine_")
+    started = time.time()
+    input_file = make_tender(os.path.join(workdir, "tender.xlsx"), items=items)
+    generated = time.time() - started
+
+    market = FakeMarket(latency=latency, captcha_rate=captcha_rate)
+    tender_parser.set_driver_factory(market.factory)
+    waits.set_pause_scale(0)
+    return workdir, input_file, market, generated
+
+
+def _restore():
+    import tender_parser
+    import waits
+
+    tender_parser.set_driver_factory(None)
+    waits.set_pause_scale(1)
+
+
+def run_engine_benchmark(items: int = 10000, workers: int = 4, latency: float = 0.0,
+                         captcha_rate: float = 0.0, auto_save: bool = False, workdir: str = None,
+                         timings: bool = False) -> dict:
+    """parse_tender_excel целиком на фейковом драйвере"""
+    import tender_parser
+    import timing
+
+    workdir, input_file, market, generated = _prepare(items, workdir, latency, captcha_rate)
+    output_file = os.path.join(workdir, "result.xlsx")
+    if timings:
+        timing.enable_timing(os.path.join(workdir, "timings.jsonl"))
+
+    try:
+        started = time.time()
+        df = tender_parser.parse_tender_excel(input_file, output_file, workers=workers,
+                                              auto_save=auto_save, item_budget=3600.0)
+        duration = time.time() - started
+    finally:
+        if timings:
+            stages = timing.TIMER.summary()
+            timing.disable_timing()
+        _restore()
+
+    return {
+        'target': 'engine',
+        'items': len(df),
+        'workers': workers,
+        'auto_save': auto_save,
+        'generate_s': round(generated, 2),
+        'duration_s': round(duration, 2),
+        'items_per_s': round(len(df) / duration, 1) if duration else 0,
+        'overhead_ms_per_item': round(duration / len(df) * 1000, 3) if len(df) else 0,
+        'drivers_created': market.drivers,
+        'webdriver_commands': market.commands,
+        'captchas_served': market.captchas,
+        'run_stats': df.attrs.get('run_stats', {}),
+        'stages': stages if timings else {},
+        'workdir': workdir,
+    }
+
+
+def run_gui_benchmark(items: int = 2000, workers: int = 4, latency: float = 0.0, captcha_rate: float = 0.0,
+                      auto_save: bool = False, workdir: str = None) -> dict:
+    """ParserGUI.parse_worker без окна: очередь сообщений разбирается отдельным потоком"""
+    import types
+    from gui_parser import ParserGUI
+
+    workdir, input_file, market, generated = _prepare(items, workdir, latency, captcha_rate)
+    worker = types.SimpleNamespace(
+        queue=queue.Queue(),
+        is_parsing=True,
+        input_file=_Var(input_file),
+        headless_mode=_Var(True),
+        driver_path=_Var(""),
+        auto_save_enabled=_Var(auto_save),
+        workers_count=_Var(workers),
+        has_cookies=False,
+        engine=None,
+        run_context=None,
+        db_path=None,
+    )
+
+    messages = Counter()
+    finished = threading.Event()
+
+    def drain():
+        while True:
+            message = worker.queue.get()
+            messages[message[0]] += 1
+            if message[0] == "parsing_finished":
+                finished.set()
+                return
+
+    consumer = threading.Thread(target=drain, name="gui-queue-drain", daemon=True)
+    consumer.start()
+    try:
+        started = time.time()
+        ParserGUI.parse_worker(worker)
+        finished.wait()
+        duration = time.time() - started
+    finally:
+        _restore()
+
+    return {
+        'target': 'gui',
+        'items': items,
+        'workers': workers,
+        'auto_save': auto_save,
+        'generate_s': round(generated, 2),
+        'duration_s': round(duration, 2),
+        'items_per_s': round(items / duration, 1) if duration else 0,
+        'overhead_ms_per_item': round(duration / items * 1000, 3) if items else 0,
+        'drivers_created': market.drivers,
+        'webdriver_commands': market.commands,
+        'queue_messages': dict(messages),
+        'queue_messages_per_item': round(sum(messages.values()) / items, 2) if items else 0,
+        'workdir': workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Накладные расходы оркестрации на фейковом драйвере")
+    parser.add_argument("--target", choices=["engine", "gui", "both"], default="engine")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка каждой команды драйвера, сек")
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--auto-save", action="store_true", help="Автосохранение каждые 3 товара, как в боевом режиме")
+    parser.add_argument("--timings", action="store_true", help="Замеры этапов (добавляют свои накладные расходы)")
+    parser.add_argument("--log-level", default="WARNING", help="Уровень лога парсера на время прогона")
+    parser.add_argument("--out", default=None, help="JSON с результатом (по умолчанию bench_engine_<время>.json)")
+    args = parser.parse_args()
+
+    # Импорт ради побочного эффекта: tender_parser настраивает корневой логгер, уровень меняем после
+    importlib.import_module("tender_parser")
+    logging.getLogger().setLevel(args.log_level)
+
+    results = []
+    if args.target in ("engine", "both"):
+        results.append(run_engine_benchmark(args.items, args.workers, latency=args.latency,
+                                            captcha_rate=args.captcha_rate, auto_save=args.auto_save,
+                                            timings=args.timings))
+    if args.target in ("gui", "both"):
+        results.append(run_gui_benchmark(args.items, args.workers, latency=args.latency, captcha_rate=args.captcha_rate,
+                                         auto_save=args.auto_save))
+
+    out = args.out or f"bench_engine_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'time': datetime.now().isoformat(timespec='seconds'), 'log_level': args.log_level,
+                   'results': results}, f, ensure_ascii=False, indent=2)
+
+    for result in results:
+        print(f"\n📊 {result['target']}: {result['items']} товаров за {result['duration_s']} с "
+              f"({result['items_per_s']} товаров/с, {result['overhead_ms_per_item']} мс на товар)")
+        print(f"🔌 Команд драйвера: {result['webdriver_commands']}, драйверов создано: {result['drivers_created']}")
+        if 'queue_messages_per_item' in result:
+            print(f"📨 Сообщений в очередь GUI на товар: {result['queue_messages_per_item']}")
+    print(f"💾 {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_startup.py - бюджет времени импорта точек входа (python -X importtime)
+#
+# Для main и gui_parser замеряется время импорта в чистом процессе (медиана из --runs)
+# и проверяется, что при импорте не подгружаются тяжёлые модули - они должны
+# загружаться лениво, в момент первого использования.
+#
+#   python bench/bench_startup.py --check
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Точка входа -> бюджет импорта, мс
+BUDGETS_MS = {"main": 150.0, "gui_parser": 250.0}
+# Модули, которых не должно быть в sys.modules сразу после импорта точки входа
+HEAVY_MODULES = ("pandas", "numpy", "selenium", "openpyxl", "tender_parser", "scrape_engine", "utils")
+
+
+def parse_importtime(stderr: str, module: str):
+    """(накопленное время модуля, мкс; собственное время по модулям, мкс)"""
+    total = 0
+    own = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # строка заголовка
+        name = parts[2].strip()
+        own[name] += self_us
+        if parts[2].rstrip() == f" {module}":
+            total = cumulative_us
+    return total, own
+
+
+def measure_entry(module: str, runs: int = 5) -> dict:
+    """Медиана времени импорта module в новом процессе и список подгруженных тяжёлых модулей"""
+    totals = []
+    own = Counter()
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'module': module, 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr else "?"}
+        total, run_own = parse_importtime(proc.stderr, module)
+        totals.append(total)
+        own.update(run_own)
+
+    check = (f"import sys, json, {module}; "
+             f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))")
+    proc = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1]) if proc.returncode == 0 and proc.stdout.strip() else []
+
+    return {
+        'module': module,
+        'median_ms': round(statistics.median(totals) / 1000, 1),
+        'min_ms': round(min(totals) / 1000, 1),
+        'heavy_loaded': loaded,
+        'top_self_ms': [{'module': name, 'ms': round(us / runs / 1000, 2)} for name, us in own.most_common(10)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бюджет времени импорта точек входа")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-main", type=float, default=BUDGETS_MS["main"], help="Бюджет main, мс")
+    parser.add_argument("--budget-gui", type=float, default=BUDGETS_MS["gui_parser"], help="Бюджет gui_parser, мс")
+    parser.add_argument("--check", action="store_true", help="Код выхода 1 при превышении бюджета")
+    parser.add_argument("--out", default=None, help="JSON с результатом (по умолчанию bench_startup_<время>.json)")
+    args = parser.parse_args()
+
+    budgets = {"main": args.budget_main, "gui_parser": args.budget_gui}
+    results = []
+    failures = []
+    for module, budget in budgets.items():
+        result = measure_entry(module, args.runs)
+        result['budget_ms'] = budget
+        results.append(result)
+
+        if 'error' in result:
+            print(f"⚠️ {module}: импорт не удался ({result['error']}), пропуск")
+            continue
+        over = result['median_ms'] > budget
+        mark = "❌" if over or result['heavy_loaded'] else "✅"
+        print(f"{mark} {module}: {result['median_ms']} мс (бюджет {budget:g} мс)")
+        if result['heavy_loaded']:
+            print(f"   тяжёлые модули при импорте: {', '.join(result['heavy_loaded'])}")
+            failures.append(f"{module}: {', '.join(result['heavy_loaded'])}")
+        if over:
+            failures.append(f"{module}: {result['median_ms']} > {budget:g} мс")
+        for row in result['top_self_ms'][:5]:
+            print(f"   {row['module']:<40} {row['ms']:>7.2f} мс")
+
+    out = args.out or f"bench_startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'time': datetime.now().isoformat(timespec='seconds'), 'python': sys.version.split()[0],
+                   'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"💾 {out}")
+
+    if args.check and failures:
+        print(f"❌ Бюджет запуска превышен: {'; '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# bench_utils.py - микробенчмарки горячих функций чтения и выгрузки тендера
+#
+# Результат пишется в JSON и сравнивается с сохранённым базовым замером
+# (bench/baselines/utils_micro.json), чтобы замедление было видно между версиями.
+#
+#   python bench/bench_utils.py                     # замер + сравнение с базой
+#   python bench/bench_utils.py --check             # код выхода 1 при регрессии
+#   python bench/bench_utils.py --update-baseline   # записать замер как новую базу
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+from contextlib import redirect_stdout
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from synthetic_tender import make_tender, make_results, product_names, price_strings
+
+BASELINE_FILE = os.path.join(HERE, "baselines", "utils_micro.json")
+
+
+def measure(fn, repeat: int, number: int = 1) -> dict:
+    """repeat прогонов по number вызовов; время одного вызова, сек (минимум и медиана)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {'min': min(samples), 'median': statistics.median(samples), 'repeat': repeat, 'number': number}
+
+
+def quiet(fn):
+    """Функции utils печатают в stdout по строке на товар - в замере печать уходит в буфер"""
+    def wrapper():
+        with redirect_stdout(io.StringIO()):
+            return fn()
+    return wrapper
+
+
+def run_suite(rows: int = 5000, blocks: int = 1000, repeat: int = 5, workdir: str = None) -> dict:
+    """Все замеры; для построчных функций время - на весь набор из rows значений"""
+    from utils import (normalize_text, clean_product_name_advanced, parse_price_value,
+                       extract_products_from_excel, save_results_into_tender_format)
+    from results import parse_price_to_number
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_utils_")
+    names = product_names(rows)
+    prices = price_strings(rows)
+    ingest_file = make_tender(os.path.join(workdir, f"tender_{rows}.xlsx"), items=rows)
+    export_file = make_tender(os.path.join(workdir, f"tender_{blocks}.xlsx"), items=blocks)
+    results = make_results(blocks)
+    output_file = os.path.join(workdir, "result.xlsx")
+
+    cases = {
+        f'normalize_text[{rows}]': (lambda: [normalize_text(n) for n in names], repeat, 3),
+        f'clean_product_name_advanced[{rows}]': (lambda: [clean_product_name_advanced(n) for n in names], repeat, 1),
+        f'parse_price_value[{rows}]': (lambda: [parse_price_value(p) for p in prices], repeat, 3),
+        f'parse_price_to_number[{rows}]': (lambda: [parse_price_to_number(p) for p in prices], repeat, 3),
+        f'extract_products_from_excel[{rows}]': (quiet(lambda: extract_products_from_excel(ingest_file)),
+                                                 max(1, repeat // 2), 1),
+        f'save_results_into_tender_format[{blocks}]': (
+            quiet(lambda: save_results_into_tender_format(export_file, output_file, results)),
+            max(1, repeat // 2), 1),
+    }
+
+    measured = {}
+    for name, (fn, case_repeat, number) in cases.items():
+        fn()  # прогрев: компиляция регулярок, импорт движков pandas/openpyxl
+        stat = measure(fn, case_repeat, number)
+        measured[name] = {key: round(value, 6) if isinstance(value, float) else value
+                          for key, value in stat.items()}
+        print(f"  {name:<44} медиана {stat['median'] * 1000:>10.2f} мс   минимум {stat['min'] * 1000:>10.2f} мс")
+
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'rows': rows,
+        'blocks': blocks,
+        'results': measured,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Имена замеров, медиана которых хуже базы больше чем в tolerance раз"""
+    regressions = []
+    for name, stat in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base.get('median'):
+            print(f"  {name:<44} нет в базе")
+            continue
+        ratio = stat['median'] / base['median']
+        mark = "⚠️ РЕГРЕССИЯ" if ratio > tolerance else ("🚀" if ratio < 1 / tolerance else "")
+        print(f"  {name:<44} x{ratio:.2f} к базе {mark}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки функций чтения и выгрузки тендера")
+    parser.add_argument("--rows", type=int, default=5000, help="Товаров в тендере для чтения и построчных функций")
+    parser.add_argument("--blocks", type=int, default=1000, help="Блоков товаров в шаблоне для выгрузки")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Допустимое замедление к базе, раз")
+    parser.add_argument("--check", action="store_true", help="Код выхода 1 при регрессии")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--out", default=None, help="JSON с результатом (по умолчанию bench_utils_<время>.json)")
+    args = parser.parse_args()
+
+    print(f"⏱️ Микробенчмарки: {args.rows} строк, {args.blocks} блоков, {args.repeat} повторов")
+    current = run_suite(args.rows, args.blocks, args.repeat)
+
+    out = args.out or f"bench_utils_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"💾 {out}")
+
+    regressions = []
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"📌 База обновлена: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"📐 Сравнение с базой от {baseline.get('time', '?')} ({baseline.get('machine', '?')}):")
+        regressions = compare(current, baseline, args.tolerance)
+    else:
+        print(f"📐 Базы нет ({args.baseline}) - запустите с --update-baseline")
+
+    if args.check and regressions:
+        print(f"❌ Регрессии: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
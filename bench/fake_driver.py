@@ -0,0 +1,173 @@
+# fake_driver.py - фейковый WebDriver в памяти процесса для замера накладных расходов оркестрации
+#
+# Отвечает мгновенно заготовленными данными на тот набор команд, который использует парсер:
+# get, execute_script, find_element(s), current_url, add_cookie, refresh, quit.
+# Все команды проходят через execute(), поэтому их видит трассировщик driver_tracer.
+#
+#   from fake_driver import FakeMarket
+#   tender_parser.set_driver_factory(FakeMarket().factory)
+
+import time
+import random
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qs, quote
+
+from selenium.webdriver.common.keys import Keys
+
+from market_server import stable_price, format_price
+
+
+class FakeMarket:
+    """Общие для всех фейковых драйверов настройки и счётчики"""
+
+    def __init__(self, latency: float = 0.0, captcha_rate: float = 0.0, snippets: int = 10, seed: int = 42):
+        self.latency = latency
+        self.captcha_rate = captcha_rate
+        self.snippets = snippets
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.drivers = 0
+        self.commands = 0
+        self.captchas = 0
+
+    def factory(self, headless: bool = True, driver_path=None, use_auth: bool = False) -> "FakeDriver":
+        """Совместима с tender_parser.set_driver_factory"""
+        with self.lock:
+            self.drivers += 1
+        return FakeDriver(self)
+
+    def roll_captcha(self) -> bool:
+        if not self.captcha_rate:
+            return False
+        with self.lock:
+            if self.random.random() < self.captcha_rate:
+                self.captchas += 1
+                return True
+        return False
+
+    def products(self, query: str):
+        result = []
+        for i in range(self.snippets):
+            product_id = hashlib.md5(f"{query}|{i}".encode('utf-8')).hexdigest()[:12]
+            result.append({'title': f"{query} вариант {i + 1}", 'product_id': product_id, 'index': i})
+        return result
+
+    @staticmethod
+    def prices(product_id: str):
+        regular = stable_price(product_id)
+        return {
+            'prices': [format_price(regular), format_price(int(regular * 1.07)), format_price(int(regular * 1.2))],
+            'labels': ["с пэй", "без карты", "для юрлиц с ндс"],
+        }
+
+
+class FakeElement:
+    """Поле поиска или строка цены"""
+
+    def __init__(self, driver: "FakeDriver", text: str = ""):
+        self._driver = driver
+        self.text = text
+        self._value = ""
+
+    def is_displayed(self) -> bool:
+        return self._driver.execute('isElementDisplayed')
+
+    def is_enabled(self) -> bool:
+        return self._driver.execute('isElementEnabled')
+
+    def clear(self):
+        self._driver.execute('clearElement')
+        self._value = ""
+
+    def send_keys(self, *values):
+        self._driver.execute('sendKeysToElement')
+        for value in values:
+            if Keys.RETURN in value or Keys.ENTER in value:
+                self._driver._navigate(f"{self._driver._origin()}/search?text={quote(self._value)}")
+            else:
+                self._value += value
+
+
+class FakeDriver:
+    """Подмножество API selenium.webdriver.Edge, используемое парсером"""
+
+    def __init__(self, market: FakeMarket):
+        self.market = market
+        self.current_url = "about:blank"
+        self.title = ""
+        self.cookies = []
+        self.closed = False
+
+    # Все команды идут через execute - как у настоящего драйвера (для трассировщика)
+    def execute(self, driver_command, params=None):
+        with self.market.lock:
+            self.market.commands += 1
+        if self.market.latency:
+            time.sleep(self.market.latency)
+        return True
+
+    def _origin(self) -> str:
+        url = urlparse(self.current_url)
+        return f"{url.scheme}://{url.netloc}" if url.netloc else "https://market.yandex.ru"
+
+    def _navigate(self, url: str):
+        path = urlparse(url).path
+        if (path == '/search' or path.startswith('/product/')) and self.market.roll_captcha():
+            url = f"{urlparse(url).scheme}://{urlparse(url).netloc}/showcaptcha?retpath={quote(path)}"
+        self.current_url = url
+        self.title = "Ой!" if 'showcaptcha' in url else "Маркет"
+
+    def get(self, url: str):
+        self.execute('get', {'url': url})
+        self._navigate(url)
+
+    def refresh(self):
+        self.execute('refresh')
+
+    def add_cookie(self, cookie: dict):
+        self.execute('addCookie', {'cookie': cookie})
+        self.cookies.append(cookie)
+
+    def set_page_load_timeout(self, seconds):
+        self.execute('setTimeouts', {'pageLoad': int(seconds * 1000)})
+
+    def implicitly_wait(self, seconds):
+        self.execute('setTimeouts', {'implicit': int(seconds * 1000)})
+
+    def quit(self):
+        self.execute('quit')
+        self.closed = True
+
+    def find_element(self, by=None, value=None) -> FakeElement:
+        self.execute('findElement', {'using': by, 'value': value})
+        return FakeElement(self)
+
+    def find_elements(self, by=None, value=None):
+        self.execute('findElements', {'using': by, 'value': value})
+        if 'valueLine' in str(value) and '/product/' in self.current_url:
+            product_id = self.current_url.rsplit('/', 1)[-1]
+            return [FakeElement(self, text) for text in self.market.prices(product_id)['prices']]
+        return []
+
+    def execute_script(self, script: str, *args):
+        self.execute('executeScript', {'script': script, 'args': list(args)})
+        url = urlparse(self.current_url)
+        captcha = 'showcaptcha' in url.path
+
+        if 'document.readyState' in script and len(script) < 60:
+            return "complete"
+        if 'location.href' in script:
+            text = "SmartCaptcha Я не робот" if captcha else "Маркет"
+            return {'url': self.current_url, 'title': self.title, 'text': text}
+        if 'snippet-title' in script:
+            if captcha or url.path != '/search':
+                return []
+            query = parse_qs(url.query).get('text', [''])[0]
+            return [{'title': p['title'], 'url': f"{self._origin()}/product/{p['product_id']}", 'index': p['index']}
+                    for p in self.market.products(query)]
+        if 'ds-valueLine' in script:
+            if captcha or not url.path.startswith('/product/'):
+                return {'prices': [], 'labels': []}
+            return self.market.prices(url.path.rsplit('/', 1)[-1])
+        return None
@@ -0,0 +1,169 @@
+# market_server.py - локальный стенд маркета для бенчмарков (без выхода в интернет)
+#
+# Отдаёт главную, выдачу и карточки с той же разметкой, которую читает парсер:
+#   span[role="link"][data-auto="snippet-title"] внутри <a href> - выдача
+#   span.ds-valueLine + .ds-textLine - цены и подписи в карточке
+# Задержка, разброс и доля капчи настраиваются.
+
+import time
+import random
+import hashlib
+import argparse
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+SEARCH_FORM = """
+<form action="/search" method="get" class="header-search">
+  <input type="text" name="text" data-auto="search-input" value="{query}" placeholder="Искать товары">
+  <button type="submit">Найти</button>
+</form>
+"""
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{form}{body}</body></html>
+"""
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Ой!</title></head>
+<body><div class="CheckboxCaptcha">SmartCaptcha
+<p>Подтвердите, что запросы отправляли вы, а не робот</p>
+<label><input type="checkbox"> Я не робот</label></div></body></html>
+"""
+
+
+def stable_price(key: str, low: int = 500, high: int = 50000) -> int:
+    """Детерминированная цена по ключу - результаты прогонов сравнимы"""
+    digest = int(hashlib.md5(key.encode('utf-8')).hexdigest()[:8], 16)
+    return low + digest % (high - low)
+
+
+def format_price(value: int) -> str:
+    return f"{value:,}".replace(',', ' ') + " ₽"
+
+
+class MarketConfig:
+    """Параметры стенда: задержка ответа, разброс, доля капчи, число сниппетов"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.1, captcha_rate: float = 0.0,
+                 snippets: int = 10, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.captcha_rate = captcha_rate
+        self.snippets = snippets
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.captchas = 0
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def roll_captcha(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            if self.captcha_rate and self.random.random() < self.captcha_rate:
+                self.captchas += 1
+                return True
+            return False
+
+
+class MarketHandler(BaseHTTPRequestHandler):
+    config: MarketConfig = MarketConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, html: str, headers=None):
+        data = html.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        time.sleep(self.config.delay())
+
+        if url.path.startswith('/showcaptcha'):
+            return self._send(200, CAPTCHA_PAGE)
+        if url.path.startswith('/favicon'):
+            return self._send(404, "")
+        if url.path in ('/search', '/product') or url.path.startswith('/product/'):
+            if self.config.roll_captcha():
+                return self._send(302, "", {"Location": f"/showcaptcha?retpath={quote(self.path)}"})
+
+        query = parse_qs(url.query).get('text', [''])[0]
+        if url.path == '/search':
+            return self._send(200, self.search_page(query))
+        if url.path.startswith('/product/'):
+            return self._send(200, self.product_page(url.path.rsplit('/', 1)[-1]))
+        return self._send(200, PAGE.format(title="Маркет", form=SEARCH_FORM.format(query=""),
+                                           body="<h1>Главная</h1>"))
+
+    def search_page(self, query: str) -> str:
+        snippets = []
+        for i in range(self.config.snippets):
+            product_id = hashlib.md5(f"{query}|{i}".encode('utf-8')).hexdigest()[:12]
+            snippets.append(
+                f'<article class="snippet"><a href="/product/{product_id}">'
+                f'<span role="link" data-auto="snippet-title">{escape(query)} вариант {i + 1}</span>'
+                f'</a></article>'
+            )
+        return PAGE.format(title=f"{escape(query)} — Маркет", form=SEARCH_FORM.format(query=escape(query)),
+                           body="\n".join(snippets))
+
+    def product_page(self, product_id: str) -> str:
+        regular = stable_price(product_id)
+        without_card = int(regular * 1.07)
+        business = int(regular * 1.2)
+        lines = [
+            (regular, "с Пэй"),
+            (without_card, "без карты"),
+            (business, "для юрлиц с НДС"),
+        ]
+        blocks = "\n".join(
+            f'<div class="price-block"><div><span class="ds-valueLine">{format_price(value)}</span></div>'
+            f'<span class="ds-textLine">{label}</span></div>'
+            for value, label in lines
+        )
+        return PAGE.format(title=f"Товар {product_id}", form=SEARCH_FORM.format(query=""), body=blocks)
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, config: MarketConfig = None):
+    """Запускает стенд в фоновом потоке; возвращает (server, base_url)"""
+    handler = type("ConfiguredMarketHandler", (MarketHandler,), {"config": config or MarketConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="market-stand", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд маркета для бенчмарков")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Задержка ответа, сек")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Разброс задержки, ±сек")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Доля ответов с капчей (0..1)")
+    args = parser.parse_args()
+
+    config = MarketConfig(latency=args.latency, jitter=args.jitter, captcha_rate=args.captcha_rate)
+    server, base_url = start_server(args.host, args.port, config)
+    print(f"🏪 Стенд маркета: {base_url} (Ctrl+C - выход)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
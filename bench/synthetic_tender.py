@@ -0,0 +1,124 @@
+# synthetic_tender.py - генератор синтетических тендерных таблиц в реальной разметке
+#
+# Разметка как у настоящих тендеров: строка заголовков с "Наименование" и колонками
+# участников, на товар - блок из 12 строк (ранг "N место", цена без НДС, цена с НДС, ...),
+# в конце строка "Итого".
+
+import os
+import random
+import argparse
+from openpyxl import Workbook
+
+ITEM_HEIGHT = 12
+
+BRANDS = ["Ubiquiti", "TP-Link", "Mikrotik", "HP", "Canon", "Logitech", "Kingston", "Samsung", "Brother", "Zyxel"]
+KINDS = ["Точка доступа", "Коммутатор", "Маршрутизатор", "Картридж", "Мышь беспроводная",
+         "Клавиатура", "SSD накопитель", "Монитор", "Принтер лазерный", "Кабель патч-корд"]
+PARTICIPANTS = ["ООО Ромашка", "ООО Вектор", "АО ТехноСнаб"]
+
+
+def product_name(rnd: random.Random, i: int) -> str:
+    """Название с "мусорными" строками параметров, как в реальных выгрузках"""
+    name = f"{rnd.choice(KINDS)} {rnd.choice(BRANDS)} {rnd.choice('ABCDEFGH')}{rnd.randint(100, 9999)} модель {i}"
+    extras = [
+        f"Производитель: {rnd.choice(BRANDS)}",
+        f"Страна происхождения: {rnd.choice(['Китай', 'Россия', 'Тайвань'])}",
+        f"Количество: {rnd.randint(1, 50)}",
+        "Возможность поставки аналогов: да",
+        "Единица измерения: шт",
+    ]
+    return "\n".join([name] + rnd.sample(extras, rnd.randint(0, len(extras))))
+
+
+def tender_items(items: int, participants: int = 3, seed: int = 1):
+    """(название, цены участников) по порядку - общий источник для make_tender и make_results"""
+    rnd = random.Random(seed)
+    for i in range(items):
+        name = product_name(rnd, i)
+        yield name, [rnd.randint(500, 50000) for _ in range(participants)]
+
+
+def product_names(count: int, seed: int = 1) -> list:
+    """Сырые названия товаров в том же порядке, что и в make_tender с тем же seed"""
+    return [name for name, _ in tender_items(count, seed=seed)]
+
+
+def price_strings(count: int, seed: int = 1) -> list:
+    """Строки цен в форматах, которые приходят с карточек и из ячеек"""
+    rnd = random.Random(seed)
+    formats = [
+        lambda v: f"{v:,}".replace(',', ' ') + " ₽",
+        lambda v: f"{v:,}".replace(',', '\u2009') + "\u00a0₽",
+        lambda v: f"{v},{rnd.randint(0, 99):02d}",
+        lambda v: f"{v / 1000:.3f}.{rnd.randint(0, 99):02d} руб.",
+        lambda v: str(v),
+        lambda v: "",
+    ]
+    return [rnd.choice(formats)(rnd.randint(100, 500000)) for _ in range(count)]
+
+
+def make_results(items: int, seed: int = 1, found_rate: float = 0.9):
+    """DataFrame результатов парсинга для make_tender(items, seed=seed) - вход экспорта"""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    rows = []
+    for name in product_names(items, seed):
+        if rnd.random() < found_rate:
+            price = rnd.randint(500, 50000)
+            rows.append({'наименование': name.split("\n", 1)[0],
+                         'цена': f"{price:,}".replace(',', ' ') + " ₽",
+                         'цена для юрлиц': f"{int(price * 1.2):,}".replace(',', ' ') + " ₽",
+                         'ссылка': f"https://market.yandex.ru/product/{rnd.randint(10**6, 10**7)}"})
+        else:
+            rows.append({'наименование': name.split("\n", 1)[0], 'цена': '', 'цена для юрлиц': '', 'ссылка': ''})
+    return pd.DataFrame(rows)
+
+
+def make_tender(path: str, items: int = 100, participants: int = 3, seed: int = 1) -> str:
+    """Создаёт тендер на items товаров; возвращает путь"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Тендер"
+
+    ws.cell(row=1, column=1, value="Сравнительная таблица цен")
+    header_row = 3
+    name_col = 2
+    ws.cell(row=header_row, column=1, value="№")
+    ws.cell(row=header_row, column=name_col, value="Наименование")
+    for p in range(participants):
+        ws.cell(row=header_row, column=name_col + 1 + p, value=PARTICIPANTS[p % len(PARTICIPANTS)])
+
+    for i, (name, prices) in enumerate(tender_items(items, participants, seed)):
+        base = header_row + 1 + i * ITEM_HEIGHT
+        ws.cell(row=base, column=1, value=i + 1)
+        ws.cell(row=base, column=name_col, value=name)
+
+        ranking = sorted(range(participants), key=lambda p: prices[p])
+        for p in range(participants):
+            col = name_col + 1 + p
+            ws.cell(row=base, column=col, value=f"{ranking.index(p) + 1} место")
+            ws.cell(row=base + 1, column=col, value=prices[p])
+            ws.cell(row=base + 2, column=col, value=round(prices[p] * 1.2, 2))
+
+    ws.cell(row=header_row + 1 + items * ITEM_HEIGHT, column=name_col, value="Итого")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетического тендера")
+    parser.add_argument("output", nargs="?", default="synthetic_tender.xlsx")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    path = make_tender(args.output, args.items, args.participants, args.seed)
+    print(f"✅ Тендер на {args.items} товаров: {path}")
+
+
+if __name__ == "__main__":
+    main()
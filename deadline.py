@@ -0,0 +1,49 @@
+# deadline.py - бюджет времени на один товар
+
+import time
+from typing import Optional
+
+
+class ItemTimeout(Exception):
+    """Бюджет времени на товар исчерпан"""
+
+
+class ItemDeadline:
+    """Бюджет времени на товар, который делится между поиском и карточками.
+
+    Поиску достаётся доля search_share от оставшегося времени, карточкам -
+    остаток поровну на каждую ещё не посещённую карточку.
+    """
+
+    def __init__(self, budget: float, search_share: float = 0.35):
+        self.budget = budget
+        self.search_share = search_share
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self, grace: float = 0.0) -> bool:
+        return self.remaining() < -grace
+
+    def check(self, stage: str = ""):
+        """Бросает ItemTimeout, если бюджет исчерпан"""
+        if self.expired():
+            raise ItemTimeout(f"бюджет {self.budget:.0f} с исчерпан ({stage or 'товар'})")
+
+    def search_budget(self) -> float:
+        return max(0.0, self.remaining() * self.search_share)
+
+    def card_budget(self, cards_left: int) -> float:
+        return max(0.0, self.remaining() / max(1, cards_left))
+
+
+def clamp_wait(seconds: float, deadline: Optional[ItemDeadline], minimum: float = 0.1) -> float:
+    """Ограничивает ожидание остатком бюджета товара"""
+    if deadline is None:
+        return seconds
+    return max(minimum, min(seconds, deadline.remaining()))
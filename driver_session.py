@@ -0,0 +1,255 @@
+# driver_session.py - переиспользуемая сессия Edge с политикой пересоздания
+
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from process_registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecyclePolicy:
+    """Когда пересоздавать драйвер: по числу переходов, возрасту или памяти (0 - не проверять)"""
+    max_navigations: int = 150
+    max_age_minutes: float = 20.0
+    max_memory_mb: float = 1500.0
+
+
+def process_tree_memory_mb(driver) -> float:
+    """Суммарный RSS msedgedriver и всех дочерних процессов браузера, МБ"""
+    try:
+        import psutil
+    except ImportError:
+        return 0.0
+
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if process is None:
+        return 0.0
+
+    try:
+        root = psutil.Process(process.pid)
+        procs = [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0.0
+
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return total / (1024 * 1024)
+
+
+def kill_driver_processes(driver) -> int:
+    """Жёстко завершает msedgedriver и дерево процессов браузера этого драйвера"""
+    try:
+        import psutil
+    except ImportError:
+        return 0
+
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if process is None:
+        return 0
+
+    try:
+        root = psutil.Process(process.pid)
+        procs = root.children(recursive=True) + [root]
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0
+
+    killed = 0
+    for proc in procs:
+        try:
+            proc.kill()
+            killed += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return killed
+
+
+class DriverSession:
+    """Драйвер Edge, который живёт между товарами и пересоздаётся по политике.
+
+    Пересоздание выполняется только в maybe_recycle(), который вызывается
+    между товарами - посреди обработки товара драйвер не меняется.
+    """
+
+    def __init__(self, headless: bool = True, driver_path: Optional[str] = None,
+                 use_auth: bool = False, policy: Optional[RecyclePolicy] = None, stats=None):
+        self.headless = headless
+        self.driver_path = driver_path
+        self.use_auth = use_auth
+        self.policy = policy or RecyclePolicy()
+        self.stats = stats
+        self.driver = None
+        self.profile_dir = None
+        self.started_at = 0.0
+        self.broken = False
+        self.deadline = None
+        self.timed_out = False
+        self.in_item = False
+
+    def begin_item(self, deadline):
+        """Начало товара: запоминает его бюджет для сторожевого потока"""
+        self.deadline = deadline
+        self.timed_out = False
+        self.in_item = True
+
+    def end_item(self):
+        self.deadline = None
+        self.in_item = False
+
+    def acquire(self):
+        """Возвращает живой драйвер, создавая его (и загружая cookies) при необходимости"""
+        if self.driver is None:
+            self._start()
+        return self.driver
+
+    def _start(self):
+        from tender_parser import create_driver, load_cookies_for_auth
+
+        self.driver = create_driver(headless=self.headless, driver_path=self.driver_path,
+                                    use_auth=self.use_auth)
+        self.profile_dir = getattr(self.driver, 'profile_dir', None)
+        self.started_at = time.time()
+        self.broken = False
+        if self.stats is not None:
+            self.stats.incr('drivers_created')
+
+        if self.use_auth:
+            if load_cookies_for_auth(self.driver):
+                logger.info("✓ Авторизация сессии успешна")
+            else:
+                logger.warning("⚠ Авторизация сессии не удалась, продолжаю без неё")
+
+    @property
+    def navigations(self) -> int:
+        return getattr(self.driver, 'navigations', 0) if self.driver is not None else 0
+
+    @property
+    def age_minutes(self) -> float:
+        return (time.time() - self.started_at) / 60 if self.driver is not None else 0.0
+
+    def mark_broken(self):
+        """Помечает драйвер как неисправный - он будет пересоздан перед следующим товаром"""
+        self.broken = True
+
+    def kill(self):
+        """Убивает зависший драйвер из чужого потока; блокирующий вызов WebDriver упадёт"""
+        self.timed_out = True
+        self.broken = True
+        driver = self.driver
+        if driver is not None:
+            killed = kill_driver_processes(driver)
+            # Процессы, потерявшие родителя, в живое дерево уже не попадают - добиваем по реестру
+            killed += REGISTRY.terminate(self.profile_dir, kill=True)
+            logger.warning(f"⏱️ Драйвер завис дольше бюджета товара, завершено процессов: {killed}")
+
+    def abort(self):
+        """Обрывает текущий товар при остановке прогона: блокирующий вызов WebDriver упадёт сразу"""
+        self.broken = True
+        driver = self.driver
+        if driver is not None and self.in_item:
+            kill_driver_processes(driver)
+            REGISTRY.terminate(self.profile_dir, kill=True)
+
+    def recycle_reason(self) -> Optional[str]:
+        """Причина пересоздания драйвера или None, если он ещё годен"""
+        if self.driver is None:
+            return None
+        if self.broken:
+            return 'broken'
+        if self.policy.max_navigations and self.navigations >= self.policy.max_navigations:
+            return 'navigations'
+        if self.policy.max_age_minutes and self.age_minutes >= self.policy.max_age_minutes:
+            return 'age'
+        if self.policy.max_memory_mb:
+            memory_mb = process_tree_memory_mb(self.driver)
+            if memory_mb >= self.policy.max_memory_mb:
+                logger.info(f"Память браузера {memory_mb:.0f} МБ превышает {self.policy.max_memory_mb:.0f} МБ")
+                return 'memory'
+        return None
+
+    def maybe_recycle(self) -> bool:
+        """Закрывает драйвер, если он исчерпал ресурс; новый создастся при следующем acquire()"""
+        reason = self.recycle_reason()
+        if not reason:
+            return False
+
+        logger.info(f"♻️ Пересоздаю драйвер ({reason}): переходов {self.navigations}, "
+                    f"возраст {self.age_minutes:.1f} мин")
+        self.close()
+        if self.stats is not None:
+            self.stats.incr('recycled')
+            self.stats.incr(f'recycled_{reason}')
+        return True
+
+    def close(self):
+        """Закрывает драйвер и отдаёт его профиль на удаление"""
+        from tender_parser import REAPER
+
+        driver, self.driver = self.driver, None
+        if driver is not None:
+            # Дочерние процессы браузера появляются по ходу работы - дописываем их до quit()
+            REGISTRY.register(self.profile_dir, driver)
+            try:
+                driver.quit()
+            except:
+                pass
+
+        # Профиль удаляется в фоне - поток не ждёт файловую систему
+        profile_dir, self.profile_dir = self.profile_dir, None
+        if profile_dir:
+            REAPER.submit(profile_dir)
+
+
+class DriverWatchdog:
+    """Сторожевой поток: убивает драйверы, чей товар вышел за бюджет с запасом grace"""
+
+    def __init__(self, grace: float = 5.0, interval: float = 0.5, stats=None):
+        self.grace = grace
+        self.interval = interval
+        self.stats = stats
+        self._sessions: List[DriverSession] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, session: DriverSession):
+        with self._lock:
+            self._sessions.append(session)
+
+    def unwatch(self, session: DriverSession):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="driver-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                sessions = list(self._sessions)
+            for session in sessions:
+                deadline = session.deadline
+                if deadline is not None and not session.timed_out and deadline.expired(self.grace):
+                    session.kill()
+                    if self.stats is not None:
+                        self.stats.incr('watchdog_kills')
@@ -0,0 +1,131 @@
+# driver_tracer.py - подсчёт команд WebDriver (HTTP-запросов к msedgedriver) по типам и местам вызова
+
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Активный трассировщик; None - драйверы создаются без обёртки
+TRACER: Optional["CommandTracer"] = None
+
+# Файлы-обёртки, которые пропускаются при поиске места вызова
+_SKIP_FILES = {'driver_tracer.py', 'retry_policy.py', 'timing.py', 'contextlib.py', 'functools.py'}
+_SELENIUM_DIR = os.sep + 'selenium' + os.sep
+
+
+def _call_site() -> str:
+    """Первый кадр стека вне selenium и служебных обёрток: 'файл:строка функция'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _SELENIUM_DIR not in filename and os.path.basename(filename) not in _SKIP_FILES:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class CommandTracer:
+    """Считает и замеряет каждую команду WebDriver по типу и месту вызова"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.by_command: Dict[str, List[float]] = {}
+        self.by_site: Dict[Tuple[str, str], List[float]] = {}
+        self.item_calls: List[int] = []
+
+    def attach(self, driver):
+        """Оборачивает driver.execute - через него проходят все команды, включая WebElement"""
+        execute = getattr(driver, 'execute', None)
+        if execute is None or getattr(execute, '_traced', False):
+            return driver
+
+        def traced_execute(driver_command, params=None):
+            site = _call_site()
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._record(str(driver_command), site, time.perf_counter() - started)
+
+        traced_execute._traced = True
+        driver.execute = traced_execute
+        return driver
+
+    def _record(self, command: str, site: str, duration: float):
+        with self._lock:
+            stat = self.by_command.setdefault(command, [0, 0.0])
+            stat[0] += 1
+            stat[1] += duration
+            stat = self.by_site.setdefault((site, command), [0, 0.0])
+            stat[0] += 1
+            stat[1] += duration
+        if getattr(self._local, 'calls', None) is not None:
+            self._local.calls += 1
+
+    @contextmanager
+    def item(self):
+        """Границы товара в текущем потоке: число команд попадает в статистику по товарам"""
+        self._local.calls = 0
+        try:
+            yield self
+        finally:
+            calls, self._local.calls = self._local.calls, None
+            with self._lock:
+                self.item_calls.append(calls)
+
+    def current_item_calls(self) -> int:
+        return getattr(self._local, 'calls', None) or 0
+
+    def summary(self, top: int = 15) -> Dict[str, object]:
+        with self._lock:
+            by_command = sorted(self.by_command.items(), key=lambda kv: -kv[1][0])
+            by_site = sorted(self.by_site.items(), key=lambda kv: -kv[1][1])[:top]
+            item_calls = list(self.item_calls)
+        return {
+            'total_calls': sum(stat[0] for _, stat in by_command),
+            'items': len(item_calls),
+            'calls_per_item_avg': round(sum(item_calls) / len(item_calls), 1) if item_calls else 0,
+            'calls_per_item_max': max(item_calls) if item_calls else 0,
+            'by_command': {cmd: {'count': stat[0], 'time': round(stat[1], 3)} for cmd, stat in by_command},
+            'top_sites': [{'site': site, 'command': cmd, 'count': stat[0], 'time': round(stat[1], 3)}
+                          for (site, cmd), stat in by_site],
+        }
+
+    def log_report(self, top: int = 15):
+        summary = self.summary(top)
+        if not summary['total_calls']:
+            return
+        logger.info(f"🔌 Команд WebDriver: {summary['total_calls']}, на товар: в среднем "
+                    f"{summary['calls_per_item_avg']}, максимум {summary['calls_per_item_max']}")
+        logger.info("🔌 По типам команд (количество / время, сек):")
+        for cmd, stat in summary['by_command'].items():
+            logger.info(f"  {cmd:<32} {stat['count']:>7} {stat['time']:>9.2f}")
+        logger.info(f"🔌 Топ-{top} мест вызова по времени:")
+        for row in summary['top_sites']:
+            logger.info(f"  {row['site']:<48} {row['command']:<24} {row['count']:>7} {row['time']:>9.2f}")
+
+
+def enable_tracing() -> CommandTracer:
+    """Включает трассировку для всех драйверов, созданных после вызова"""
+    global TRACER
+    TRACER = CommandTracer()
+    return TRACER
+
+
+def disable_tracing():
+    global TRACER
+    TRACER = None
+
+
+def trace_item():
+    """Контекст товара для трассировщика; при выключенной трассировке - пустышка"""
+    tracer = TRACER
+    if tracer is None:
+        return nullcontext()
+    return tracer.item()
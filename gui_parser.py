@@ -1,26 +1,49 @@
 # gui_parser.py - упрощенный GUI с кнопкой cookies
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
+from tkinter import ttk, filedialog, messagebox
 import threading
 import queue
 import time
 import os
 import sys
-from typing import Dict, List
-import pandas as pd
+from typing import List
+from collections import Counter, deque
 from datetime import datetime
 
 try:
-    from tender_parser import get_prices
-    from utils import extract_products_from_excel, save_results_into_tender_format
+    import timing
+    import profiler
+    from gui_views import VirtualResultTable, RingLogView
+    from run_context import RunContext
+    from results import ProductResult, ResultStore
 except ImportError as e:
     print(f"Ошибка импорта: {e}")
     sys.exit(1)
 
+# Тяжёлые модули (pandas, selenium, openpyxl через tender_parser/scrape_engine/utils)
+# импортируются после показа окна - фоново в preload_backend() или при первом использовании
+BACKEND_MODULES = ("pandas", "utils", "tender_parser", "scrape_engine")
+
+
+# Статусы завершённых товаров (для счётчика "Обработано")
+DONE_STATUSES = ("success", "cached", "error", "timeout", "throttled", "not_found")
+# Сколько сообщений очереди разбирается за один тик интерфейса
+MAX_QUEUE_BATCH = 500
+# Сколько последних строк лога держит окно (полный лог - в logs/gui_*.log)
+MAX_LOG_LINES = 2000
+# Этапы, средняя длительность которых показывается в статистике
+STAGE_LABELS = (
+    ("item", "товар"),
+    ("smart_search_input", "поиск"),
+    ("card_load", "карточка"),
+    ("extract_prices_fast", "цены"),
+    ("create_driver", "драйвер"),
+)
+
 
 class ParserGUI:
-    def __init__(self, root):
+    def __init__(self, root, profile: bool = False, profile_prefix: str = None):
         self.root = root
         self.root.title("Парсер Яндекс.Маркет (Microsoft Edge)")
         self.root.geometry("1000x700")
@@ -29,9 +52,18 @@ class ParserGUI:
         self.is_parsing = False
         self.current_thread = None
         self.products_data = []
-        self.results_data = []
+        self.results = ResultStore()
+        self.status_counts = Counter()
+        self.stats_dirty = False
         self.queue = queue.Queue()
         self.auto_save_counter = 0
+        self.throttle_events = 0
+        self.concurrency = 1
+        self.request_delay = 0.0
+        self.engine = None
+        self.run_context = None
+        # (время, обработано) раз в секунду за последнюю минуту - для скорости и ETA
+        self.rate_samples = deque(maxlen=61)
         
         self.input_file = tk.StringVar(value="tender_list.xlsx")
         
@@ -43,13 +75,27 @@ class ParserGUI:
         self.headless_mode = tk.BooleanVar(value=False)
         self.driver_path = tk.StringVar(value="")
         self.auto_save_enabled = tk.BooleanVar(value=True)
+        self.workers_count = tk.IntVar(value=2)
+        # Режим обновления: пусто - парсить всё, иначе возраст (36h, 7d) для цен из истории
+        self.refresh_older_than = tk.StringVar(value="")
+        self.refresh_seconds = None
+        self.profile_enabled = tk.BooleanVar(value=profile)
+        self.profile_prefix = profile_prefix
+        self.app_dir = app_dir
+        # История цен (price_db) - та же база, что у консольного режима (PARSER_DB или prices.db рядом с программой)
+        from price_db import resolve_db_path
+        self.db_path = resolve_db_path()
         
         # Cookies - ИСПРАВЛЕН путь для соответствия с tender_parser.py
         self.cookies_file = os.path.expanduser("~/.yandex_parser_auth/cookies.json")
         self.has_cookies = os.path.exists(self.cookies_file)
         
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.process_queue()
+        self.update_metrics()
+        self.root.after(200, lambda: threading.Thread(target=self.preload_backend, name="gui-preload",
+                                                      daemon=True).start())
         
         self.log_message(f"GUI загружен", "INFO")
         self.log_message(f"Результаты: {auto_output}", "INFO")
@@ -85,10 +131,21 @@ class ParserGUI:
         options_frame = ttk.Frame(settings_frame)
         options_frame.pack(fill=tk.X, pady=(0, 10))
         
+        workers_frame = ttk.Frame(options_frame)
+        workers_frame.pack(anchor=tk.W, pady=(0, 5))
+        ttk.Label(workers_frame, text="Потоков (браузеров):").pack(side=tk.LEFT)
+        ttk.Spinbox(workers_frame, from_=1, to=8, width=4,
+                    textvariable=self.workers_count).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(workers_frame, text="Обновлять цены старше:").pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Entry(workers_frame, textvariable=self.refresh_older_than, width=6).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(workers_frame, text="(36h, 7d; пусто - все)").pack(side=tk.LEFT, padx=(5, 0))
+        
         ttk.Checkbutton(options_frame, text="Скрытый режим браузера",
                        variable=self.headless_mode).pack(anchor=tk.W)
         ttk.Checkbutton(options_frame, text="Автосохранение каждые 3 товара", 
                        variable=self.auto_save_enabled).pack(anchor=tk.W, pady=(5, 0))
+        ttk.Checkbutton(options_frame, text="Профилирование (стеки и самые медленные товары)",
+                       variable=self.profile_enabled).pack(anchor=tk.W, pady=(5, 0))
         
         # Cookies
         cookies_frame = ttk.Frame(settings_frame)
@@ -146,38 +203,30 @@ class ParserGUI:
         self.error_label.grid(row=0, column=3, padx=(0, 15), sticky=tk.W)
         
         self.autosave_label = ttk.Label(stats_grid, text="Сохранений: 0", foreground="orange")
-        self.autosave_label.grid(row=0, column=4, sticky=tk.W)
+        self.autosave_label.grid(row=0, column=4, padx=(0, 15), sticky=tk.W)
+        
+        self.throttle_label = ttk.Label(stats_grid, text="Потоков: 1 | Капчи: 0 | Пауза: 0.0 с", foreground="purple")
+        self.throttle_label.grid(row=0, column=5, sticky=tk.W)
+        
+        self.rate_label = ttk.Label(stats_grid, text="Скорость: — тов/мин | Осталось: —")
+        self.rate_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        self.stages_label = ttk.Label(stats_grid, text="Этапы (среднее): —", foreground="gray")
+        self.stages_label.grid(row=1, column=3, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        self.workers_label = ttk.Label(stats_grid, text="Потоки: —", foreground="gray")
+        self.workers_label.grid(row=2, column=0, columnspan=6, sticky=tk.W, pady=(5, 0))
         
         self.progress = ttk.Progressbar(stats_grid, mode='determinate')
-        self.progress.grid(row=1, column=0, columnspan=5, sticky=(tk.W, tk.E), pady=(10, 0))
+        self.progress.grid(row=3, column=0, columnspan=6, sticky=(tk.W, tk.E), pady=(10, 0))
         stats_grid.columnconfigure(0, weight=1)
         
         # Результаты
         results_frame = ttk.LabelFrame(main_frame, text="Результаты", padding=5)
         results_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
-        columns = ("№", "Название", "Цена", "Статус", "Ссылка")
-        self.tree = ttk.Treeview(results_frame, columns=columns, show="headings", height=10)
-        
-        self.tree.heading("№", text="№")
-        self.tree.heading("Название", text="Название товара")
-        self.tree.heading("Цена", text="Цена")
-        self.tree.heading("Статус", text="Статус")
-        self.tree.heading("Ссылка", text="Ссылка")
-        
-        self.tree.column("№", width=50, anchor=tk.CENTER)
-        self.tree.column("Название", width=400, anchor=tk.W)
-        self.tree.column("Цена", width=120, anchor=tk.CENTER)
-        self.tree.column("Статус", width=100, anchor=tk.CENTER)
-        self.tree.column("Ссылка", width=80, anchor=tk.CENTER)
-        
-        v_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        h_scrollbar = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.table = VirtualResultTable(results_frame, self.results, height=10)
+        self.tree = self.table.tree
         
         results_frame.grid_rowconfigure(0, weight=1)
         results_frame.grid_columnconfigure(0, weight=1)
@@ -188,13 +237,26 @@ class ParserGUI:
         log_frame = ttk.LabelFrame(main_frame, text="Лог", padding=5)
         log_frame.pack(fill=tk.X)
         
-        self.log_text = scrolledtext.ScrolledText(log_frame, height=6, wrap=tk.WORD)
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        log_path = os.path.join(self.app_dir, "logs", f"gui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+        self.log_view = RingLogView(log_frame, max_lines=MAX_LOG_LINES, log_path=log_path)
+        self.log_text = self.log_view.text
+    
+    def preload_backend(self):
+        """Фоновый импорт парсера, пока пользователь выбирает файл - первый запуск не ждёт импортов"""
+        import importlib
+        started = time.time()
+        try:
+            for name in BACKEND_MODULES:
+                importlib.import_module(name)
+        except ImportError as e:
+            self.queue.put(("log", f"Ошибка импорта: {e}", "ERROR"))
+            return
+        self.queue.put(("log", f"Модули парсера загружены за {time.time() - started:.1f} с", "INFO"))
         
-        self.log_text.tag_config("INFO", foreground="black")
-        self.log_text.tag_config("SUCCESS", foreground="green", font=("Arial", 9, "bold"))
-        self.log_text.tag_config("ERROR", foreground="red", font=("Arial", 9, "bold"))
-        self.log_text.tag_config("WARNING", foreground="orange", font=("Arial", 9, "bold"))
+        # Снимки результатов, оставшиеся после аварийного завершения прошлого запуска
+        from snapshot import rebuild_pending
+        for rebuilt in rebuild_pending(self.app_dir):
+            self.queue.put(("log", f"Восстановлена выгрузка прошлого запуска: {rebuilt}", "SUCCESS"))
     
     def load_cookies(self):
         filename = filedialog.askopenfilename(
@@ -239,81 +301,108 @@ class ParserGUI:
         if filename:
             self.output_file.set(filename)
     
+    def on_close(self):
+        """Закрытие окна: файл лога закрывается, чтобы не потерять буферизованные строки"""
+        self.log_view.close()
+        self.root.destroy()
+    
     def log_message(self, message: str, level: str = "INFO"):
-        timestamp = time.strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, formatted_message, level)
-        self.log_text.see(tk.END)
+        # В окно строка попадёт на ближайшем тике process_queue, в файл - сразу
+        self.log_view.append(message, level)
     
     def update_stats(self):
-        total = len(self.results_data)
-        processed = len([r for r in self.results_data if r.get("status") in ["success", "error", "not_found"]])
-        success = len([r for r in self.results_data if r.get("status") == "success"])
-        error = len([r for r in self.results_data if r.get("status") == "error"])
+        self.stats_dirty = False
+        total = len(self.results)
+        processed = sum(self.status_counts[status] for status in DONE_STATUSES)
+        success = self.status_counts["success"]
+        cached = self.status_counts["cached"]
+        error = self.status_counts["error"]
         
         self.total_label.config(text=f"Всего: {total}")
         self.processed_label.config(text=f"Обработано: {processed}")
-        self.success_label.config(text=f"Успешно: {success}")
+        self.success_label.config(text=f"Успешно: {success}" + (f" (из истории: {cached})" if cached else ""))
         self.error_label.config(text=f"Ошибки: {error}")
         self.autosave_label.config(text=f"Сохранений: {self.auto_save_counter}")
+        self.throttle_label.config(text=f"Потоков: {self.concurrency} | Капчи: {self.throttle_events} | "
+                                        f"Пауза: {self.request_delay:.1f} с")
         
         if total > 0:
             progress_value = (processed / total) * 100
             self.progress['value'] = progress_value
     
-    def add_result_row(self, index: int, product_name: str, price: str = "—",
-                      status: str = "pending", url: str = ""):
-        while len(self.results_data) <= index:
-            self.results_data.append({})
-        
-        self.results_data[index].update({
-            "name": product_name,
-            "price": price,
-            "status": status,
-            "url": url
-        })
-        
-        status_indicators = {
-            "pending": "⏳",
-            "processing": "🔄", 
-            "success": "✅",
-            "error": "❌",
-            "not_found": "❓"
-        }
-        
-        status_text = status_indicators.get(status, "❓")
-        
-        item_id = f"item_{index}"
-        if self.tree.exists(item_id):
-            self.tree.item(item_id, values=(
-                index + 1,
-                product_name[:60] + ("..." if len(product_name) > 60 else ""),
-                price,
-                status_text,
-                "🔗" if url else ""
-            ))
+    def update_metrics(self):
+        """Раз в секунду: скорость за последнюю минуту, ETA, состояние потоков и средние по этапам"""
+        try:
+            engine = self.engine
+            if engine is not None and self.is_parsing:
+                processed = sum(self.status_counts[status] for status in DONE_STATUSES)
+                now = time.time()
+                self.rate_samples.append((now, processed))
+                first_time, first_processed = self.rate_samples[0]
+                rate = (processed - first_processed) / (now - first_time) * 60 if now > first_time else 0.0
+                remaining = len(self.results) - processed
+                if rate > 0:
+                    eta = remaining / rate * 60
+                    eta_text = f"{int(eta // 3600)}:{int(eta % 3600 // 60):02d}:{int(eta % 60):02d}"
+                else:
+                    eta_text = "—"
+                self.rate_label.config(text=f"Скорость: {rate:.1f} тов/мин | Осталось: {eta_text}")
+                
+                workers = []
+                for worker_id in sorted(engine.worker_status):
+                    workers.append(f"W{worker_id}: {engine.worker_status[worker_id]} "
+                                   f"({engine.worker_done.get(worker_id, 0)})")
+                self.workers_label.config(text="Потоки: " + (" · ".join(workers) or "запуск..."))
+                
+                timer = timing.TIMER
+                if timer is not None:
+                    means = timer.means()
+                    stages = [f"{label} {means[stage]:.1f} с" for stage, label in STAGE_LABELS if stage in means]
+                    if stages:
+                        self.stages_label.config(text="Этапы (среднее): " + " · ".join(stages))
+                
+                controller = engine.controller
+                self.concurrency = controller.limit
+                self.throttle_events = controller.throttle_events
+                self.request_delay = controller.delay
+                self.stats_dirty = True
+        except Exception as e:
+            print(f"Ошибка обновления статистики: {e}")
+        
+        self.root.after(1000, self.update_metrics)
+    
+    def set_rows(self, product_names: List[str]):
+        """Заполняет таблицу товарами в статусе "ожидает" одним действием"""
+        self.results.reset(product_names)
+        self.status_counts = Counter(pending=len(product_names))
+        self.table.reset()
+        self.stats_dirty = True
+    
+    def update_result_row(self, index: int, result=None, cached_at: float = 0.0):
+        """Пишет результат товара (None - товар взят в работу, cached_at - цена из истории)
+        в хранилище; таблица и счётчики перерисовываются раз за тик process_queue"""
+        if index >= len(self.results):
+            return
+        
+        self.status_counts[self.results.statuses[index]] -= 1
+        if result is None:
+            self.results.mark(index, "processing")
         else:
-            self.tree.insert("", "end", iid=item_id, values=(
-                index + 1,
-                product_name[:60] + ("..." if len(product_name) > 60 else ""),
-                price,
-                status_text,
-                "🔗" if url else ""
-            ))
-        
-        self.tree.see(item_id)
-        self.update_stats()
+            self.results.set(index, result, cached_at)
+        self.status_counts[self.results.statuses[index]] += 1
+        
+        self.table.touch(index)
+        self.stats_dirty = True
     
     def open_link(self, event):
         selection = self.tree.selection()
         if not selection:
             return
             
-        item = selection[0]
-        index = int(item.split("_")[1])
+        index = self.table.index_of(selection[0])
         
-        if index < len(self.results_data) and self.results_data[index].get("url"):
-            url = self.results_data[index]["url"]
+        if index is not None and self.results.urls[index]:
+            url = self.results.urls[index]
             import webbrowser
             webbrowser.open(url)
             self.log_message(f"Открыта ссылка для товара #{index + 1}", "INFO")
@@ -323,16 +412,19 @@ class ParserGUI:
             messagebox.showwarning("Внимание", "Остановите парсинг перед очисткой")
             return
             
-        self.tree.delete(*self.tree.get_children())
-        self.results_data.clear()
-        self.log_text.delete(1.0, tk.END)
+        self.results.clear()
+        self.status_counts.clear()
+        self.table.clear()
+        self.table.refresh()
+        self.log_view.clear()
         self.update_stats()
         self.progress['value'] = 0
         self.auto_save_counter = 0
+        self.throttle_events = 0
         self.log_message("Результаты очищены", "INFO")
     
     def save_results_now(self):
-        if not self.results_data:
+        if not len(self.results):
             messagebox.showwarning("Внимание", "Нет данных для сохранения")
             return
         
@@ -340,16 +432,9 @@ class ParserGUI:
     
     def perform_save(self):
         try:
-            df_data = []
-            for result in self.results_data:
-                df_data.append({
-                    "наименование": result.get("name", ""),
-                    "цена": result.get("price", "—"),
-                    "цена для юрлиц": "",
-                    "ссылка": result.get("url", "")
-                })
+            from utils import save_results_into_tender_format
             
-            df = pd.DataFrame(df_data)
+            df = self.results.to_dataframe()
             
             input_path = self.input_file.get()
             output_path = self.output_file.get()
@@ -375,12 +460,27 @@ class ParserGUI:
             messagebox.showerror("Ошибка", f"Файл не найден: {input_path}")
             return
         
+        self.refresh_seconds = None
+        if self.refresh_older_than.get().strip():
+            from price_db import parse_age
+            try:
+                self.refresh_seconds = parse_age(self.refresh_older_than.get())
+            except ValueError as e:
+                messagebox.showerror("Ошибка", str(e))
+                return
+        
         self.clear_results()
+        # Скорость и ETA считаются заново для каждого прогона
+        self.rate_samples.clear()
         
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.is_parsing = True
         
+        if self.profile_enabled.get() and profiler.PROFILER is None:
+            profiler.enable_profiling()
+            self.log_message("Профилирование включено", "INFO")
+        
         self.current_thread = threading.Thread(target=self.parse_worker, daemon=True)
         self.current_thread.start()
     
@@ -389,15 +489,24 @@ class ParserGUI:
             return
             
         self.is_parsing = False
+        # Останавливается только прогон GUI; фоновые задания в этом процессе продолжают работу
+        if self.run_context is not None:
+            self.run_context.stop()
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.log_message("Парсинг остановлен", "WARNING")
         
-        if self.results_data:
+        if len(self.results):
             self.perform_save()
     
     def parse_worker(self):
+        own_timer = False
+        db = None
         try:
+            import tender_parser
+            from scrape_engine import ScrapeEngine
+            from utils import extract_products_from_excel
+            
             self.queue.put(("log", "Начинаем парсинг...", "INFO"))
             
             input_path = self.input_file.get()
@@ -410,49 +519,82 @@ class ParserGUI:
             products_list = products_df["name"].tolist()
             self.queue.put(("log", f"Найдено товаров: {len(products_list)}", "INFO"))
             
-            for i, product_name in enumerate(products_list):
-                self.queue.put(("add_row", i, product_name, "—", "pending", ""))
+            self.queue.put(("set_rows", products_list))
             
-            for i, product_name in enumerate(products_list):
-                if not self.is_parsing:
-                    break
+            # Средние по этапам для панели статистики - замеры в памяти, без файла
+            own_timer = timing.TIMER is None
+            if own_timer:
+                timing.enable_timing()
+            
+            workers = max(1, int(self.workers_count.get()))
+            context = RunContext(input_path, name="gui")
+            self.run_context = context
+            tender_parser.sweep_orphan_profiles()
+            engine = ScrapeEngine(headless=self.headless_mode.get(),
+                                  driver_path=self.driver_path.get() if self.driver_path.get() else None,
+                                  use_auth=self.has_cookies, workers=workers, context=context)
+            self.engine = engine
+            self.queue.put(("log", f"Потоков: {workers}", "INFO"))
+            
+            if self.db_path:
+                from price_db import PriceDB
+                db = PriceDB(self.db_path)
+                tender_id = db.start_tender(input_path, self.output_file.get())
+                db.add_items(tender_id, products_list)
+                self.queue.put(("log", f"История цен: тендер #{tender_id}", "INFO"))
+            
+            results_lock = threading.Lock()
+            done_count = 0
+            
+            def on_start(i: int):
+                self.queue.put(("update_row", i, None))
+            
+            def on_result(i: int, result: ProductResult):
+                nonlocal done_count
+                product_name = products_list[i]
                 
-                self.queue.put(("update_row", i, product_name, "—", "processing", ""))
-                self.queue.put(("log", f"{i + 1}/{len(products_list)}: {product_name[:40]}...", "INFO"))
+                # Хранилище результатов меняет только поток интерфейса
+                self.queue.put(("update_row", i, result))
+                if db is not None:
+                    try:
+                        db.record(tender_id, i, product_name, result)
+                    except Exception as e:
+                        self.queue.put(("log", f"Ошибка записи в историю цен: {e}", "WARNING"))
                 
-                try:
-                    result = get_prices(
-                        product_name=product_name,
-                        headless=self.headless_mode.get(),
-                        driver_path=self.driver_path.get() if self.driver_path.get() else None,
-                        timeout=20,
-                        use_business_auth=self.has_cookies
-                    )
-                    
-                    price = result.get("цена", "—")
-                    url = result.get("ссылка", "")
-                    
-                    status = "success" if price not in ["—", "ERR", "ОШИБКА"] else "not_found"
-                    if price in ["ERR", "ОШИБКА"]:
-                        status = "error"
-                    
-                    self.queue.put(("update_row", i, product_name, price, status, url))
-                    
-                    if status == "success":
-                        self.queue.put(("log", f"{product_name[:30]}... -> {price}", "SUCCESS"))
-                    else:
-                        self.queue.put(("log", f"{product_name[:30]}... -> не найден", "WARNING"))
-                    
-                    if self.auto_save_enabled.get() and (i + 1) % 3 == 0:
-                        self.queue.put(("auto_save",))
-                        self.queue.put(("log", f"Автосохранение {i + 1}/{len(products_list)}", "INFO"))
-                        
-                except Exception as e:
-                    error_msg = f"Ошибка {product_name[:30]}...: {str(e)[:100]}"
-                    self.queue.put(("update_row", i, product_name, "ERR", "error", ""))
-                    self.queue.put(("log", error_msg, "ERROR"))
+                if result.status == "success":
+                    self.queue.put(("log", f"{i + 1}. {product_name[:30]}... -> {result.price}", "SUCCESS"))
+                else:
+                    self.queue.put(("log", f"{i + 1}. {product_name[:30]}... -> не найден", "WARNING"))
                 
-                time.sleep(1)
+                with results_lock:
+                    done_count += 1
+                    done = done_count
+                if self.auto_save_enabled.get() and done % 3 == 0:
+                    self.queue.put(("auto_save",))
+                    self.queue.put(("log", f"Автосохранение {done}/{len(products_list)}", "INFO"))
+            
+            pending = list(enumerate(products_list))
+            if db is not None and self.refresh_seconds is not None:
+                # Свежие успешные цены берутся из истории, парсятся только остальные
+                pending = []
+                for i, name in enumerate(products_list):
+                    cached = db.reusable(name, self.refresh_seconds)
+                    if cached is None:
+                        pending.append((i, name))
+                        continue
+                    price_id, result, scraped_at = cached
+                    db.reuse(tender_id, i, name, price_id)
+                    self.queue.put(("cached_row", i, result, scraped_at))
+                self.queue.put(("log", f"Цены из истории: {len(products_list) - len(pending)}, "
+                                       f"к обновлению: {len(pending)}", "INFO"))
+            
+            run_stats = engine.run(pending, on_result, on_start=on_start)
+            if db is not None:
+                db.finish_tender(tender_id, len(products_list))
+            
+            self.queue.put(("log", f"Драйверов создано: {run_stats.get('drivers_created', 0)}, "
+                                   f"капч: {run_stats.get('throttle_events', 0)}, "
+                                   f"спасено повтором: {run_stats.get('recovered', 0)}", "INFO"))
             
             if self.auto_save_enabled.get():
                 self.queue.put(("auto_save",))
@@ -463,42 +605,81 @@ class ParserGUI:
             error_msg = f"Критическая ошибка: {e}"
             self.queue.put(("log", error_msg, "ERROR"))
         finally:
+            if own_timer:
+                timing.disable_timing()
+            if db is not None:
+                db.close()
+            if self.run_context is not None:
+                import tender_parser
+                tender_parser.cleanup_profiles(self.run_context)
             self.queue.put(("parsing_finished",))
     
+    def finish_profiling(self):
+        """Останавливает профилировщик и пишет отчёт рядом с программой"""
+        if profiler.PROFILER is None:
+            return
+        try:
+            profiler.PROFILER.stop()
+            prefix = self.profile_prefix or profiler.default_prefix(self.app_dir)
+            paths = profiler.PROFILER.write(prefix)
+            summary = profiler.PROFILER.summary(top=3)
+            for row in summary['top_self']:
+                self.log_message(f"Профиль: {row['function']} {row['share'] * 100:.1f}%", "INFO")
+            self.log_message(f"Профиль сохранён: {paths['collapsed']}, {paths['summary']}", "SUCCESS")
+        except Exception as e:
+            self.log_message(f"Ошибка записи профиля: {e}", "ERROR")
+        finally:
+            profiler.disable_profiling()
+    
     def process_queue(self):
+        drained = 0
         try:
-            while True:
+            while drained < MAX_QUEUE_BATCH:
                 try:
                     message = self.queue.get_nowait()
+                    drained += 1
                     action = message[0]
                     
                     if action == "log":
                         _, text, level = message
                         self.log_message(text, level)
                         
-                    elif action == "add_row":
-                        _, index, name, price, status, url = message
-                        self.add_result_row(index, name, price, status, url)
-                        
+                    elif action == "set_rows":
+                        self.set_rows(message[1])
+                    
                     elif action == "update_row":
-                        _, index, name, price, status, url = message
-                        self.add_result_row(index, name, price, status, url)
+                        _, index, result = message
+                        self.update_result_row(index, result)
+                    
+                    elif action == "cached_row":
+                        _, index, result, cached_at = message
+                        self.update_result_row(index, result, cached_at)
                         
                     elif action == "auto_save":
                         self.perform_save()
                     
                     elif action == "parsing_finished":
                         self.is_parsing = False
+                        self.engine = None
+                        self.workers_label.config(text="Потоки: —")
                         self.start_button.config(state=tk.NORMAL)
                         self.stop_button.config(state=tk.DISABLED)
+                        self.finish_profiling()
                         
                 except queue.Empty:
                     break
                     
+            # Таблица и статистика перерисовываются один раз за тик, сколько бы строк ни пришло
+            self.table.refresh()
+            self.log_view.flush()
+            if self.stats_dirty:
+                self.update_stats()
+                
         except Exception as e:
             print(f"Ошибка обработки очереди: {e}")
         
-        self.root.after(100, self.process_queue)
+        # Очередь не разобрана до конца - следующий тик сразу, иначе обычный интервал
+        self.root.after(10 if drained >= MAX_QUEUE_BATCH else 100, self.process_queue)
 
 
 def main():
@@ -0,0 +1,251 @@
+# gui_views.py - виджеты GUI для больших тендеров: виртуальная таблица результатов и лог
+
+import os
+import time
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+from typing import List, Optional, Tuple
+
+from results import ResultStore, format_age
+
+STATUS_ICONS = {
+    "pending": "⏳",
+    "processing": "🔄",
+    "success": "✅",
+    "cached": "🗄️",
+    "error": "❌",
+    "timeout": "⌛",
+    "throttled": "🚦",
+    "not_found": "❓",
+}
+
+
+class VirtualResultTable:
+    """Таблица результатов, в которой Treeview держит только видимое окно строк.
+
+    Данные живут в ResultStore (колонки names/prices/statuses/urls); в Treeview создаётся
+    ровно столько строк-слотов, сколько помещается на экран, и при прокрутке
+    в них переписываются значения. Изменения копятся и выводятся одним refresh()
+    за тик интерфейса; перерисовываются только слоты, у которых поменялись значения.
+    """
+
+    COLUMNS = (
+        ("№", "№", 50, tk.CENTER),
+        ("Название", "Название товара", 400, tk.W),
+        ("Цена", "Цена", 120, tk.CENTER),
+        ("Статус", "Статус", 100, tk.CENTER),
+        ("Ссылка", "Ссылка", 80, tk.CENTER),
+    )
+
+    def __init__(self, parent, rows: ResultStore, height: int = 10):
+        self.rows = rows
+        self.offset = 0
+        self.page = height
+        self.follow = True
+        self.dirty = True
+        self._slot_values: List[tuple] = []
+
+        self.tree = ttk.Treeview(parent, columns=[c[0] for c in self.COLUMNS], show="headings", height=height)
+        for name, title, width, anchor in self.COLUMNS:
+            self.tree.heading(name, text=title)
+            self.tree.column(name, width=width, anchor=anchor)
+
+        self.v_scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.h_scrollbar = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.h_scrollbar.set)
+
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Configure>", self._on_resize)
+
+    def format_row(self, index: int) -> tuple:
+        rows = self.rows
+        name = rows.names[index]
+        price = rows.prices[index] or "—"
+        if rows.cached_at[index]:
+            price = f"{price} · {format_age(time.time() - rows.cached_at[index])}"
+        return (
+            index + 1,
+            name[:60] + ("..." if len(name) > 60 else ""),
+            price,
+            STATUS_ICONS.get(rows.statuses[index], "❓"),
+            "🔗" if rows.urls[index] else "",
+        )
+
+    def touch(self, index: int):
+        """Строка index изменилась; в режиме слежения окно сдвигается к ней"""
+        if self.follow and not (self.offset <= index < self.offset + self.page):
+            self.offset = max(0, index - self.page + 1)
+            self.dirty = True
+        elif self.offset <= index < self.offset + self.page:
+            self.dirty = True
+
+    def reset(self):
+        """Данные заменены целиком (новый файл или очистка)"""
+        self.offset = 0
+        self.follow = True
+        self.dirty = True
+
+    def refresh(self):
+        """Переписывает слоты видимого окна; вызывается раз за тик"""
+        if not self.dirty:
+            return
+        self.dirty = False
+        total = len(self.rows)
+        self.offset = max(0, min(self.offset, total - self.page))
+
+        visible = []
+        for slot in range(self.page):
+            index = self.offset + slot
+            if index >= total:
+                break
+            visible.append(self.format_row(index))
+
+        for slot, values in enumerate(visible):
+            iid = f"slot_{slot}"
+            if slot >= len(self._slot_values):
+                self.tree.insert("", "end", iid=iid, values=values)
+                self._slot_values.append(values)
+            elif self._slot_values[slot] != values:
+                self.tree.item(iid, values=values)
+                self._slot_values[slot] = values
+
+        for slot in range(len(visible), len(self._slot_values)):
+            self.tree.delete(f"slot_{slot}")
+        del self._slot_values[len(visible):]
+
+        if total:
+            self.v_scrollbar.set(self.offset / total, min(1.0, (self.offset + self.page) / total))
+        else:
+            self.v_scrollbar.set(0.0, 1.0)
+
+    def scroll(self, delta: int):
+        total = len(self.rows)
+        self.offset = max(0, min(self.offset + delta, max(0, total - self.page)))
+        # Пользователь долистал до конца - снова следим за обрабатываемыми товарами
+        self.follow = self.offset >= total - self.page
+        self.dirty = True
+        self.refresh()
+
+    def _on_scrollbar(self, *args):
+        total = len(self.rows)
+        if args[0] == "moveto":
+            self.scroll(int(float(args[1]) * total) - self.offset)
+        elif args[0] == "scroll":
+            step = self.page if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        page = max(1, (event.height - 25) // row_height)
+        if page != self.page:
+            self.page = page
+            self.dirty = True
+            self.refresh()
+
+    def index_of(self, iid: str) -> Optional[int]:
+        """Номер строки данных по слоту Treeview"""
+        try:
+            slot = int(iid.split("_")[1])
+        except (IndexError, ValueError):
+            return None
+        index = self.offset + slot
+        return index if index < len(self.rows) else None
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self._slot_values.clear()
+        self.reset()
+
+
+LOG_LEVELS = ("INFO", "SUCCESS", "WARNING", "ERROR")
+
+
+class RingLogView:
+    """Лог GUI с ограниченным окном: в виджете остаются последние max_lines строк,
+    полный лог пишется в файл.
+
+    append() не трогает Tk - строки копятся и вставляются одним вызовом insert
+    в flush() раз за тик. Фильтр уровней скрывает строки через elide у тега
+    уровня, поэтому переключение не перерисовывает буфер.
+    """
+
+    def __init__(self, parent, max_lines: int = 2000, log_path: Optional[str] = None, height: int = 6):
+        self.max_lines = max_lines
+        self.log_path = log_path
+        self.lines = 0
+        self._pending: List[Tuple[str, str]] = []
+        self._file = None
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._file = open(log_path, 'a', encoding='utf-8')
+
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill=tk.X)
+        ttk.Label(filter_frame, text="Показывать:").pack(side=tk.LEFT)
+        self.visible = {}
+        for level in LOG_LEVELS:
+            var = tk.BooleanVar(value=True)
+            ttk.Checkbutton(filter_frame, text=level, variable=var,
+                            command=lambda lv=level: self.apply_filter(lv)).pack(side=tk.LEFT, padx=(5, 0))
+            self.visible[level] = var
+        if log_path:
+            ttk.Label(filter_frame, text=f"Полный лог: {log_path}", foreground="gray").pack(side=tk.RIGHT)
+
+        self.text = scrolledtext.ScrolledText(parent, height=height, wrap=tk.WORD)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.text.tag_config("INFO", foreground="black")
+        self.text.tag_config("SUCCESS", foreground="green", font=("Arial", 9, "bold"))
+        self.text.tag_config("ERROR", foreground="red", font=("Arial", 9, "bold"))
+        self.text.tag_config("WARNING", foreground="orange", font=("Arial", 9, "bold"))
+
+    def append(self, message: str, level: str = "INFO"):
+        line = f"[{time.strftime('%H:%M:%S')}] {message}\n"
+        self._pending.append((line, level))
+        if self._file is not None:
+            self._file.write(f"{level:<8}{line}")
+
+    def flush(self):
+        """Вставляет накопленные строки одним insert и обрезает начало до max_lines"""
+        if not self._pending:
+            return
+        pending = self._pending[-self.max_lines:]
+        self._pending = []
+
+        args = []
+        for line, level in pending:
+            args.extend((line, level))
+        self.text.insert(tk.END, *args)
+        self.lines += sum(line.count("\n") for line, _ in pending)
+
+        excess = self.lines - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.lines -= excess
+        self.text.see(tk.END)
+
+        if self._file is not None:
+            self._file.flush()
+
+    def apply_filter(self, level: str):
+        self.text.tag_config(level, elide=not self.visible[level].get())
+
+    def clear(self):
+        """Очищает окно; файл полного лога не трогается"""
+        self._pending = []
+        self.text.delete("1.0", tk.END)
+        self.lines = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -6,8 +6,11 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from tender_parser import parse_tender_excel
-from utils import extract_products_from_excel
+# pandas, selenium и openpyxl (через tender_parser/utils) грузятся только в консольном
+# режиме, в момент первого использования: баннер, проверки и --help не ждут их импорта
+from driver_session import RecyclePolicy
+from results import NoProductsError, is_priced
+import profiler
 
 def show_banner():
     banner = f"""
@@ -65,6 +68,178 @@ def check_multiprocessing():
         print("❌ Многопоточность не поддерживается")
         return False
 
+def rebuild_snapshots(target: str, output: str = "auto") -> int:
+    """--rebuild: тендерные таблицы из снимков, записанных при аварийном завершении"""
+    from snapshot import find_snapshots, rebuild_from_snapshot
+    
+    paths = find_snapshots() if target == "pending" else [target]
+    if not paths:
+        print("📦 Снимков для восстановления нет")
+        return 0
+    
+    failed = 0
+    for path in paths:
+        try:
+            output_file = rebuild_from_snapshot(path, None if output == "auto" or len(paths) > 1 else output)
+            print(f"✅ {os.path.basename(path)} → {output_file}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {path}: {e}")
+    return 1 if failed else 0
+
+def export_from_db(db_path: str, tender: str, output: str = "auto") -> int:
+    """--export: тендерная таблица из базы истории цен без повторного парсинга"""
+    from price_db import PriceDB
+    
+    if not os.path.exists(db_path):
+        print(f"❌ База истории цен не найдена: {db_path}")
+        return 1
+    with PriceDB(db_path) as db:
+        tender_id = db.last_tender_id() if tender == "last" else int(tender)
+        if tender_id is None:
+            print("🗄️ В базе нет тендеров")
+            return 1
+        try:
+            output_file = db.export_tender(tender_id, None if output == "auto" else output)
+        except Exception as e:
+            print(f"❌ Тендер #{tender_id}: {e}")
+            return 1
+    print(f"✅ Тендер #{tender_id} → {output_file}")
+    return 0
+
+def show_history(db_path: str, query: str, limit: int = 20) -> int:
+    """--history: последние цены товара из базы"""
+    from price_db import PriceDB
+    
+    if not os.path.exists(db_path):
+        print(f"❌ База истории цен не найдена: {db_path}")
+        return 1
+    with PriceDB(db_path) as db:
+        rows = db.history(query, limit)
+    if not rows:
+        print(f"🗄️ Нет истории по запросу: {query}")
+        return 0
+    print(f"🗄️ История цен: {query}")
+    for row in rows:
+        scraped = datetime.fromtimestamp(row['scraped_at']).strftime("%Y-%m-%d %H:%M")
+        print(f"  {scraped}  #{row['tender_id']}  {row['price'] or '—'}  "
+              f"юрлица: {row['business_price'] or '—'}  {row['url']}")
+    return 0
+
+def start_profiling(args):
+    """--profile: включает профилировщик; префикс файлов отчёта или None"""
+    if not args.profile:
+        return None
+    profile_prefix = profiler.default_prefix() if args.profile == "auto" else args.profile
+    profiler.enable_profiling(interval=args.profile_interval / 1000, slowest=args.profile_slowest)
+    print(f"🔬 Профилирование включено: {profile_prefix}.collapsed / {profile_prefix}.json")
+    return profile_prefix
+
+def finish_profiling(profile_prefix):
+    if profiler.PROFILER is not None:
+        profiler.PROFILER.stop()
+        profiler.PROFILER.log_report()
+        paths = profiler.PROFILER.write(profile_prefix)
+        profiler.disable_profiling()
+        print(f"  🔬 Профиль: {paths['collapsed']} (стеки), {paths['summary']} (сводка)")
+
+def timings_path(args):
+    """--timings: файл замеров этапов (auto - timings_<время>.jsonl) или None"""
+    if args.timings == "auto":
+        return f"timings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    return args.timings
+
+def run_batch(args, db_path, refresh_older_than) -> int:
+    """--batch: все тендеры каталога/шаблона одним пулом браузеров"""
+    from batch import find_tender_files, parse_tender_batch
+    
+    files = find_tender_files(args.input_file)
+    if not files:
+        print(f"❌ Тендерные файлы не найдены: {args.input_file}")
+        return 1
+    
+    output_dir = args.output
+    if output_dir == "auto":
+        output_dir = f"batch_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    recycle_policy = RecyclePolicy(max_navigations=args.recycle_after,
+                                   max_age_minutes=args.recycle_minutes,
+                                   max_memory_mb=args.recycle_memory_mb)
+    
+    timings_file = timings_path(args)
+    
+    print(f"\n📚 Пакетный режим: {len(files)} файлов → {output_dir}")
+    print(f"  🧵 Потоков: {args.workers}, 🔐 авторизация: {'да' if args.auth else 'нет'}, "
+          f"🗄️ история цен: {db_path or 'нет'}")
+    
+    profile_prefix = start_profiling(args)
+    try:
+        summary = parse_tender_batch(
+            files,
+            output_dir,
+            headless=not args.no_headless,
+            workers=args.workers,
+            driver_path=args.driver_path,
+            use_business_auth=args.auth,
+            recycle_policy=recycle_policy,
+            item_budget=args.item_budget,
+            db_path=db_path,
+            refresh_older_than=refresh_older_than,
+            timings_file=timings_file,
+            trace_webdriver=args.trace_webdriver
+        )
+    except KeyboardInterrupt:
+        print("\n⚠️ Пакет прерван")
+        return 1
+    finally:
+        finish_profiling(profile_prefix)
+    
+    print(f"\n🎉 Пакет завершен за {summary['duration_s']:.1f} сек")
+    print(f"  📦 Уникальных товаров: {summary['unique_items']} (повторов: {summary['duplicates']}, "
+          f"из истории: {summary['reused']}, спарсено: {summary['scraped']})")
+    if timings_file:
+        print(f"  ⏱️ Замеры этапов: {timings_file}")
+    failed = 0
+    for tender in summary['tenders']:
+        if tender['output_file']:
+            print(f"  ✅ {os.path.basename(tender['input_file'])}: {tender['priced']}/{tender['items']} цен "
+                  f"→ {tender['output_file']}")
+        else:
+            failed += 1
+            print(f"  ❌ {os.path.basename(tender['input_file'])}: {tender['error'] or 'не сохранён'}")
+    return 1 if failed else 0
+
+def run_watch(args, db_path, refresh_older_than) -> int:
+    """--watch: служба, разбирающая тендеры из <каталог>/inbox на постоянно запущенных браузерах"""
+    from watch_service import WatchService
+    
+    recycle_policy = RecyclePolicy(max_navigations=args.recycle_after,
+                                   max_age_minutes=args.recycle_minutes,
+                                   max_memory_mb=args.recycle_memory_mb)
+    service = WatchService(
+        args.watch,
+        headless=not args.no_headless,
+        workers=args.workers,
+        driver_path=args.driver_path,
+        use_business_auth=args.auth,
+        recycle_policy=recycle_policy,
+        item_budget=args.item_budget,
+        auto_save=not args.no_auto_save,
+        db_path=db_path,
+        refresh_older_than=refresh_older_than
+    )
+    
+    print(f"\n👀 Режим службы: {service.dirs['inbox']} → {service.dirs['outbox']}")
+    print(f"  🧵 Потоков: {args.workers}, 🔐 авторизация: {'да' if args.auth else 'нет'}, "
+          f"🗄️ история цен: {db_path or 'нет'}")
+    print(f"  📋 Состояние: {service.status_path}")
+    print("  Остановка: Ctrl+C (очередь продолжится при следующем запуске)")
+    
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
+    return 0
+
 def main():
     show_banner()
     
@@ -77,9 +252,82 @@ def main():
     parser.add_argument("--driver-path", default=None)
     parser.add_argument("--auth", action="store_true")
     parser.add_argument("--no-auto-save", action="store_true")
+    parser.add_argument("--recycle-after", type=int, default=150,
+                        help="Пересоздавать драйвер после N переходов (0 - никогда)")
+    parser.add_argument("--recycle-minutes", type=float, default=20.0,
+                        help="Пересоздавать драйвер старше M минут (0 - никогда)")
+    parser.add_argument("--recycle-memory-mb", type=float, default=1500.0,
+                        help="Пересоздавать драйвер при памяти браузера выше порога, МБ (0 - никогда)")
+    parser.add_argument("--timings", nargs="?", const="auto", default=None,
+                        help="Писать замеры этапов по товарам в JSONL (по умолчанию timings_<время>.jsonl)")
+    parser.add_argument("--trace-webdriver", action="store_true",
+                        help="Считать команды WebDriver по типам и местам вызова")
+    parser.add_argument("--item-budget", type=float, default=90.0,
+                        help="Бюджет времени на один товар, сек (0 - без ограничения)")
+    parser.add_argument("--profile", nargs="?", const="auto", default=None,
+                        help="Профилировать прогон: <префикс>.collapsed и <префикс>.json (по умолчанию profile_<время>)")
+    parser.add_argument("--profile-interval", type=float, default=5.0,
+                        help="Шаг снятия стеков профилировщиком, мс")
+    parser.add_argument("--profile-slowest", type=int, default=10,
+                        help="Сколько самых медленных товаров разбирать в отчёте профиля")
+    parser.add_argument("--rebuild", nargs="?", const="pending", default=None, metavar="SNAPSHOT",
+                        help="Собрать тендерную таблицу из снимка аварийного завершения и выйти "
+                             "(без пути - из всех снимков в текущем каталоге)")
+    parser.add_argument("--db", default=None,
+                        help="База истории цен SQLite. История ведётся по умолчанию (отключает --no-db) - "
+                             "в prices.db рядом с программой, а не в текущем каталоге, или в PARSER_DB")
+    parser.add_argument("--no-db", action="store_true",
+                        help="Не вести историю цен: выгрузка пишется сразу из результатов прогона")
+    parser.add_argument("--export", nargs="?", const="last", default=None, metavar="TENDER_ID",
+                        help="Собрать тендерную таблицу из базы истории и выйти (без id - последний тендер)")
+    parser.add_argument("--history", default=None, metavar="QUERY",
+                        help="Показать историю цен товара из базы и выйти")
+    parser.add_argument("--batch", action="store_true",
+                        help="Пакетный режим: input_file - каталог или шаблон (\"tenders/*.xlsx\"), "
+                             "-o - каталог выгрузок; одинаковые товары парсятся один раз")
+    parser.add_argument("--watch", default=None, metavar="DIR",
+                        help="Режим службы: тендеры из DIR/inbox в очередь, выгрузки в DIR/outbox, "
+                             "состояние в DIR/status.json; браузеры не закрываются между тендерами")
+    parser.add_argument("--refresh-older-than", default=None, metavar="AGE",
+                        help="Парсить только товары, чья цена в истории старше AGE (90m, 36h, 7d), "
+                             "пустая или с ошибкой; остальные цены взять из истории")
     
     args = parser.parse_args()
     
+    if args.watch:
+        instrumented = [flag for flag, enabled in (("--timings", args.timings), ("--trace-webdriver", args.trace_webdriver),
+                                                   ("--profile", args.profile)) if enabled]
+        if instrumented:
+            parser.error(f"--watch несовместим с {', '.join(instrumented)}: служба не завершается, "
+                         f"замеры снимайте на отдельном тендере в консольном или пакетном режиме")
+    
+    if args.rebuild:
+        return rebuild_snapshots(args.rebuild, args.output)
+    
+    db_path = None
+    if not args.no_db:
+        from price_db import resolve_db_path
+        db_path = resolve_db_path(args.db)
+    if args.export or args.history:
+        if db_path is None:
+            print("❌ --export и --history работают только с базой истории цен")
+            return 1
+        if args.export:
+            return export_from_db(db_path, args.export, args.output)
+        return show_history(db_path, args.history)
+    
+    refresh_older_than = None
+    if args.refresh_older_than:
+        if db_path is None:
+            print("❌ --refresh-older-than работает только с базой истории цен")
+            return 1
+        from price_db import parse_age
+        try:
+            refresh_older_than = parse_age(args.refresh_older_than)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    
     print("🔍 Проверяю зависимости...")
     
     if not check_edge_driver():
@@ -106,7 +354,8 @@ def main():
             import tkinter as tk
             
             root = tk.Tk()
-            app = ParserGUI(root)
+            profile_prefix = None if args.profile in (None, "auto") else args.profile
+            app = ParserGUI(root, profile=args.profile is not None, profile_prefix=profile_prefix)
             print("✅ GUI запущен")
             root.mainloop()
         except ImportError as e:
@@ -120,6 +369,12 @@ def main():
         
         return 0
     
+    if args.watch:
+        return run_watch(args, db_path, refresh_older_than)
+    
+    if args.batch:
+        return run_batch(args, db_path, refresh_older_than)
+    
     # Консольный режим
     print("\n🔍 Консольный режим...")
     
@@ -127,17 +382,12 @@ def main():
         print(f"❌ Входной файл не найден: {args.input_file}")
         return 1
     
+    profile_prefix = start_profiling(args)
+    
     try:
-        products_df = extract_products_from_excel(args.input_file)
-        if products_df.empty:
-            print(f"❌ Товары не найдены в файле: {args.input_file}")
-            return 1
-        
-        print(f"📦 Найдено товаров: {len(products_df)}")
-        
-        for i, name in enumerate(products_df['name'].head(3), 1):
-            short_name = name[:50] + "..." if len(name) > 50 else name
-            print(f"  {i}. {short_name}")
+        # Файл тендера читается один раз - внутри parse_tender_excel, параллельно
+        # с запуском браузеров; первые товары уходят в работу по мере чтения
+        from tender_parser import parse_tender_excel
         
         if args.output == "auto":
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -148,13 +398,28 @@ def main():
         
         headless = not args.no_headless
         auto_save = not args.no_auto_save
+        timings_file = timings_path(args)
+        recycle_policy = RecyclePolicy(max_navigations=args.recycle_after,
+                                       max_age_minutes=args.recycle_minutes,
+                                       max_memory_mb=args.recycle_memory_mb)
         
         print(f"\n⚙️ Настройки:")
         print(f"  🧵 Потоков: {args.workers}")
         print(f"  👁️ Режим: {'скрытый' if headless else 'видимый'}")
         print(f"  🔐 Авторизация: {'да' if args.auth else 'нет'}")
         print(f"  💾 Автосохранение: {'да' if auto_save else 'нет'}")
+        print(f"  ⏱️ Бюджет на товар: {args.item_budget:g} сек")
+        print(f"  ♻️ Пересоздание драйвера: {args.recycle_after} переходов / "
+              f"{args.recycle_minutes:g} мин / {args.recycle_memory_mb:g} МБ")
         print(f"  📄 Выходной файл: {output_file}")
+        print(f"  🗄️ История цен: {db_path or 'нет'}")
+        if refresh_older_than is not None:
+            print(f"  ♻️ Обновление: только цены старше {args.refresh_older_than}, пустые и ошибочные")
+        
+        # Прошлый прогон упал по сигналу - сначала собираем его выгрузку из снимка
+        from snapshot import rebuild_pending
+        for rebuilt in rebuild_pending(".", os.path.dirname(os.path.abspath(output_file))):
+            print(f"📦 Восстановлена выгрузка прошлого прогона: {rebuilt}")
         
         print(f"\n🚀 Начинаю парсинг...")
         start_time = time.time()
@@ -166,37 +431,66 @@ def main():
             workers=args.workers,
             driver_path=args.driver_path,
             auto_save=auto_save,
-            use_business_auth=args.auth
+            use_business_auth=args.auth,
+            recycle_policy=recycle_policy,
+            item_budget=args.item_budget,
+            timings_file=timings_file,
+            trace_webdriver=args.trace_webdriver,
+            db_path=db_path,
+            refresh_older_than=refresh_older_than
         )
         
         end_time = time.time()
         duration = end_time - start_time
         
         total = len(result_df)
-        regular_count = len([r for r in result_df['цена'] if r and r != 'ОШИБКА'])
+        regular_count = sum(1 for r in result_df['цена'] if is_priced(r))
         
         print(f"\n🎉 Парсинг завершен!")
         print(f"⏱️ Время: {duration:.1f} сек")
         print(f"📊 Статистика:")
         print(f"  📦 Всего товаров: {total}")
+        if refresh_older_than is not None:
+            reused = result_df.attrs.get('reused', 0)
+            print(f"  ♻️ Из истории: {reused}, обновлено: {total - reused}")
         print(f"  💰 Обычных цен: {regular_count}")
         
         if args.auth:
-            business_count = len([r for r in result_df.get('цена для юрлиц', []) if r and r != 'ОШИБКА'])
+            business_count = sum(1 for r in result_df.get('цена для юрлиц', []) if is_priced(r))
             print(f"  💼 Цен для юрлиц: {business_count}")
         
+        run_stats = result_df.attrs.get('run_stats', {})
+        if run_stats:
+            print(f"  🚗 Драйверов создано: {run_stats.get('drivers_created', 0)}")
+            print(f"  ♻️ Пересозданий: {run_stats.get('recycled', 0)}")
+            print(f"  ⏱️ Таймаутов: {run_stats.get('timeouts', 0)}")
+            print(f"  🔁 Отложено на повтор: {run_stats.get('deferred', 0)}, "
+                  f"спасено: {run_stats.get('recovered', 0)}")
+            print(f"  🚦 Капч/ограничений: {run_stats.get('throttle_events', 0)}, "
+                  f"потоков в конце: {run_stats.get('concurrency', args.workers)}")
+
+        if timings_file:
+            print(f"  ⏱️ Замеры этапов: {timings_file}")
         print(f"  📄 Результаты: {output_file}")
+        if 'tender_id' in result_df.attrs:
+            print(f"  🗄️ Тендер #{result_df.attrs['tender_id']} в {db_path} "
+                  f"(повторная выгрузка: --export {result_df.attrs['tender_id']})")
         
         return 0
         
     except KeyboardInterrupt:
         print("\n⚠️ Парсинг прерван")
         return 1
+    except NoProductsError as e:
+        print(f"\n❌ Товары не прочитаны из {args.input_file}: {e}")
+        return 1
     except Exception as e:
         print(f"\n❌ Критическая ошибка: {e}")
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        finish_profiling(profile_prefix)
 
 if __name__ == "__main__":
     exit_code = main()
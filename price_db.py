@@ -0,0 +1,249 @@
+# price_db.py - история цен в локальной базе SQLite
+#
+# Каждый полученный результат товара пишется строкой в prices (запрос, ссылка,
+# цены строкой и числом, время, тендер). База в режиме WAL: читатели не ждут
+# писателя, а несколько процессов парсера могут писать одновременно (ждут друг
+# друга не дольше BUSY_TIMEOUT). Тендерная таблица собирается из базы, поэтому
+# повторная выгрузка не требует нового парсинга.
+#
+# Режим обновления (reusable / reuse): свежая успешная цена товара берётся
+# из истории, а парсятся только устаревшие, пустые и ошибочные позиции. Позиция
+# тендера ссылается на переиспользованную строку prices (reused_price_id), так что
+# история не дублируется, а выгрузка знает дату каждой взятой из неё цены.
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from results import ProductResult, ResultStore, NO_PRICE
+
+logger = logging.getLogger(__name__)
+
+# База по умолчанию - prices.db рядом с программой, как логи и выгрузки GUI, а не в
+# текущем каталоге: запуск из другого каталога не заводит новую пустую историю
+# (переопределяется PARSER_DB)
+DEFAULT_DB_PATH = os.environ.get("PARSER_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "prices.db")
+
+
+def resolve_db_path(path: Optional[str] = None) -> str:
+    """Путь базы: явный, иначе PARSER_DB, иначе prices.db рядом с программой (одинаково в CLI и GUI)"""
+    return os.path.abspath(path or DEFAULT_DB_PATH)
+
+
+# Сколько ждать блокировку записи другого процесса, мс
+BUSY_TIMEOUT_MS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenders (
+    id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL,
+    output_file TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    items INTEGER
+);
+CREATE TABLE IF NOT EXISTS tender_items (
+    tender_id INTEGER NOT NULL REFERENCES tenders(id),
+    position INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    reused_price_id INTEGER REFERENCES prices(id),
+    PRIMARY KEY (tender_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS prices (
+    id INTEGER PRIMARY KEY,
+    tender_id INTEGER REFERENCES tenders(id),
+    position INTEGER,
+    query TEXT NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    price TEXT NOT NULL DEFAULT '',
+    business_price TEXT NOT NULL DEFAULT '',
+    price_num REAL,
+    business_num REAL,
+    status TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prices_query_time ON prices (query, scraped_at);
+CREATE INDEX IF NOT EXISTS prices_tender_position ON prices (tender_id, position);
+CREATE INDEX IF NOT EXISTS prices_url ON prices (url) WHERE url != '';
+"""
+
+
+AGE_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400,
+             'мин': 60, 'ч': 3600, 'д': 86400, 'дн': 86400, 'н': 7 * 86400}
+
+
+def parse_age(text: str) -> float:
+    """Возраст в секундах из "90m", "36h", "7d", "2w" (или 90мин/36ч/7д/2н); число без единицы - часы"""
+    match = re.fullmatch(r'\s*(\d+(?:[.,]\d+)?)\s*([a-zа-я]*)\s*', str(text).lower())
+    if not match:
+        raise ValueError(f"Непонятный возраст: {text!r} (пример: 36h, 7d)")
+    value = float(match.group(1).replace(',', '.'))
+    unit = match.group(2) or 'h'
+    if unit not in AGE_UNITS:
+        raise ValueError(f"Неизвестная единица возраста: {unit!r} (m, h, d, w)")
+    return value * AGE_UNITS[unit]
+
+
+def _number(value: float) -> Optional[float]:
+    """inf (цены нет) хранится как NULL"""
+    return None if value == NO_PRICE else value
+
+
+class PriceDB:
+    """Соединение с базой цен; методы потокобезопасны (одно соединение под блокировкой)"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+            self._conn.commit()
+
+    def _migrate(self):
+        """Колонки, добавленные после создания базы"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tender_items)")}
+        if 'reused_price_id' not in columns:
+            self._conn.execute("ALTER TABLE tender_items ADD COLUMN reused_price_id INTEGER")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- запись ---
+
+    def start_tender(self, input_file: str, output_file: Optional[str] = None) -> int:
+        """Регистрирует прогон тендера; id тендера"""
+        output_file = os.path.abspath(output_file) if output_file and output_file != "auto" else None
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO tenders (input_file, output_file, started_at) VALUES (?, ?, ?)",
+                (os.path.abspath(input_file), output_file, time.time()))
+            return cursor.lastrowid
+
+    def add_items(self, tender_id: int, names: Iterable[str]):
+        """Список товаров тендера в порядке файла (повторный вызов дописывает новые)"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tender_items (tender_id, position, query) VALUES (?, ?, ?)",
+                ((tender_id, position, name) for position, name in enumerate(names)))
+
+    def reuse(self, tender_id: int, position: int, query: str, price_id: int):
+        """Позиция тендера берёт цену из строки истории price_id вместо парсинга"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO tender_items (tender_id, position, query, reused_price_id) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (tender_id, position) DO UPDATE SET reused_price_id = excluded.reused_price_id",
+                (tender_id, position, query, price_id))
+
+    def record(self, tender_id: Optional[int], position: Optional[int], query: str,
+               result: ProductResult, scraped_at: Optional[float] = None):
+        """Пишет результат товара (в том числе пустой и с отметкой ошибки)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO prices (tender_id, position, query, url, price, business_price, "
+                "price_num, business_num, status, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (tender_id, position, query, result.url, result.price, result.business_price,
+                 _number(result.price_num), _number(result.business_num), result.status,
+                 scraped_at if scraped_at is not None else time.time()))
+
+    def finish_tender(self, tender_id: int, items: int):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE tenders SET finished_at = ?, items = ? WHERE id = ?",
+                               (time.time(), items, tender_id))
+
+    # --- чтение ---
+
+    def tender(self, tender_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tenders WHERE id = ?", (tender_id,)).fetchone()
+        return dict(row) if row else None
+
+    def last_tender_id(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM tenders").fetchone()
+        return row[0]
+
+    def tender_results(self, tender_id: int) -> ResultStore:
+        """Последний результат по каждой позиции тендера (цены из истории - с cached_at)"""
+        with self._lock:
+            names = [row[0] for row in self._conn.execute(
+                "SELECT query FROM tender_items WHERE tender_id = ? ORDER BY position", (tender_id,))]
+            rows = self._conn.execute(
+                "SELECT position, price, business_price, url FROM prices "
+                "WHERE tender_id = ? ORDER BY id", (tender_id,)).fetchall()
+            reused = self._conn.execute(
+                "SELECT ti.position, p.price, p.business_price, p.url, p.scraped_at FROM tender_items ti "
+                "JOIN prices p ON p.id = ti.reused_price_id WHERE ti.tender_id = ?", (tender_id,)).fetchall()
+
+        results = ResultStore(names)
+        for position, price, business_price, url, scraped_at in reused:
+            if position < len(results):
+                results.set(position, ProductResult(price, business_price, url), cached_at=scraped_at)
+        for position, price, business_price, url in rows:
+            if position is not None and position < len(results):
+                results.set(position, ProductResult(price, business_price, url))
+        return results
+
+    def reusable(self, query: str, max_age: float,
+                 now: Optional[float] = None) -> Optional[Tuple[int, ProductResult, float]]:
+        """(id строки, результат, время получения) последней цены товара, если её можно не обновлять.
+
+        Переиспользуется только успешный результат не старше max_age секунд: пустой,
+        ошибочный или устаревший последний результат значит, что товар надо парсить.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, price, business_price, url, status, scraped_at FROM prices "
+                "WHERE query = ? ORDER BY scraped_at DESC LIMIT 1", (query,)).fetchone()
+        if row is None or row['status'] != 'success':
+            return None
+        if (now or time.time()) - row['scraped_at'] > max_age:
+            return None
+        return row['id'], ProductResult(row['price'], row['business_price'], row['url']), row['scraped_at']
+
+    def history(self, query: str, limit: int = 20) -> List[Dict]:
+        """Последние результаты по запросу, новые первыми"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tender_id, url, price, business_price, price_num, business_num, status, scraped_at "
+                "FROM prices WHERE query = ? ORDER BY scraped_at DESC LIMIT ?", (query, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    # --- выгрузка ---
+
+    def export_tender(self, tender_id: int, output_file: Optional[str] = None) -> str:
+        """Тендерная таблица из базы; путь выгрузки"""
+        from utils import save_results_into_tender_format
+
+        tender = self.tender(tender_id)
+        if tender is None:
+            raise ValueError(f"Тендер {tender_id} не найден в {self.path}")
+        output_file = output_file or tender['output_file']
+        if not output_file:
+            stem, _ = os.path.splitext(tender['input_file'])
+            output_file = f"{stem}_results_{tender_id}.xlsx"
+
+        results = self.tender_results(tender_id)
+        if not len(results):
+            raise ValueError(f"У тендера {tender_id} нет товаров")
+        if not save_results_into_tender_format(tender['input_file'], output_file, results.to_dataframe()):
+            raise RuntimeError(f"Не удалось записать {output_file}")
+        return output_file
@@ -0,0 +1,220 @@
+# process_registry.py - учёт процессов браузера, запущенных этим прогоном
+#
+# Вместо обхода всех процессов системы (msedge по имени, cmdline с путём профиля)
+# реестр хранит PID дерева процессов каждого драйвера: msedgedriver и его потомков.
+# Проверка "профиль ещё занят" и закрытие зависших браузеров трогают только свои
+# процессы. Реестр дублируется в файл run_<pid>.json: если прогон упал, следующий
+# запуск закроет его браузеры, не задевая Edge пользователя и параллельные прогоны.
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+PID_DIR = os.path.join(tempfile.gettempdir(), "yandex_parser_pids")
+
+# Допуск при сравнении времени создания процесса (защита от повторного использования PID)
+CREATE_TIME_TOLERANCE = 1.0
+
+
+def _driver_tree(driver) -> Dict[int, float]:
+    """PID -> время создания для msedgedriver драйвера и всех его потомков"""
+    if psutil is None:
+        return {}
+
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if process is None:
+        return {}
+
+    try:
+        root = psutil.Process(process.pid)
+        procs = [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return {}
+
+    tree = {}
+    for proc in procs:
+        try:
+            tree[proc.pid] = proc.create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return tree
+
+
+def _same_process(pid: int, created: float):
+    """psutil.Process, если pid всё ещё тот же процесс, иначе None"""
+    if psutil is None:
+        return None
+    try:
+        proc = psutil.Process(pid)
+        if abs(proc.create_time() - created) > CREATE_TIME_TOLERANCE:
+            return None
+        if proc.status() == psutil.STATUS_ZOMBIE:
+            return None
+        return proc
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+class ProcessRegistry:
+    """PID процессов браузера по ключу (каталогу профиля драйвера)"""
+
+    def __init__(self, pid_dir: str = PID_DIR):
+        self.pid_dir = pid_dir
+        self.pid_file = os.path.join(pid_dir, f"run_{os.getpid()}.json")
+        self._owned: Dict[str, Dict[int, float]] = {}
+        # RLock: terminate() из обработчика сигнала может прервать главный поток внутри register()
+        self._lock = threading.RLock()
+
+    def register(self, key: str, driver) -> int:
+        """Запоминает дерево процессов драйвера; повторный вызов добавляет новых потомков"""
+        tree = _driver_tree(driver)
+        if not key or not tree:
+            return 0
+        with self._lock:
+            self._owned.setdefault(key, {}).update(tree)
+            self._save()
+        return len(tree)
+
+    def owned(self, key: Optional[str] = None) -> Dict[int, float]:
+        with self._lock:
+            if key is not None:
+                return dict(self._owned.get(key, {}))
+            merged = {}
+            for tree in self._owned.values():
+                merged.update(tree)
+            return merged
+
+    def alive(self, key: str) -> Optional[bool]:
+        """Жив ли хоть один процесс ключа; None - psutil недоступен и проверить нельзя"""
+        if psutil is None:
+            return None
+        return any(_same_process(pid, created) is not None for pid, created in self.owned(key).items())
+
+    def forget(self, key: str):
+        with self._lock:
+            if self._owned.pop(key, None) is not None:
+                self._save()
+
+    def terminate(self, key: Optional[str] = None, kill: bool = False) -> int:
+        """Завершает свои процессы ключа (или все свои) и забывает их; число завершённых"""
+        if psutil is None:
+            return 0
+
+        count = 0
+        for pid, created in self.owned(key).items():
+            proc = _same_process(pid, created)
+            if proc is None:
+                continue
+            try:
+                proc.kill() if kill else proc.terminate()
+                count += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        with self._lock:
+            if key is None:
+                self._owned.clear()
+            else:
+                self._owned.pop(key, None)
+            self._save()
+        return count
+
+    def _records(self):
+        """(путь, запись, жив ли владелец) для файлов реестра других прогонов"""
+        if not os.path.isdir(self.pid_dir):
+            return
+        for name in os.listdir(self.pid_dir):
+            path = os.path.join(self.pid_dir, name)
+            if path == self.pid_file or not (name.startswith("run_") and name.endswith(".json")):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            owner = record.get('owner', {})
+            alive = bool(owner.get('pid')) and _same_process(owner['pid'], owner.get('created', 0)) is not None
+            yield path, record, alive
+
+    def live_keys(self) -> set:
+        """Ключи (профили) живых параллельных прогонов"""
+        if psutil is None:
+            return set()
+        keys = set()
+        for _, record, alive in self._records():
+            if alive:
+                keys.update(record.get('processes', {}).keys())
+        return keys
+
+    def reap_orphans(self) -> int:
+        """Закрывает браузеры упавших прогонов по их файлам реестра; число завершённых процессов"""
+        if psutil is None:
+            return 0
+        count = 0
+        for path, record, alive in list(self._records()):
+            if alive:
+                continue  # прогон жив - его процессы не трогаем
+
+            for tree in record.get('processes', {}).values():
+                for pid, created in tree.items():
+                    proc = _same_process(int(pid), created)
+                    if proc is None:
+                        continue
+                    try:
+                        proc.terminate()
+                        count += 1
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return count
+
+    def _save(self):
+        """Перезаписывает файл реестра (вызывается под self._lock)"""
+        try:
+            if not self._owned:
+                if os.path.exists(self.pid_file):
+                    os.remove(self.pid_file)
+                return
+            os.makedirs(self.pid_dir, exist_ok=True)
+            record = {
+                'owner': {'pid': os.getpid(), 'created': _own_create_time()},
+                'processes': {key: {str(pid): created for pid, created in tree.items()}
+                              for key, tree in self._owned.items()},
+            }
+            tmp_path = f"{self.pid_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self.pid_file)
+        except OSError as e:
+            logger.debug(f"Не удалось записать реестр процессов: {e}")
+
+
+_OWN_CREATE_TIME = None
+
+
+def _own_create_time() -> float:
+    global _OWN_CREATE_TIME
+    if _OWN_CREATE_TIME is None:
+        try:
+            _OWN_CREATE_TIME = psutil.Process().create_time()
+        except Exception:
+            _OWN_CREATE_TIME = 0.0
+    return _OWN_CREATE_TIME
+
+
+# Реестр процессов текущего прогона
+REGISTRY = ProcessRegistry()
@@ -0,0 +1,163 @@
+# profile_reaper.py - фоновое удаление каталогов профилей Edge
+#
+# Рабочий поток парсинга только отдаёт путь профиля в очередь и сразу берёт
+# следующий товар. Фоновый поток удаляет профили пачками; занятые каталоги
+# (браузер ещё не отпустил файлы) откладываются и повторяются с нарастающей паузой.
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def dir_size(path: str) -> int:
+    """Размер каталога в байтах (без перехода по ссылкам)"""
+    total = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+class ProfileReaper:
+    """Очередь каталогов профилей на удаление с фоновым потоком.
+
+    delete(path) -> bool - одна попытка удаления (False - каталог занят или не удалился);
+    on_deleted(path) вызывается после успешного удаления.
+    """
+
+    def __init__(self, delete: Callable[[str], bool], on_deleted: Optional[Callable[[str], None]] = None,
+                 batch_size: int = 16, retry_delay: float = 1.0, max_attempts: int = 8):
+        self.delete = delete
+        self.on_deleted = on_deleted
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.deleted = 0
+        self.failed = 0
+        self.bytes_reclaimed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._retries: List[Tuple[float, str, int]] = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._hurry = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, path: str):
+        """Ставит каталог в очередь на удаление; не блокирует вызывающий поток"""
+        if not path:
+            return
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="profile-reaper", daemon=True)
+                self._thread.start()
+        self._queue.put((path, 0))
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Ждёт, пока очередь опустеет (повторы - без пауз); False - не успели за timeout"""
+        self._hurry = True
+        try:
+            return self._idle.wait(timeout)
+        finally:
+            self._hurry = False
+
+    def _delay(self, attempts: int) -> float:
+        if self._hurry:
+            return 0.2
+        return self.retry_delay * min(2 ** (attempts - 1), 8)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                next_due = min((due for due, _, _ in self._retries), default=None)
+            timeout = 0.5 if next_due is None else max(0.0, min(0.5, next_due - time.monotonic()))
+
+            batch: List[Tuple[str, int]] = []
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            with self._lock:
+                due = [(path, attempts) for when, path, attempts in self._retries
+                       if when <= now or self._hurry]
+                self._retries = [entry for entry in self._retries if not (entry[0] <= now or self._hurry)]
+            batch.extend(due)
+
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, int]]):
+        deleted = 0
+        reclaimed = 0
+        for path, attempts in batch:
+            if not os.path.exists(path):
+                self._finish(path, 'gone')
+                continue
+            size = dir_size(path)
+            try:
+                ok = self.delete(path)
+            except Exception as e:
+                logger.debug(f"Ошибка удаления профиля {path}: {e}")
+                ok = False
+
+            if ok:
+                deleted += 1
+                reclaimed += size
+                self._finish(path, 'deleted', size)
+            elif attempts + 1 < self.max_attempts:
+                with self._lock:
+                    self._retries.append((time.monotonic() + self._delay(attempts + 1), path, attempts + 1))
+            else:
+                logger.debug(f"Профиль не удалён после {self.max_attempts} попыток: {path}")
+                self._finish(path, 'failed')
+
+        if deleted:
+            logger.debug(f"🧹 Удалено профилей: {deleted}, освобождено {reclaimed / (1024 * 1024):.1f} МБ")
+
+    def _finish(self, path: str, outcome: str, size: int = 0):
+        """outcome: deleted - удалён, gone - каталога уже нет, failed - попытки исчерпаны"""
+        if outcome != 'failed' and self.on_deleted is not None:
+            self.on_deleted(path)
+        with self._lock:
+            if outcome == 'deleted':
+                self.deleted += 1
+                self.bytes_reclaimed += size
+            elif outcome == 'failed':
+                self.failed += 1
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.set()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'deleted': self.deleted,
+                'failed': self.failed,
+                'pending': self._pending,
+                'reclaimed_mb': round(self.bytes_reclaimed / (1024 * 1024), 1),
+            }
@@ -0,0 +1,214 @@
+# profiler.py - сэмплирующий профилировщик всего прогона со сводкой по самым медленным товарам
+
+import os
+import sys
+import json
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Активный профилировщик; None - профилирование выключено и profile_item() ничего не делает
+PROFILER: Optional["SamplingProfiler"] = None
+
+
+def _thread_label(name: str) -> str:
+    """Имя потока без номера: все воркеры сливаются в один корень стека"""
+    return name.rstrip('0123456789-_') or name
+
+
+class SamplingProfiler:
+    """Раз в interval секунд снимает стеки всех потоков (sys._current_frames).
+
+    Работает на любой версии Python и не мешает cProfile/отладчику; стеки пишутся
+    в свёрнутом формате (flamegraph.pl, speedscope). Пока поток обрабатывает товар,
+    его стеки дополнительно копятся в записи товара - для самых медленных товаров
+    в отчёт попадает их собственная разбивка.
+    """
+
+    def __init__(self, interval: float = 0.005, slowest: int = 10, max_depth: int = 64):
+        self.interval = interval
+        self.slowest = slowest
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stacks: Counter = Counter()
+        self._active: Dict[int, dict] = {}
+        self._slowest: List[Tuple[float, int, dict]] = []
+        self._seq = 0
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+            self.duration = time.perf_counter() - self.started_at
+
+    def _loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(me)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame, root: str) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        names.append(root)
+        return ";".join(reversed(names))
+
+    def _sample(self, me: int):
+        frames = sys._current_frames()
+        threads = {t.ident: t.name for t in threading.enumerate()}
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = self._collapse(frame, _thread_label(threads.get(ident, "?")))
+                self._stacks[stack] += 1
+                record = self._active.get(ident)
+                if record is not None:
+                    record['stacks'][stack] += 1
+            self.samples += 1
+
+    @contextmanager
+    def item(self, index: int, name: str):
+        """Границы товара в текущем потоке"""
+        ident = threading.get_ident()
+        record = {'item': index + 1, 'name': name[:80], 'stacks': Counter()}
+        started = time.perf_counter()
+        with self._lock:
+            self._active[ident] = record
+        try:
+            yield record
+        finally:
+            record['duration'] = time.perf_counter() - started
+            with self._lock:
+                self._active.pop(ident, None)
+                self._seq += 1
+                entry = (record['duration'], self._seq, record)
+                if len(self._slowest) < self.slowest:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+    @staticmethod
+    def _top_functions(stacks: Counter, top: int) -> Tuple[List[dict], List[dict]]:
+        """Собственное (лист стека) и включённое (где угодно в стеке) число сэмплов по функциям"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for fn in set(frames[1:]):
+                inclusive[fn] += count
+        total = sum(stacks.values()) or 1
+        as_rows = lambda counter: [{'function': fn, 'samples': n, 'share': round(n / total, 4)}
+                                   for fn, n in counter.most_common(top)]
+        return as_rows(own), as_rows(inclusive)
+
+    def summary(self, top: int = 20) -> dict:
+        with self._lock:
+            stacks = Counter(self._stacks)
+            slowest = sorted(self._slowest, reverse=True)
+
+        own, inclusive = self._top_functions(stacks, top)
+        items = []
+        for duration, _, record in slowest:
+            item_own, _ = self._top_functions(record['stacks'], 8)
+            items.append({
+                'item': record['item'],
+                'name': record['name'],
+                'duration': round(duration, 3),
+                'samples': sum(record['stacks'].values()),
+                'top_self': item_own,
+                'top_stacks': [{'stack': stack, 'samples': n} for stack, n in record['stacks'].most_common(5)],
+            })
+        return {
+            'interval': self.interval,
+            'duration': round(self.duration, 2),
+            'samples': self.samples,
+            'top_self': own,
+            'top_inclusive': inclusive,
+            'slowest_items': items,
+        }
+
+    def write(self, prefix: str) -> Dict[str, str]:
+        """<prefix>.collapsed - свёрнутые стеки всего прогона, <prefix>.json - сводка"""
+        collapsed_path = f"{prefix}.collapsed"
+        summary_path = f"{prefix}.json"
+        with self._lock:
+            stacks = Counter(self._stacks)
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return {'collapsed': collapsed_path, 'summary': summary_path}
+
+    def log_report(self, top: int = 15):
+        summary = self.summary(top)
+        if not summary['samples']:
+            return
+        logger.info(f"🔬 Профиль: {summary['samples']} срезов за {summary['duration']} с "
+                    f"(шаг {self.interval * 1000:g} мс)")
+        logger.info("🔬 Собственное время (доля срезов всех потоков):")
+        for row in summary['top_self']:
+            logger.info(f"  {row['function']:<56} {row['share'] * 100:>6.1f}%")
+        if summary['slowest_items']:
+            logger.info(f"🔬 Самые медленные товары ({len(summary['slowest_items'])}):")
+            for item in summary['slowest_items']:
+                hot = ", ".join(f"{row['function']} {row['share'] * 100:.0f}%" for row in item['top_self'][:3])
+                logger.info(f"  #{item['item']} {item['duration']:.1f} с {item['name'][:40]} - {hot}")
+
+
+def default_prefix(directory: str = "") -> str:
+    """profile_<время> - имя файлов отчёта по умолчанию"""
+    from datetime import datetime
+    return os.path.join(directory, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+
+def enable_profiling(interval: float = 0.005, slowest: int = 10) -> SamplingProfiler:
+    """Запускает профилировщик; до disable_profiling() снимаются стеки всех потоков"""
+    global PROFILER
+    PROFILER = SamplingProfiler(interval=interval, slowest=slowest)
+    PROFILER.start()
+    return PROFILER
+
+
+def disable_profiling():
+    global PROFILER
+    if PROFILER is not None:
+        PROFILER.stop()
+    PROFILER = None
+
+
+def profile_item(index: int, name: str):
+    """Контекст товара для профилировщика; при выключенном профилировании - пустышка"""
+    profiler = PROFILER
+    if profiler is None:
+        return nullcontext()
+    return profiler.item(index, name)
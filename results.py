@@ -0,0 +1,217 @@
+# results.py - результаты парсинга товаров
+#
+# ProductResult - итог по одному товару (слоты, цены уже разобраны в числа).
+# ResultStore - результаты тендера по колонкам: строки цен и ссылок в списках,
+# числовые цены в array('d'). Запись результата - несколько присваиваний по индексу;
+# DataFrame собирается только при выгрузке (to_dataframe).
+
+import re
+import time
+import threading
+from array import array
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+# Отметка в колонке цены для товара, обработка которого упала с ошибкой
+ERROR_MARK = "ОШИБКА"
+# Отметка в колонке цены для товара, не уложившегося в бюджет времени
+TIMEOUT_MARK = "ТАЙМАУТ"
+# Отметка в колонке цены для товара, вместо страниц которого пришла капча
+THROTTLE_MARK = "КАПЧА"
+
+# Результаты, которые откладываются на повтор в конце прогона
+FAILED_MARKS = (ERROR_MARK, TIMEOUT_MARK, THROTTLE_MARK)
+
+# Статус строки по отметке в колонке цены
+MARK_STATUSES = {ERROR_MARK: "error", TIMEOUT_MARK: "timeout", THROTTLE_MARK: "throttled"}
+
+NO_PRICE = float('inf')
+
+# Колонка выгрузки с пометкой о цене, взятой из истории (price_db), а не полученной сейчас
+CACHED_COLUMN = 'из истории'
+
+
+class NoProductsError(ValueError):
+    """В файле тендера не найдено ни одного товара (или колонки 'Наименование')"""
+
+
+def parse_price_to_number(price_str: str) -> float:
+    """Конвертирует строку цены в число для сравнения"""
+    if not price_str:
+        return NO_PRICE  # Бесконечность для отсутствующих цен
+
+    try:
+        # Убираем все кроме цифр, запятых и точек
+        clean_price = re.sub(r'[^\d,.]', '', price_str)
+
+        # Заменяем запятые на точки для float
+        clean_price = clean_price.replace(',', '.')
+
+        # Убираем множественные точки (оставляем только последнюю)
+        if clean_price.count('.') > 1:
+            parts = clean_price.split('.')
+            clean_price = ''.join(parts[:-1]) + '.' + parts[-1]
+
+        return float(clean_price) if clean_price else NO_PRICE
+    except:
+        return NO_PRICE
+
+
+def is_priced(price: str) -> bool:
+    """В колонке цены есть цена, а не пусто и не отметка ошибки, таймаута или капчи"""
+    return bool(price) and price not in FAILED_MARKS
+
+
+def format_age(seconds: float) -> str:
+    """Возраст цены коротко: 40 мин, 5 ч, 3 дн."""
+    if seconds < 3600:
+        return f"{max(1, int(seconds // 60))} мин"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} ч"
+    return f"{int(seconds // 86400)} дн."
+
+
+def cached_note(scraped_at: float, now: Optional[float] = None) -> str:
+    """Пометка для цены из истории: дата получения и возраст"""
+    age = (now or time.time()) - scraped_at
+    return f"из истории: {datetime.fromtimestamp(scraped_at).strftime('%d.%m.%Y %H:%M')} ({format_age(age)})"
+
+
+class ProductResult:
+    """Цены товара как на сайте и их числовые значения (inf - цены нет)"""
+
+    __slots__ = ('price', 'business_price', 'url', 'price_num', 'business_num')
+
+    def __init__(self, price: str = "", business_price: str = "", url: str = ""):
+        self.price = price
+        self.business_price = business_price
+        self.url = url
+        self.price_num = NO_PRICE if price in FAILED_MARKS else parse_price_to_number(price)
+        self.business_num = NO_PRICE if business_price in FAILED_MARKS else parse_price_to_number(business_price)
+
+    @classmethod
+    def marked(cls, mark: str) -> "ProductResult":
+        """Результат-отметка (ERROR_MARK, TIMEOUT_MARK, THROTTLE_MARK) в обеих колонках цены"""
+        return cls(mark, mark, "")
+
+    @property
+    def failed(self) -> bool:
+        return self.price in FAILED_MARKS
+
+    @property
+    def status(self) -> str:
+        """success, not_found, error, timeout или throttled"""
+        if self.price in MARK_STATUSES:
+            return MARK_STATUSES[self.price]
+        return "success" if self.price else "not_found"
+
+    def __bool__(self):
+        return bool(self.price or self.business_price or self.url)
+
+    def __repr__(self):
+        return f"ProductResult({self.price!r}, {self.business_price!r}, {self.url!r})"
+
+
+class ResultStore:
+    """Результаты тендера по колонкам; строки добавляются по мере чтения файла.
+
+    Запись и добавление потокобезопасны: рабочие потоки пишут результаты,
+    пока поток чтения файла ещё добавляет товары. cached_at - время получения
+    цены, взятой из истории вместо парсинга (0 - цена получена в этом прогоне).
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self.reset(names)
+
+    def reset(self, names: Iterable[str] = ()):
+        """Заменяет все строки товарами names без результатов"""
+        names = list(names)
+        count = len(names)
+        with self._lock:
+            self.names: List[str] = names
+            self.prices: List[str] = [""] * count
+            self.business_prices: List[str] = [""] * count
+            self.urls: List[str] = [""] * count
+            self.price_nums = array('d', [NO_PRICE]) * count
+            self.business_nums = array('d', [NO_PRICE]) * count
+            self.cached_at = array('d', [0.0]) * count
+            self.statuses: List[str] = ["pending"] * count
+
+    def clear(self):
+        self.reset()
+
+    def add(self, name: str) -> int:
+        """Добавляет товар без результата; индекс строки"""
+        with self._lock:
+            self.names.append(name)
+            self.prices.append("")
+            self.business_prices.append("")
+            self.urls.append("")
+            self.price_nums.append(NO_PRICE)
+            self.business_nums.append(NO_PRICE)
+            self.cached_at.append(0.0)
+            self.statuses.append("pending")
+            return len(self.names) - 1
+
+    def set(self, idx: int, result: ProductResult, cached_at: float = 0.0):
+        """Результат товара; cached_at - время получения цены из истории"""
+        with self._lock:
+            self.prices[idx] = result.price
+            self.business_prices[idx] = result.business_price
+            self.urls[idx] = result.url
+            self.price_nums[idx] = result.price_num
+            self.business_nums[idx] = result.business_num
+            self.cached_at[idx] = cached_at
+            self.statuses[idx] = "cached" if cached_at else result.status
+
+    def mark(self, idx: int, status: str):
+        """Меняет только статус строки (например, processing)"""
+        self.statuses[idx] = status
+
+    def get(self, idx: int) -> ProductResult:
+        result = ProductResult.__new__(ProductResult)
+        with self._lock:
+            result.price = self.prices[idx]
+            result.business_price = self.business_prices[idx]
+            result.url = self.urls[idx]
+            result.price_num = self.price_nums[idx]
+            result.business_num = self.business_nums[idx]
+        return result
+
+    def __len__(self):
+        return len(self.names)
+
+    def filled(self) -> List[int]:
+        """Индексы строк, для которых уже есть результат.
+
+        Без блокировки: вызывается из обработчика сигнала, который может прервать
+        поток, держащий блокировку хранилища.
+        """
+        count = min(len(self.prices), len(self.business_prices), len(self.urls))
+        return [i for i in range(count) if self.prices[i] or self.business_prices[i] or self.urls[i]]
+
+    def reused(self) -> List[int]:
+        """Индексы строк с ценой из истории"""
+        return [i for i, cached_at in enumerate(self.cached_at) if cached_at]
+
+    def priced_count(self, business: bool = False) -> int:
+        """Сколько товаров с найденной ценой (отметки ошибок не считаются)"""
+        column = self.business_nums if business else self.price_nums
+        return sum(1 for value in column if value != NO_PRICE)
+
+    def to_dataframe(self):
+        """DataFrame в формате parse_tender_excel - только для выгрузки"""
+        import pandas as pd
+
+        with self._lock:
+            columns = {
+                'наименование': list(self.names),
+                'цена': list(self.prices),
+                'цена для юрлиц': list(self.business_prices),
+                'ссылка': list(self.urls),
+            }
+            if any(self.cached_at):
+                now = time.time()
+                columns[CACHED_COLUMN] = [cached_note(ts, now) if ts else "" for ts in self.cached_at]
+            return pd.DataFrame(columns)
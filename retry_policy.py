@@ -0,0 +1,107 @@
+# retry_policy.py - единая политика повторов: экспоненциальная пауза с джиттером
+
+import copy
+import time
+import random
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Tuple, Type
+
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+from waits import pause
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Attempt:
+    """Номер попытки (с нуля) и признак того, что она последняя"""
+    number: int
+    last: bool
+
+
+class RetryPolicy:
+    """Повторы операции с паузой base_delay * 2^n (не больше max_delay) и джиттером ±jitter.
+
+    budget - общий лимит времени операции в секундах: очередная пауза,
+    которая в него не укладывается, не делается и попытки заканчиваются.
+    Повторяются только исключения retry_on; give_up_on (мёртвая сессия
+    браузера) не повторяются никогда.
+    """
+
+    def __init__(self, name: str, max_attempts: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, jitter: float = 0.5, budget: Optional[float] = None,
+                 retry_on: Tuple[Type[BaseException], ...] = (TimeoutException,
+                                                               StaleElementReferenceException,
+                                                               WebDriverException),
+                 give_up_on: Tuple[Type[BaseException], ...] = (InvalidSessionIdException,
+                                                                NoSuchWindowException)):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = budget
+        self.retry_on = retry_on
+        self.give_up_on = give_up_on
+
+    def with_attempts(self, max_attempts: Optional[int]) -> "RetryPolicy":
+        """Та же политика с другим числом попыток (None - без изменений)"""
+        if max_attempts is None or max_attempts == self.max_attempts:
+            return self
+        policy = copy.copy(self)
+        policy.max_attempts = max(1, max_attempts)
+        return policy
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(error, self.give_up_on)
+
+    def backoff(self, attempt: int) -> float:
+        """Пауза перед попыткой attempt (1, 2, ...)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return max(0.0, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def attempts(self, deadline=None, should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Attempt]:
+        """Выдаёт попытки, выдерживая паузу между ними; прекращает по бюджету, дедлайну или остановке"""
+        started = time.monotonic()
+        for number in range(self.max_attempts):
+            if number:
+                delay = self.backoff(number)
+                if self.budget is not None and time.monotonic() - started + delay > self.budget:
+                    logger.debug(f"{self.name}: бюджет повторов {self.budget:.0f} с исчерпан")
+                    return
+                if deadline is not None and deadline.remaining() < delay:
+                    return
+                pause(delay)
+            if should_stop and should_stop():
+                return
+            yield Attempt(number=number, last=number == self.max_attempts - 1)
+
+    def call(self, fn: Callable, *args, deadline=None, should_stop: Optional[Callable[[], bool]] = None,
+             **kwargs):
+        """Вызывает fn с повторами; после последней попытки пробрасывает исключение"""
+        last_error = None
+        for attempt in self.attempts(deadline=deadline, should_stop=should_stop):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e) or attempt.last:
+                    raise
+                last_error = e
+                logger.debug(f"{self.name}: попытка {attempt.number + 1} не удалась ({type(e).__name__}), повтор")
+        if last_error is not None:
+            raise last_error
+        return None
+
+
+# Политики по операциям
+PAGE_LOAD_RETRY = RetryPolicy("загрузка карточки", max_attempts=2, base_delay=1.0, budget=20)
+SEARCH_RETRY = RetryPolicy("поиск", max_attempts=3, base_delay=1.0, max_delay=4.0, budget=30)
+ITEM_RETRY = RetryPolicy("повтор товара", max_attempts=2, base_delay=5.0, max_delay=30.0)
@@ -0,0 +1,157 @@
+# run_context.py - состояние одного прогона парсинга
+#
+# Сигнал остановки, созданные профили браузера, таблица результатов и файлы прогона
+# живут в RunContext, а не в глобальных переменных tender_parser. Рабочие потоки
+# привязывают свой контекст через bind(); код парсинга берёт его через current().
+# Так в одном процессе могут одновременно идти несколько тендеров (GUI и фоновые
+# задания), и остановка или очистка одного не задевает остальные.
+
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+class RunContext:
+    """Потокобезопасное состояние прогона"""
+
+    def __init__(self, input_file: Optional[str] = None, output_file: Optional[str] = None, name: str = ""):
+        self.name = name
+        self.input_file = input_file
+        self.output_file = output_file
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._profiles = set()
+        self._results = None
+        self._stop_callbacks = []
+        _ACTIVE.add(self)
+
+    # --- остановка ---
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def stop(self):
+        """Останавливает прогон: будит все ожидания и вызывает подписчиков on_stop"""
+        with self._lock:
+            if self.stop_event.is_set():
+                return
+            self.stop_event.set()
+            callbacks = list(self._stop_callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def signal_stop(self):
+        """Остановка из обработчика сигнала: только флаг, без блокировки и подписчиков.
+
+        Сигнал приходит в главный поток, который мог прерваться, держа self._lock
+        (on_stop, профили) - взять его здесь значило бы повиснуть навсегда.
+        """
+        self.stop_event.set()
+
+    def on_stop(self, callback):
+        """Подписка на остановку (например, оборвать зависшие вызовы драйвера); возвращает отписку"""
+        with self._lock:
+            self._stop_callbacks.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._stop_callbacks:
+                    self._stop_callbacks.remove(callback)
+        return unsubscribe
+
+    def reset(self):
+        """Новый запуск в том же контексте"""
+        self.stop_event.clear()
+
+    # --- профили браузера ---
+
+    def add_profile(self, path: str):
+        with self._lock:
+            self._profiles.add(path)
+
+    def discard_profile(self, path: str):
+        with self._lock:
+            self._profiles.discard(path)
+
+    def profiles(self) -> List[str]:
+        with self._lock:
+            return list(self._profiles)
+
+    # --- результаты ---
+
+    # Ссылка на таблицу читается и меняется атомарно, без self._lock: её читает
+    # обработчик сигнала, прервавший главный поток где угодно
+
+    @property
+    def results(self):
+        """ResultStore прогона для экстренного сохранения (None - сохранять нечего)"""
+        return self._results
+
+    @results.setter
+    def results(self, store):
+        self._results = store
+
+    def __repr__(self):
+        return f"RunContext({self.name or self.input_file!r}, stopped={self.stopped})"
+
+
+# Все живые контексты процесса (для сигналов и общей очистки)
+_ACTIVE: "weakref.WeakSet[RunContext]" = weakref.WeakSet()
+
+# Контекст по умолчанию - для одиночных вызовов get_prices вне движка
+DEFAULT = RunContext(name="default")
+
+_local = threading.local()
+
+
+def current() -> RunContext:
+    """Контекст, привязанный к текущему потоку, иначе DEFAULT"""
+    return getattr(_local, 'context', None) or DEFAULT
+
+
+@contextmanager
+def bind(context: RunContext):
+    """Привязывает контекст к текущему потоку на время блока"""
+    previous = getattr(_local, 'context', None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+def active() -> List[RunContext]:
+    return list(_ACTIVE)
+
+
+def stop_all(from_signal: bool = False):
+    """Останавливает все прогоны процесса; from_signal - из обработчика сигнала, без блокировок.
+
+    DEFAULT не останавливается: его никто не сбрасывает, и после общей остановки
+    одиночные вызовы get_prices вне движка отказывали бы до конца процесса.
+    """
+    for context in active():
+        if context is DEFAULT:
+            continue
+        if from_signal:
+            context.signal_stop()
+        else:
+            context.stop()
+
+
+def forget_profile(path: str):
+    """Профиль удалён - убрать его из всех контекстов"""
+    for context in active():
+        context.discard_profile(path)
+
+
+def all_profiles() -> set:
+    profiles = set()
+    for context in active():
+        profiles.update(context.profiles())
+    return profiles
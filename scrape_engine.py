@@ -0,0 +1,378 @@
+# scrape_engine.py - пул рабочих потоков с переиспользуемыми сессиями Edge
+
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import run_context
+from run_context import RunContext
+from tender_parser import get_prices, error_result
+from results import ProductResult, ERROR_MARK, TIMEOUT_MARK, THROTTLE_MARK, FAILED_MARKS
+from driver_session import DriverSession, DriverWatchdog, RecyclePolicy
+from deadline import ItemDeadline
+from throttle import AdaptiveConcurrency
+from retry_policy import ITEM_RETRY
+from timing import item_span
+from driver_tracer import trace_item
+from profiler import profile_item
+
+logger = logging.getLogger(__name__)
+
+
+class RunStats:
+    """Потокобезопасные счётчики прогона"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        # Ключи, заданные set() (текущее значение, а не счётчик)
+        self._gauges = set()
+
+    def incr(self, key: str, n: float = 1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._counters[key] = value
+            self._gauges.add(key)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def since(self, baseline: Dict[str, float]) -> Dict[str, float]:
+        """Счётчики за время после снимка baseline; значения set() - текущие"""
+        with self._lock:
+            return {key: value if key in self._gauges else value - baseline.get(key, 0)
+                    for key, value in self._counters.items()}
+
+
+class ScrapeEngine:
+    """Обрабатывает товары в нескольких потоках, у каждого потока своя DriverSession.
+
+    item_budget - бюджет времени на товар в секундах (0 - без ограничения);
+    сторожевой поток убивает драйвер, чей вызов завис дольше бюджета.
+    При капче регулятор нагрузки снижает число активных потоков, а товар
+    возвращается в очередь (не более max_throttle_requeues раз).
+
+    Товары могут поступать потоком (генератор): потоки начинают работу с первым
+    же товаром, не дожидаясь конца чтения файла. prestart() запускает браузеры
+    заранее, пока вызывающий код ещё готовит список товаров.
+
+    context - прогон, к которому относятся потоки движка: его остановка и его
+    профили; по умолчанию - контекст потока, создавшего движок.
+
+    keep_sessions - браузеры не закрываются в конце run(): следующий run() начинает
+    с уже запущенными (и авторизованными) сессиями. Закрывает их close().
+    """
+
+    def __init__(self, headless: bool = True, driver_path: Optional[str] = None,
+                 use_auth: bool = False, workers: int = 1, policy: Optional[RecyclePolicy] = None,
+                 item_budget: float = 90.0, max_throttle_requeues: int = 2,
+                 context: Optional[RunContext] = None, keep_sessions: bool = False):
+        self.headless = headless
+        self.driver_path = driver_path
+        self.use_auth = use_auth
+        self.workers = max(1, int(workers))
+        self.policy = policy or RecyclePolicy()
+        self.item_budget = item_budget
+        self.max_throttle_requeues = max_throttle_requeues
+        self.context = context or run_context.current()
+        self.keep_sessions = keep_sessions
+        self.stats = RunStats()
+        self.watchdog = DriverWatchdog(stats=self.stats)
+        self.controller = AdaptiveConcurrency(self.workers, stats=self.stats)
+        self._throttle_attempts: Dict[int, int] = {}
+        self._deferred_lock = threading.Lock()
+        self._deferred_ids = set()
+        # Что делает каждый поток сейчас и сколько товаров он завершил (для живой статистики)
+        self.worker_status: Dict[int, str] = {}
+        self.worker_done: Dict[int, int] = {}
+        # Сессии, запущенные заранее prestart(), и потоки их прогрева по номеру воркера
+        self._sessions: Optional[List[DriverSession]] = None
+        self._warmups: Dict[int, threading.Thread] = {}
+        # Сессии, оставленные прошлым run() при keep_sessions
+        self._pool: Optional[List[DriverSession]] = None
+        # Счётчики на конец прошлого run(): статистика прогона считается от них, так что
+        # драйверы, запущенные prestart() или rewarm() до прогона, относятся к нему
+        self._baseline: Dict[str, float] = {}
+
+    def _create_sessions(self, count: int) -> List[DriverSession]:
+        return [DriverSession(headless=self.headless, driver_path=self.driver_path,
+                              use_auth=self.use_auth, policy=self.policy, stats=self.stats)
+                for _ in range(count)]
+
+    def prestart(self, prepare: Optional[Callable[[], None]] = None):
+        """Запускает браузеры всех потоков (и авторизацию) в фоне, не дожидаясь товаров.
+
+        prepare() выполняется до запуска браузеров - например, prepare_browsers(),
+        чтобы не закрыть только что запущенные. Поток начинает первый товар, когда
+        прогрев его сессии закончен; неудачный прогрев повторится при первом товаре.
+        """
+        self._sessions = self._create_sessions(self.workers)
+        prepared = threading.Event()
+
+        def prepare_step():
+            try:
+                with run_context.bind(self.context):
+                    if prepare is not None:
+                        prepare()
+            except Exception as e:
+                logger.warning(f"Подготовка к запуску браузеров не удалась: {e}")
+            finally:
+                prepared.set()
+
+        def warm_up(session: DriverSession):
+            prepared.wait()
+            self._warm_up(session)
+
+        threading.Thread(target=prepare_step, name="driver-prepare", daemon=True).start()
+        for worker_id, session in enumerate(self._sessions, 1):
+            self._start_warmup(worker_id, session, warm_up)
+        logger.info(f"🔥 Запускаю {len(self._sessions)} браузеров заранее")
+
+    def _warm_up(self, session: DriverSession):
+        if self.context.stopped:
+            return
+        try:
+            with run_context.bind(self.context):
+                session.acquire()
+        except Exception as e:
+            logger.warning(f"⚠ Прогрев браузера не удался, повторю при первом товаре: {e}")
+
+    def _start_warmup(self, worker_id: int, session: DriverSession, target: Callable):
+        thread = threading.Thread(target=target, args=(session,), name=f"driver-warmup-{worker_id}", daemon=True)
+        thread.start()
+        self._warmups[worker_id] = thread
+
+    def rewarm(self) -> int:
+        """Между прогонами keep_sessions: пересоздаёт в фоне браузеры пула, исчерпавшие ресурс.
+
+        Простаивающий пул иначе пересоздавал бы устаревшие драйверы уже на товарах
+        следующего прогона. Возвращает число запущенных прогревов.
+        """
+        started = 0
+        for worker_id, session in enumerate(self._pool or [], 1):
+            warmup = self._warmups.get(worker_id)
+            if warmup is not None and warmup.is_alive():
+                continue
+            if session.driver is not None and not session.maybe_recycle():
+                continue
+            self._start_warmup(worker_id, session, self._warm_up)
+            started += 1
+        return started
+
+    def run(self, items: Iterable[Tuple[int, str]],
+            on_result: Callable[[int, ProductResult], None],
+            on_start: Optional[Callable[[int], None]] = None) -> Dict[str, float]:
+        """Обрабатывает пары (индекс, название); on_result вызывается из рабочих потоков.
+
+        items может быть генератором - он читается в вызывающем потоке параллельно
+        с обработкой уже полученных товаров.
+        on_start(индекс) - необязательный вызов перед началом обработки товара.
+
+        При остановке контекста драйверы, занятые товаром, убиваются, а незавершённые
+        товары не передаются в on_result - уже полученные результаты сохраняются.
+        Статистика в ответе - только за этот прогон.
+
+        Товары, завершившиеся ошибкой, таймаутом или капчей, не помечаются сразу:
+        они откладываются и повторяются в конце прогона по политике ITEM_RETRY.
+        """
+        pending = items
+        if self._sessions is not None:
+            sessions, self._sessions = self._sessions, None
+        elif self._pool:
+            sessions, self._pool = self._pool, None
+        else:
+            # Длина известна только у списков; для генератора запускаются все потоки
+            count = len(pending) if hasattr(pending, '__len__') else self.workers
+            sessions = self._create_sessions(min(self.workers, max(1, count)))
+        logger.info(f"🧵 Запускаю {len(sessions)} потоков")
+        # Индексы товаров у каждого прогона свои
+        self._throttle_attempts.clear()
+        self._deferred_ids.clear()
+
+        for session in sessions:
+            self.watchdog.watch(session)
+        if self.item_budget:
+            self.watchdog.start()
+
+        def abort_in_flight():
+            for session in sessions:
+                session.abort()
+            self.controller.wake()
+
+        unsubscribe = self.context.on_stop(abort_in_flight)
+        try:
+            with run_context.bind(self.context):
+                self._run_passes(pending, sessions, on_result, on_start)
+        finally:
+            unsubscribe()
+            self.watchdog.stop()
+            # Прогрев сессий, которым не досталось товаров, мог ещё не закончиться
+            for thread in self._warmups.values():
+                thread.join()
+            self._warmups.clear()
+            keep = self.keep_sessions and not self.context.stopped
+            for session in sessions:
+                self.watchdog.unwatch(session)
+                if not keep:
+                    session.close()
+            if keep:
+                self._pool = sessions
+
+        run_stats = self.stats.since(self._baseline)
+        self._baseline = self.stats.snapshot()
+        return run_stats
+
+    def close(self):
+        """Закрывает браузеры, оставленные keep_sessions или запущенные prestart() без run()"""
+        for thread in self._warmups.values():
+            thread.join()
+        self._warmups.clear()
+        sessions = (self._pool or []) + (self._sessions or [])
+        self._pool = self._sessions = None
+        for session in sessions:
+            session.close()
+
+    def _run_passes(self, pending: Iterable[Tuple[int, str]], sessions: List[DriverSession],
+                    on_result: Callable[[int, ProductResult], None],
+                    on_start: Optional[Callable[[int], None]]):
+        """Основной проход и повторы отложенных товаров по политике ITEM_RETRY"""
+        for attempt in ITEM_RETRY.attempts(should_stop=lambda: self.context.stopped):
+            if attempt.number:
+                logger.info(f"🔁 Повторяю {len(pending)} отложенных товаров (проход {attempt.number + 1})")
+            deferred = self._run_pass(pending, sessions, on_result, on_start, final=attempt.last)
+            if not deferred:
+                break
+            self.stats.incr('deferred', len(deferred))
+            pending = deferred
+
+    def _run_pass(self, items: Iterable[Tuple[int, str]], sessions: List[DriverSession],
+                  on_result: Callable[[int, ProductResult], None],
+                  on_start: Optional[Callable[[int], None]], final: bool) -> List[Tuple[int, str]]:
+        """Один проход по очереди товаров; возвращает отложенные для повтора.
+
+        Потоки стартуют сразу, товары докладываются в очередь по мере чтения items;
+        fed отмечает, что больше товаров не будет.
+        """
+        tasks = queue.Queue()
+        fed = threading.Event()
+        if hasattr(items, '__len__'):
+            sessions = sessions[:max(1, len(items))]
+
+        deferred: List[Tuple[int, str]] = []
+        threads = []
+        for worker_id, session in enumerate(sessions, 1):
+            thread = threading.Thread(target=self._worker_loop,
+                                      args=(worker_id, session, tasks, fed, on_result, on_start, deferred, final),
+                                      name=f"scrape-worker-{worker_id}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for item in items:
+                if self.context.stopped:
+                    break
+                tasks.put(item)
+        finally:
+            fed.set()
+            for thread in threads:
+                thread.join()
+
+        return sorted(deferred)
+
+    def _worker_loop(self, worker_id: int, session: DriverSession, tasks: queue.Queue, fed: threading.Event,
+                     on_result: Callable[[int, ProductResult], None],
+                     on_start: Optional[Callable[[int], None]],
+                     deferred: List[Tuple[int, str]], final: bool):
+        try:
+            with run_context.bind(self.context):
+                self._work(worker_id, session, tasks, fed, on_result, on_start, deferred, final)
+        finally:
+            self.worker_status[worker_id] = "готов"
+
+    def _work(self, worker_id: int, session: DriverSession, tasks: queue.Queue, fed: threading.Event,
+              on_result: Callable[[int, ProductResult], None],
+              on_start: Optional[Callable[[int], None]],
+              deferred: List[Tuple[int, str]], final: bool):
+        warmup = self._warmups.pop(worker_id, None)
+        if warmup is not None:
+            self.worker_status[worker_id] = "запуск браузера"
+            warmup.join()
+
+        while not self.context.stopped:
+            try:
+                idx, product_name = tasks.get(timeout=0.2)
+            except queue.Empty:
+                # Очередь пуста и новых товаров не будет - поток свободен
+                if fed.is_set() and tasks.empty():
+                    break
+                self.worker_status[worker_id] = "ожидание товара"
+                continue
+
+            # Пересоздание драйвера - только между товарами
+            self.worker_status[worker_id] = "проверка драйвера"
+            session.maybe_recycle()
+
+            self.worker_status[worker_id] = "ожидание слота"
+            if not self.controller.acquire(lambda: self.context.stopped):
+                break
+
+            self.worker_status[worker_id] = f"товар {idx + 1}"
+            if on_start is not None:
+                on_start(idx)
+            logger.info(f"[W{worker_id}] Обработка товара {idx + 1}: {product_name[:40]}...")
+            deadline = ItemDeadline(self.item_budget) if self.item_budget else None
+            session.begin_item(deadline)
+            with item_span(idx, product_name) as record, trace_item() as tracer, profile_item(idx, product_name):
+                try:
+                    result = get_prices(product_name, self.headless, self.driver_path, 20,
+                                        self.use_auth, session=session, deadline=deadline)
+                except Exception as e:
+                    logger.error(f"[W{worker_id}] Ошибка товара {idx + 1}: {e}")
+                    session.mark_broken()
+                    result = error_result()
+                finally:
+                    session.end_item()
+                    self.controller.release()
+                if record is not None:
+                    record['status'] = result.price if result.failed else ('ok' if result.price else 'not_found')
+                    if tracer is not None:
+                        record['webdriver_calls'] = tracer.current_item_calls()
+
+            price = result.price
+            if self.context.stopped and (not price or price in FAILED_MARKS):
+                # Товар оборван остановкой - не записываем пустой или ошибочный результат
+                break
+            if price == THROTTLE_MARK:
+                self.controller.on_throttle(f"товар {idx + 1}")
+                attempts = self._throttle_attempts.get(idx, 0)
+                if attempts < self.max_throttle_requeues:
+                    self._throttle_attempts[idx] = attempts + 1
+                    tasks.put((idx, product_name))
+                    logger.info(f"[W{worker_id}] Товар {idx + 1} возвращён в очередь после капчи")
+                    continue
+            else:
+                self.controller.on_clean()
+
+            if price in FAILED_MARKS and not final:
+                with self._deferred_lock:
+                    deferred.append((idx, product_name))
+                    self._deferred_ids.add(idx)
+                logger.info(f"[W{worker_id}] Товар {idx + 1} ({price}) отложен до конца прогона")
+                continue
+
+            if price == TIMEOUT_MARK:
+                self.stats.incr('timeouts')
+            elif price == THROTTLE_MARK:
+                self.stats.incr('throttled_items')
+            elif price == ERROR_MARK:
+                self.stats.incr('errors')
+            if idx in self._deferred_ids and price not in FAILED_MARKS:
+                self.stats.incr('recovered')
+            self.stats.incr('items')
+            self.worker_done[worker_id] = self.worker_done.get(worker_id, 0) + 1
+            on_result(idx, result)
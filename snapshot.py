@@ -0,0 +1,114 @@
+# snapshot.py - быстрый снимок результатов при аварийном завершении и восстановление из него
+#
+# Обработчик сигнала не собирает тендерную таблицу (копия книги, поиск "1 место",
+# запись openpyxl - на больших файлах это секунды), а пишет компактный JSON с уже
+# полученными ценами: миллисекунды даже на десятках тысяч товаров. Полная выгрузка
+# собирается из снимка при следующем запуске или командой main.py --rebuild.
+
+import os
+import glob
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(input_file: str, output_file: Optional[str]) -> str:
+    """<выходной файл>.snapshot.json; без выходного файла - рядом с входным"""
+    if output_file and output_file != "auto":
+        return f"{output_file}{SNAPSHOT_SUFFIX}"
+    stem, _ = os.path.splitext(input_file)
+    return f"{stem}_results{SNAPSHOT_SUFFIX}"
+
+
+def write_snapshot(context) -> Optional[str]:
+    """Пишет снимок результатов прогона context; None - сохранять нечего.
+
+    В снимок попадают названия всех товаров и только заполненные строки цен,
+    без pandas-операций над таблицей целиком - вызов безопасен в обработчике сигнала.
+    """
+    results = context.results
+    if results is None or not context.input_file:
+        return None
+
+    # Пятое поле - время цены из истории (0 - получена в этом прогоне); без него
+    # пересобранная выгрузка потеряла бы пометку "из истории"
+    cached_at = results.cached_at
+    rows = [[i, results.prices[i], results.business_prices[i], results.urls[i],
+             cached_at[i] if i < len(cached_at) else 0.0] for i in results.filled()]
+    names = list(results.names)
+
+    record = {
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'input_file': os.path.abspath(context.input_file),
+        'output_file': os.path.abspath(context.output_file) if context.output_file and context.output_file != "auto" else None,
+        'names': names,
+        'rows': rows,
+    }
+    path = snapshot_path(context.input_file, context.output_file)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    if record.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Неизвестная версия снимка: {record.get('version')}")
+    return record
+
+
+def snapshot_results(record: dict):
+    """ResultStore с результатами из снимка"""
+    from results import ProductResult, ResultStore
+
+    results = ResultStore(record['names'])
+    for i, price, business_price, link, *rest in record['rows']:
+        # Строки старых снимков - без времени цены из истории
+        results.set(i, ProductResult(price, business_price, link), cached_at=rest[0] if rest else 0.0)
+    return results
+
+
+def rebuild_from_snapshot(path: str, output_file: Optional[str] = None, remove: bool = True) -> str:
+    """Собирает тендерную таблицу из снимка; возвращает путь выгрузки"""
+    from utils import save_results_into_tender_format
+
+    record = load_snapshot(path)
+    output_file = output_file or record.get('output_file') or path[:-len(SNAPSHOT_SUFFIX)]
+    if not output_file.lower().endswith(('.xlsx', '.xlsm')):
+        output_file = f"{output_file}.xlsx"
+
+    results = snapshot_results(record)
+    save_results_into_tender_format(record['input_file'], output_file, results.to_dataframe())
+    logger.info(f"📦 Выгрузка восстановлена из снимка ({len(record['rows'])}/{len(results)} товаров): {output_file}")
+    if remove:
+        os.remove(path)
+    return output_file
+
+
+def find_snapshots(*directories: str) -> List[str]:
+    """Неразобранные снимки в каталогах (по умолчанию - в текущем)"""
+    found = []
+    for directory in directories or (".",):
+        found.extend(glob.glob(os.path.join(directory or ".", f"*{SNAPSHOT_SUFFIX}")))
+    return sorted(set(os.path.abspath(path) for path in found))
+
+
+def rebuild_pending(*directories: str) -> List[str]:
+    """Восстанавливает выгрузки из всех найденных снимков; ошибочные снимки остаются на месте"""
+    rebuilt = []
+    for path in find_snapshots(*directories):
+        try:
+            rebuilt.append(rebuild_from_snapshot(path))
+        except Exception as e:
+            logger.error(f"Не удалось восстановить выгрузку из {path}: {e}")
+    return rebuilt
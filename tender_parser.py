@@ -3,45 +3,78 @@
 import time
 import logging
 import json
-import re
 import tempfile
 import shutil
 import uuid
 import atexit
 import signal
 import os
+import threading
 from typing import Dict, Optional, List, Any, Tuple
 import pandas as pd
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
-from utils import extract_products_from_excel, save_results_into_tender_format
+from utils import iter_products_from_excel, save_results_into_tender_format
+from driver_session import RecyclePolicy
+from deadline import ItemDeadline, ItemTimeout, clamp_wait
+from throttle import detect_throttle_page
+from retry_policy import PAGE_LOAD_RETRY, SEARCH_RETRY
+import timing
+from timing import timed, span
+import driver_tracer
+from waits import pause, wait_for
+from process_registry import REGISTRY
+from profile_reaper import ProfileReaper
+import run_context
+from snapshot import write_snapshot
+from run_context import RunContext
+from results import ProductResult, ResultStore, NO_PRICE, format_age, ERROR_MARK, TIMEOUT_MARK, THROTTLE_MARK, NoProductsError
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-# Глобальные переменные для управления парсингом и автосохранения
-STOP_PARSING = False
-CREATED_PROFILES = set()
-CURRENT_DATAFRAME = None
-CURRENT_OUTPUT_FILE = None
-CURRENT_INPUT_FILE = None
+# Сигнал остановки, профили, результаты и файлы прогона - в RunContext (run_context.py);
+# код парсинга работает с контекстом, привязанным к текущему потоку
+
+def stop_requested() -> bool:
+    """Остановлен ли прогон текущего потока"""
+    return run_context.current().stopped
+
+# Адрес маркета; переопределяется переменной окружения или set_market_url() (локальный стенд)
+MARKET_URL = os.environ.get("YANDEX_MARKET_URL", "https://market.yandex.ru").rstrip('/')
+
+def set_market_url(url: str):
+    """Направляет парсер на другой адрес маркета (например, локальный стенд для бенчмарков)"""
+    global MARKET_URL
+    MARKET_URL = url.rstrip('/')
+
+def on_market(url: str) -> bool:
+    """Находится ли браузер на сайте маркета"""
+    return MARKET_URL.split('://', 1)[-1] in (url or '')
+
+# Фабрика драйверов вместо Edge (например, фейковый драйвер для бенчмарков); None - настоящий Edge
+DRIVER_FACTORY = None
+
+def set_driver_factory(factory):
+    """Подменяет создание драйвера: factory(headless=, driver_path=, use_auth=) -> драйвер"""
+    global DRIVER_FACTORY
+    DRIVER_FACTORY = factory
 
 def setup_signal_handlers():
     """Настройка обработчиков сигналов для автосохранения при завершении"""
     def signal_handler(signum, frame):
-        global STOP_PARSING
-        logger.info(f"Получен сигнал завершения ({signum}), выполняю автосохранение...")
-        STOP_PARSING = True
-        force_save_results()
-        cleanup_profiles()
-        logger.info("Автосохранение завершено, выход из программы")
+        logger.info(f"Получен сигнал завершения ({signum}), сохраняю снимок результатов...")
+        run_context.stop_all(from_signal=True)
+        write_emergency_snapshots()
+        # Только убить свои браузеры; профили удалит очистка при следующем запуске
+        REGISTRY.terminate(kill=True)
+        logger.info("Снимок сохранён, выход из программы")
         os._exit(0)
 
     # Обработчики для Windows и Unix
@@ -53,98 +86,174 @@ def setup_signal_handlers():
     except Exception as e:
         logger.warning(f"Не удалось установить обработчики сигналов: {e}")
 
-def force_save_results():
-    """Принудительное сохранение результатов при завершении"""
-    global CURRENT_DATAFRAME, CURRENT_OUTPUT_FILE, CURRENT_INPUT_FILE
+def write_emergency_snapshots() -> List[str]:
+    """Снимки результатов всех прогонов в JSON - за миллисекунды, для обработчика сигнала.
 
-    if CURRENT_DATAFRAME is not None and CURRENT_OUTPUT_FILE and CURRENT_INPUT_FILE:
+    Тендерная таблица из снимка собирается при следующем запуске (main.py) или
+    командой main.py --rebuild.
+    """
+    paths = []
+    for ctx in run_context.active():
+        try:
+            path = write_snapshot(ctx)
+        except Exception as e:
+            logger.error(f"Ошибка записи снимка: {e}")
+            continue
+        if path:
+            logger.info(f"🚨 СНИМОК РЕЗУЛЬТАТОВ: {path}")
+            paths.append(path)
+    if not paths:
+        logger.info("Нет данных для экстренного сохранения")
+    return paths
+
+def force_save_results(context: Optional[RunContext] = None):
+    """Принудительное сохранение результатов при завершении (context=None - всех прогонов)"""
+    contexts = [context] if context is not None else run_context.active()
+    saved = 0
+    for ctx in contexts:
+        results = ctx.results
+        if results is None or not ctx.output_file or not ctx.input_file:
+            continue
         try:
             # Считаем сколько товаров обработано
-            processed = len([r for r in CURRENT_DATAFRAME['цена'] if r and r not in ['', 'ОШИБКА']])
-            total = len(CURRENT_DATAFRAME)
+            processed = results.priced_count()
+            total = len(results)
 
             # ИСПОЛЬЗУЕМ НОВУЮ ФУНКЦИЮ ТЕНДЕРНОГО ФОРМАТА
-            save_results_into_tender_format(CURRENT_INPUT_FILE, CURRENT_OUTPUT_FILE, CURRENT_DATAFRAME)
-            logger.info(f"🚨 ЭКСТРЕННОЕ СОХРАНЕНИЕ ТЕНДЕРА: обработано {processed}/{total} товаров в {CURRENT_OUTPUT_FILE}")
+            save_results_into_tender_format(ctx.input_file, ctx.output_file, results.to_dataframe())
+            logger.info(f"🚨 ЭКСТРЕННОЕ СОХРАНЕНИЕ ТЕНДЕРА: обработано {processed}/{total} товаров в {ctx.output_file}")
+            saved += 1
         except Exception as e:
             logger.error(f"Ошибка экстренного сохранения: {e}")
-    else:
+    if not saved:
         logger.info("Нет данных для экстренного сохранения")
 
-def stop_all_parsing():
-    """Останавливает все процессы парсинга"""
-    global STOP_PARSING
-    STOP_PARSING = True
+def stop_all_parsing(context: Optional[RunContext] = None):
+    """Останавливает прогон context (None - все прогоны процесса)"""
+    if context is not None:
+        context.stop()
+    else:
+        run_context.stop_all()
     logger.info("Получен сигнал остановки парсинга")
 
+@timed('cleanup_profile')
 def cleanup_single_profile(profile_path: str) -> bool:
-    """Аккуратно очищает один профиль Edge после закрытия драйвера"""
+    """Одна попытка удалить профиль Edge после закрытия драйвера.
+
+    Вызывается фоновым REAPER; если браузер ещё не отпустил профиль,
+    возвращает False, и попытка повторится позже.
+    """
     if not profile_path or not os.path.exists(profile_path):
         return False
 
     try:
-        time.sleep(0.3)
-
-        try:
-            import psutil
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if proc.info['name'] and 'msedge' in proc.info['name'].lower():
-                        if proc.info['cmdline']:
-                            cmdline = ' '.join(proc.info['cmdline'])
-                            if profile_path in cmdline:
-                                return False
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
-        except ImportError:
-            time.sleep(0.5)
+        # Профиль занят, пока живы процессы его драйвера (только свои, из реестра)
+        if REGISTRY.alive(profile_path):
+            return False
 
         shutil.rmtree(profile_path, ignore_errors=True)
         success = not os.path.exists(profile_path)
+        if success:
+            REGISTRY.forget(profile_path)
 
         return success
 
     except Exception as e:
         return False
 
-def cleanup_profiles():
-    """Глобальная очистка всех профилей"""
-    global CREATED_PROFILES
+# Фоновое удаление профилей: рабочие потоки не ждут файловую систему
+REAPER = ProfileReaper(cleanup_single_profile, on_deleted=run_context.forget_profile)
+
+def sweep_orphan_profiles(min_age_minutes: float = 10.0) -> int:
+    """Отдаёт REAPER профили edge_temp_*/edge_profile_*, оставшиеся от упавших прогонов.
+
+    Не трогает профили этого прогона, живых параллельных прогонов (по их файлам
+    реестра процессов) и каталоги моложе min_age_minutes.
+    """
+    from pathlib import Path
+
+    roots = [(Path(tempfile.gettempdir()), "edge_temp_*"),
+             (Path.home() / ".yandex_parser_auth", "edge_profile_*")]
+    in_use = run_context.all_profiles() | REGISTRY.live_keys()
+    cutoff = time.time() - min_age_minutes * 60
+    count = 0
+    for root, pattern in roots:
+        if not root.is_dir():
+            continue
+        for path in root.glob(pattern):
+            try:
+                if not path.is_dir() or str(path) in in_use or path.stat().st_mtime > cutoff:
+                    continue
+            except OSError:
+                continue
+            REAPER.submit(str(path))
+            count += 1
+    if count:
+        logger.info(f"🧹 Найдено {count} брошенных профилей Edge, удаляю в фоне")
+    return count
+
+def prepare_browsers():
+    """Перед запуском браузеров: закрыть брошенные Edge и отдать их профили на удаление"""
+    kill_zombie_edges()
+    sweep_orphan_profiles()
+
+@timed('cleanup_profiles')
+def cleanup_profiles(context: Optional[RunContext] = None):
+    """Очистка профилей прогона context (None - всех прогонов, при выходе)"""
+    contexts = [context] if context is not None else run_context.active()
+    profiles = [path for ctx in contexts for path in ctx.profiles()]
+    # Оставшиеся браузеры прогона держат файлы профилей - закрываем их первыми
+    if context is None:
+        REGISTRY.terminate(kill=True)
+    else:
+        for profile_path in profiles:
+            REGISTRY.terminate(profile_path, kill=True)
+    if not REAPER.drain(timeout=10):
+        logger.warning("Фоновое удаление профилей не завершилось, удаляю оставшиеся")
+    reaped = REAPER.summary()
+    if reaped['deleted']:
+        logger.info(f"🧹 Удалено профилей в фоне: {reaped['deleted']}, освобождено {reaped['reclaimed_mb']} МБ"
+                    + (f", не удалось: {reaped['failed']}" if reaped['failed'] else ""))
     cleanup_count = 0
-    for profile_path in CREATED_PROFILES.copy():
+    for profile_path in profiles:
         try:
             if os.path.exists(profile_path):
                 shutil.rmtree(profile_path, ignore_errors=True)
                 cleanup_count += 1
         except:
             pass
-    CREATED_PROFILES.clear()
+        run_context.forget_profile(profile_path)
     if cleanup_count > 0:
         logger.info(f"Очищено {cleanup_count} профилей Edge")
 
 atexit.register(cleanup_profiles)
 
 def kill_zombie_edges():
-    """Убивает Edge процессы"""
+    """Закрывает Edge, оставшиеся от упавших прогонов парсера.
+
+    Чужие процессы Edge (браузер пользователя, параллельные прогоны - в том числе
+    в этом же процессе) не трогаются; свои браузеры прогон закрывает сам.
+    """
     print("Закрываю Edge процессы...")
     try:
-        import psutil
-        killed_count = 0
-        for p in psutil.process_iter(['pid', 'name']):
-            if p.info['name'] and 'msedge' in p.info['name'].lower():
-                try:
-                    p.terminate()
-                    killed_count += 1
-                except:
-                    pass
+        killed_count = REGISTRY.reap_orphans()
         if killed_count > 0:
             print(f"Закрыто {killed_count} процессов")
-    except:
-        pass
+    except Exception as e:
+        logger.debug(f"Ошибка закрытия процессов Edge: {e}")
 
+@timed('create_driver')
 def create_driver(headless: bool = True, driver_path: Optional[str] = None, use_auth: bool = False) -> webdriver.Edge:
-    """Создание оптимизированного Edge драйвера"""
-    global CREATED_PROFILES
+    """Создание оптимизированного Edge драйвера; профиль записывается в контекст текущего прогона"""
+    context = run_context.current()
+    if DRIVER_FACTORY is not None:
+        driver = DRIVER_FACTORY(headless=headless, driver_path=driver_path, use_auth=use_auth)
+        if driver_tracer.TRACER is not None:
+            driver_tracer.TRACER.attach(driver)
+        driver.profile_dir = None
+        driver.navigations = 0
+        return driver
+
     options = webdriver.EdgeOptions()
 
     # Оптимизации
@@ -177,12 +286,12 @@ def create_driver(headless: bool = True, driver_path: Optional[str] = None, use_
         options.add_argument(f"--user-data-dir={profile_dir}")
         # ВАЖНО: отключаем автозаполнение и другие функции, которые могут мешать
         options.add_argument("--disable-features=AutofillServerCommunication")
-        CREATED_PROFILES.add(str(profile_dir))
+        context.add_profile(str(profile_dir))
         logger.debug(f"Создан профиль для авторизации: {profile_dir}")
     else:
         temp_dir = tempfile.mkdtemp(prefix=f"edge_temp_{uuid.uuid4().hex[:8]}_")
         options.add_argument(f"--user-data-dir={temp_dir}")
-        CREATED_PROFILES.add(temp_dir)
+        context.add_profile(temp_dir)
 
     if headless:
         options.add_argument("--headless=new")
@@ -200,21 +309,46 @@ def create_driver(headless: bool = True, driver_path: Optional[str] = None, use_
         service = Service(edge_driver_path)
         driver = webdriver.Edge(service=service, options=options)
 
+        if driver_tracer.TRACER is not None:
+            driver_tracer.TRACER.attach(driver)
+
         driver.set_page_load_timeout(15)
         driver.implicitly_wait(3)
 
+        # Профиль и счётчик переходов привязаны к самому драйверу
+        driver.profile_dir = str(profile_dir) if profile_dir else temp_dir
+        driver.navigations = 0
+        REGISTRY.register(driver.profile_dir, driver)
+
         return driver
 
     except Exception as e:
-        if profile_dir and str(profile_dir) in CREATED_PROFILES:
+        if profile_dir:
             try:
                 shutil.rmtree(profile_dir, ignore_errors=True)
-                CREATED_PROFILES.discard(str(profile_dir))
+                context.discard_profile(str(profile_dir))
             except:
                 pass
         logger.error(f"Ошибка создания Edge драйвера: {e}")
         raise
 
+def count_navigation(driver):
+    """Учитывает переход страницы для политики пересоздания драйвера"""
+    driver.navigations = getattr(driver, 'navigations', 0) + 1
+
+def open_url(driver, url: str):
+    """Переход по ссылке с учётом счётчика переходов"""
+    count_navigation(driver)
+    driver.get(url)
+
+def set_page_load_timeout(driver, seconds: float):
+    """Меняет таймаут загрузки страницы, только если он отличается от текущего"""
+    seconds = max(1, int(seconds))
+    if getattr(driver, 'page_load_timeout', 15) != seconds:
+        driver.set_page_load_timeout(seconds)
+        driver.page_load_timeout = seconds
+
+@timed('load_cookies_for_auth')
 def load_cookies_for_auth(driver):
     """Загрузка cookies по доменам с нормализацией значений (Edge/Windows).
 
@@ -222,7 +356,7 @@ def load_cookies_for_auth(driver):
     - Нормализуются ключи: domain, path, secure, httpOnly, expiry/expirationDate, sameSite
     - Cookies добавляются ПЕРЕДОМЕННО: перед добавлением переходим на нужный домен
     """
-    if STOP_PARSING:
+    if stop_requested():
         return False
 
     cookies_file = os.path.expanduser("~/.yandex_parser_auth/cookies.json")
@@ -266,7 +400,7 @@ def load_cookies_for_auth(driver):
         important_names = {'Session_id', 'sessionid2', 'yandexuid', 'i'}
 
         for idx, cookie in enumerate(cookies):
-            if STOP_PARSING:
+            if stop_requested():
                 break
             if not isinstance(cookie, dict) or 'name' not in cookie or 'value' not in cookie:
                 logger.debug(f"Cookie {idx}: пропущен (нет name или value)")
@@ -336,16 +470,16 @@ def load_cookies_for_auth(driver):
             return d.count('.')
 
         for domain in sorted(domain_to_cookies.keys(), key=domain_depth):
-            if STOP_PARSING:
+            if stop_requested():
                 break
             try:
-                driver.get(f"https://{domain}/")
-                time.sleep(1.0)
+                open_url(driver, f"https://{domain}/")
+                pause(1.0)
             except Exception as e:
                 logger.debug(f"Не удалось открыть https://{domain}/: {e}")
 
             for ck in domain_to_cookies[domain]:
-                if STOP_PARSING:
+                if stop_requested():
                     break
                 try:
                     # Пробуем без явного domain, если совпадение домена уже есть
@@ -363,10 +497,11 @@ def load_cookies_for_auth(driver):
 
         # Переходим на Маркет и обновляемся
         try:
-            driver.get("https://market.yandex.ru")
-            time.sleep(1.2)
+            open_url(driver, MARKET_URL)
+            pause(1.2)
+            count_navigation(driver)
             driver.refresh()
-            time.sleep(1.0)
+            pause(1.0)
         except Exception as e:
             logger.debug(f"Не удалось обновить страницу маркета: {e}")
 
@@ -379,6 +514,7 @@ def load_cookies_for_auth(driver):
         traceback.print_exc()
         return False
 
+@timed('extract_prices_fast')
 def extract_prices_fast(driver):
     """Быстрое извлечение цен: массово считывает первые 4 ds.valueLine + подписи"""
     price_data = {
@@ -386,7 +522,7 @@ def extract_prices_fast(driver):
         'цена для юрлиц': ''
     }
 
-    if STOP_PARSING:
+    if stop_requested():
         return price_data
 
     try:
@@ -487,6 +623,7 @@ def extract_prices_fast(driver):
         logger.error(f"Ошибка извлечения цен: {e}")
         return price_data
 
+@timed('extract_products_smart')
 def extract_products_smart(driver) -> List[Dict[str, Any]]:
     products = []
 
@@ -553,30 +690,14 @@ def extract_products_smart(driver) -> List[Dict[str, Any]]:
 
     return products
 
-def parse_price_to_number(price_str: str) -> float:
-    """Конвертирует строку цены в число для сравнения"""
-    if not price_str:
-        return float('inf')  # Бесконечность для отсутствующих цен
+def collect_prices_from_all_products(driver, products: List[Dict[str, Any]], search_term: str,
+                                     deadline: Optional[ItemDeadline] = None) -> ProductResult:
+    """Собирает цены со ВСЕХ 5 карточек и выбирает НАИМЕНЬШУЮ
 
-    try:
-        # Убираем все кроме цифр, запятых и точек
-        clean_price = re.sub(r'[^\d,.]', '', price_str)
-
-        # Заменяем запятые на точки для float
-        clean_price = clean_price.replace(',', '.')
-
-        # Убираем множественные точки (оставляем только последнюю)
-        if clean_price.count('.') > 1:
-            parts = clean_price.split('.')
-            clean_price = ''.join(parts[:-1]) + '.' + parts[-1]
-
-        return float(clean_price) if clean_price else float('inf')
-    except:
-        return float('inf')
-
-def collect_prices_from_all_products(driver, products: List[Dict[str, Any]], search_term: str) -> Dict[str, str]:
-    """Собирает цены со ВСЕХ 5 карточек и выбирает НАИМЕНЬШУЮ"""
-    result = {"цена": "", "цена для юрлиц": "", "ссылка": ""}
+    С deadline каждая карточка получает равную долю оставшегося бюджета товара;
+    когда бюджет исчерпан, выбор делается среди уже посещённых карточек.
+    """
+    result = ProductResult()
 
     if not products:
         logger.warning("Нет товаров для обработки")
@@ -584,59 +705,55 @@ def collect_prices_from_all_products(driver, products: List[Dict[str, Any]], sea
 
     # Контейнеры для всех найденных цен
     all_products_data = []
+    throttled = None
 
     logger.info(f"Собираю цены с {len(products)} карточек товаров:")
 
     # Проходим по ВСЕМ товарам и собираем цены
     for i, product in enumerate(products, 1):
-        if STOP_PARSING:
+        if stop_requested():
             break
 
         if not product.get('url'):
             logger.debug(f"Товар {i}: нет ссылки, пропуск")
             continue
 
+        if deadline is not None:
+            if deadline.expired():
+                logger.warning(f"⏱️ Бюджет товара исчерпан, осталось непосещённых карточек: {len(products) - i + 1}")
+                break
+            set_page_load_timeout(driver, min(15, deadline.card_budget(len(products) - i + 1)))
+
         try:
             short_title = product['title'][:45] + "..." if len(product['title']) > 45 else product['title']
             logger.info(f"  {i}. {short_title}")
 
-            # БЕЗОПАСНЫЙ переход с защитой от stale elements
-            for retry in range(2):
+            with span('card_load'):
+                # Переход с повтором по политике загрузки карточки
                 try:
-                    driver.get(product['url'])
-                    time.sleep(1.2)
-                    break
+                    PAGE_LOAD_RETRY.call(open_url, driver, product['url'], deadline=deadline,
+                                         should_stop=stop_requested)
+                    pause(1.2)
                 except (WebDriverException, TimeoutException):
-                    if retry == 1:
-                        logger.warning(f"     Ошибка загрузки после повтора")
-                        break
-                    time.sleep(1)
-                    continue
+                    logger.warning(f"     Ошибка загрузки после повтора")
 
-            if STOP_PARSING:
-                break
+                if stop_requested():
+                    break
 
-            # Проверяем загрузку страницы
-            try:
-                WebDriverWait(driver, 5).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-            except:
-                pass
+                # Проверяем загрузку страницы
+                try:
+                    wait_for(driver, clamp_wait(5, deadline),
+                        lambda d: d.execute_script("return document.readyState") == "complete"
+                    )
+                except:
+                    pass
 
             # Извлекаем цены
             prices = extract_prices_fast(driver)
 
             # Сохраняем данные товара с ценами
-            product_data = {
-                'title': product['title'],
-                'url': product['url'],
-                'index': i,
-                'обычная цена': prices.get('обычная цена', ''),
-                'цена для юрлиц': prices.get('цена для юрлиц', ''),
-                'regular_price_num': parse_price_to_number(prices.get('обычная цена', '')),
-                'vat_price_num': parse_price_to_number(prices.get('цена для юрлиц', ''))
-            }
+            product_data = (i, ProductResult(prices.get('обычная цена', ''),
+                                             prices.get('цена для юрлиц', ''), product['url']))
 
             all_products_data.append(product_data)
 
@@ -650,6 +767,11 @@ def collect_prices_from_all_products(driver, products: List[Dict[str, Any]], sea
             if price_info:
                 logger.info(f"     {', '.join(price_info)}")
             else:
+                # Пустая карточка может оказаться капчей - тогда дальше не идём
+                throttled = detect_throttle_page(driver)
+                if throttled:
+                    logger.warning(f"     🚦 Капча/ограничение вместо карточки ({throttled})")
+                    break
                 logger.info(f"     цены не найдены")
 
         except StaleElementReferenceException as e:
@@ -659,64 +781,72 @@ def collect_prices_from_all_products(driver, products: List[Dict[str, Any]], sea
             logger.warning(f"     Ошибка: {e}")
             continue
 
+    if throttled and not any(p.price_num != NO_PRICE for _, p in all_products_data):
+        return throttle_result()
+
     if not all_products_data:
         logger.warning("Ни один товар не дал результата")
         return result
 
     # ВЫБИРАЕМ товар с НАИМЕНЬШЕЙ обычной ценой
-    valid_products = [p for p in all_products_data if p['regular_price_num'] != float('inf')]
+    valid_products = [card for card in all_products_data if card[1].price_num != NO_PRICE]
 
     if valid_products:
         # Сортируем по обычной цене (по возрастанию)
-        best_product = min(valid_products, key=lambda x: x['regular_price_num'])
+        best_index, result = min(valid_products, key=lambda card: card[1].price_num)
 
-        result["цена"] = best_product['обычная цена']
-        result["цена для юрлиц"] = best_product['цена для юрлиц']
-        result["ссылка"] = best_product['url']
-
-        logger.info(f"ЛУЧШИЙ ВЫБОР: товар {best_product['index']} - {best_product['обычная цена']}")
+        logger.info(f"ЛУЧШИЙ ВЫБОР: товар {best_index} - {result.price}")
 
         # Показываем сравнение цен
         logger.info("Сравнение цен:")
-        for p in sorted(all_products_data, key=lambda x: x['regular_price_num']):
-            if p['regular_price_num'] != float('inf'):
-                marker = "→ ВЫБРАН" if p == best_product else ""
-                logger.info(f"  Товар {p['index']}: {p['обычная цена']} {marker}")
+        for index, p in sorted(valid_products, key=lambda card: card[1].price_num):
+            marker = "→ ВЫБРАН" if index == best_index else ""
+            logger.info(f"  Товар {index}: {p.price} {marker}")
     else:
         # Если нет обычных цен, берем первый товар с любыми данными
-        first_product = all_products_data[0]
-        result["цена"] = first_product['обычная цена']
-        result["цена для юрлиц"] = first_product['цена для юрлиц']
-        result["ссылка"] = first_product['url']
+        result = all_products_data[0][1]
 
         logger.warning("Обычные цены не найдены, взят первый товар")
 
     return result
 
-def smart_search_input(driver, search_term: str, max_retries: int = 3) -> bool:
+@timed('smart_search_input')
+def smart_search_input(driver, search_term: str, max_retries: Optional[int] = None,
+                       deadline: Optional[ItemDeadline] = None) -> bool:
     """УЛУЧШЕННАЯ функция поиска с определением текущего состояния страницы"""
     current_url = driver.current_url
 
-    # Проверяем, находимся ли мы уже на странице поиска
-    if 'search' in current_url and 'text=' in current_url:
-        logger.debug("Уже на странице поиска, обновляем запрос")
-        # Пытаемся найти поле поиска на странице результатов
-        return update_search_query(driver, search_term, max_retries)
-    else:
-        logger.debug("На главной странице, выполняем новый поиск")
-        # Выполняем поиск с главной страницы
-        return perform_new_search(driver, search_term, max_retries)
+    # Поиск ограничен своей долей бюджета товара
+    search_deadline = ItemDeadline(deadline.search_budget()) if deadline is not None else None
 
-def update_search_query(driver, search_term: str, max_retries: int = 3) -> bool:
+    try:
+        # Проверяем, находимся ли мы уже на странице поиска
+        if 'search' in current_url and 'text=' in current_url:
+            logger.debug("Уже на странице поиска, обновляем запрос")
+            # Пытаемся найти поле поиска на странице результатов
+            return update_search_query(driver, search_term, max_retries, search_deadline)
+        else:
+            logger.debug("На главной странице, выполняем новый поиск")
+            # Выполняем поиск с главной страницы
+            return perform_new_search(driver, search_term, max_retries, search_deadline)
+    except ItemTimeout:
+        # Исчерпана доля поиска - это неудачный поиск; таймаут товара - только по его бюджету
+        deadline.check("поиск")
+        logger.warning("Поиск не уложился в свою долю бюджета товара")
+        return False
+
+def update_search_query(driver, search_term: str, max_retries: Optional[int] = None,
+                        deadline: Optional[ItemDeadline] = None) -> bool:
     """Обновляет поисковый запрос на странице результатов"""
+    policy = SEARCH_RETRY.with_attempts(max_retries)
 
-    for retry in range(max_retries):
-        if STOP_PARSING:
-            return False
+    for attempt in policy.attempts(deadline=deadline, should_stop=stop_requested):
+        if deadline is not None:
+            deadline.check("поиск")
 
         try:
             # Ждем загрузки страницы
-            WebDriverWait(driver, 3).until(
+            wait_for(driver, clamp_wait(3, deadline),
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
 
@@ -735,8 +865,10 @@ def update_search_query(driver, search_term: str, max_retries: int = 3) -> bool:
 
             searchbox = None
             for selector in search_selectors:
+                if deadline is not None and deadline.expired():
+                    break
                 try:
-                    searchbox = WebDriverWait(driver, 2).until(
+                    searchbox = wait_for(driver, clamp_wait(2, deadline),
                         EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
                     )
                     logger.debug(f"Найдено поле поиска: {selector}")
@@ -745,59 +877,56 @@ def update_search_query(driver, search_term: str, max_retries: int = 3) -> bool:
                     continue
 
             if not searchbox:
-                logger.warning(f"Попытка {retry + 1}: поле поиска не найдено на странице результатов")
-                if retry < max_retries - 1:
-                    # Пытаемся перейти на главную страницу
-                    driver.get("https://market.yandex.ru")
-                    time.sleep(1)
-                    continue
-                return False
+                logger.warning(f"Попытка {attempt.number + 1}: поле поиска не найдено на странице результатов")
+                if attempt.last:
+                    return False
+                # Пытаемся перейти на главную страницу
+                open_url(driver, MARKET_URL)
+                continue
 
             # Обновляем поисковый запрос
-            try:
-                # Очищаем текущий запрос
-                searchbox.clear()
-                time.sleep(0.3)
-
-                # Вводим новый запрос
-                searchbox.send_keys(search_term[:50])
-                time.sleep(0.3)
-                searchbox.send_keys(Keys.RETURN)
-                time.sleep(1.5)
-                return True
-
-            except StaleElementReferenceException:
-                logger.warning(f"Попытка {retry + 1}: StaleElement при обновлении запроса")
-                if retry < max_retries - 1:
-                    time.sleep(1)
-                    continue
+            # Очищаем текущий запрос
+            searchbox.clear()
+            pause(0.3)
+
+            # Вводим новый запрос
+            searchbox.send_keys(search_term[:50])
+            pause(0.3)
+            searchbox.send_keys(Keys.RETURN)
+            count_navigation(driver)
+            pause(1.5)
+            return True
+
+        except StaleElementReferenceException:
+            logger.warning(f"Попытка {attempt.number + 1}: StaleElement при обновлении запроса")
+            if attempt.last:
                 return False
 
         except Exception as e:
-            logger.warning(f"Попытка {retry + 1} обновления запроса: {e}")
-            if retry < max_retries - 1:
-                time.sleep(1)
-                continue
-            return False
+            logger.warning(f"Попытка {attempt.number + 1} обновления запроса: {e}")
+            if attempt.last or not policy.is_retryable(e):
+                return False
 
     return False
 
-def perform_new_search(driver, search_term: str, max_retries: int = 3) -> bool:
+def perform_new_search(driver, search_term: str, max_retries: Optional[int] = None,
+                       deadline: Optional[ItemDeadline] = None) -> bool:
     """Выполняет новый поиск с главной страницы"""
+    policy = SEARCH_RETRY.with_attempts(max_retries)
 
-    for retry in range(max_retries):
-        if STOP_PARSING:
-            return False
+    for attempt in policy.attempts(deadline=deadline, should_stop=stop_requested):
+        if deadline is not None:
+            deadline.check("поиск")
 
         try:
             # Ждем загрузки страницы
-            WebDriverWait(driver, 5).until(
+            wait_for(driver, clamp_wait(5, deadline),
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
 
             # Находим поле поиска
             searchbox = None
-            wait = WebDriverWait(driver, 5)
+            search_timeout = clamp_wait(5, deadline)
 
             for selector_type, selector in [
                 (By.NAME, "text"),
@@ -805,218 +934,381 @@ def perform_new_search(driver, search_term: str, max_retries: int = 3) -> bool:
                 (By.CSS_SELECTOR, "[data-auto='search-input']")
             ]:
                 try:
-                    searchbox = wait.until(EC.element_to_be_clickable((selector_type, selector)))
+                    searchbox = wait_for(driver, search_timeout, EC.element_to_be_clickable((selector_type, selector)))
                     break
                 except TimeoutException:
                     continue
 
             if not searchbox:
-                logger.warning(f"Попытка {retry + 1}: поле поиска не найдено на главной")
-                if retry < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                return False
+                logger.warning(f"Попытка {attempt.number + 1}: поле поиска не найдено на главной")
+                if attempt.last:
+                    return False
+                continue
 
             # Выполняем поиск
-            try:
-                searchbox.clear()
-                searchbox.send_keys(search_term[:50])
-                searchbox.send_keys(Keys.RETURN)
-                time.sleep(1.5)
-                return True
-
-            except StaleElementReferenceException:
-                logger.warning(f"Попытка {retry + 1}: StaleElement при новом поиске")
-                if retry < max_retries - 1:
-                    time.sleep(1)
-                    continue
+            searchbox.clear()
+            searchbox.send_keys(search_term[:50])
+            searchbox.send_keys(Keys.RETURN)
+            count_navigation(driver)
+            pause(1.5)
+            return True
+
+        except StaleElementReferenceException:
+            logger.warning(f"Попытка {attempt.number + 1}: StaleElement при новом поиске")
+            if attempt.last:
                 return False
 
         except Exception as e:
-            logger.warning(f"Попытка {retry + 1} нового поиска: {e}")
-            if retry < max_retries - 1:
-                time.sleep(1)
-                continue
-            return False
+            logger.warning(f"Попытка {attempt.number + 1} нового поиска: {e}")
+            if attempt.last or not policy.is_retryable(e):
+                return False
 
     return False
 
+def error_result() -> ProductResult:
+    """Результат товара, обработка которого упала с ошибкой"""
+    return ProductResult.marked(ERROR_MARK)
+
+def timeout_result() -> ProductResult:
+    """Результат товара, не уложившегося в бюджет времени"""
+    return ProductResult.marked(TIMEOUT_MARK)
+
+def throttle_result() -> ProductResult:
+    """Результат товара, вместо страниц которого пришла капча"""
+    return ProductResult.marked(THROTTLE_MARK)
+
 def get_prices(product_name: str, headless: bool = True, driver_path: Optional[str] = None,
-              timeout: int = 15, use_business_auth: bool = False) -> Dict[str, str]:
-    """Главная функция получения цен с выбором наименьшей из 5 карточек"""
-    result = {"цена": "", "цена для юрлиц": "", "ссылка": ""}
+              timeout: int = 15, use_business_auth: bool = False, session=None,
+              deadline: Optional[ItemDeadline] = None) -> ProductResult:
+    """Главная функция получения цен с выбором наименьшей из 5 карточек
+
+    Если передана session (DriverSession), драйвер берётся из неё и не закрывается
+    после товара; иначе создаётся отдельный драйвер на один товар.
+    Если передан deadline и товар в него не уложился, цены помечаются TIMEOUT_MARK.
+    """
+    result = ProductResult()
     driver = None
     current_profile_path = None
 
-    if STOP_PARSING:
+    if stop_requested():
         return result
 
     try:
-        driver = create_driver(headless=headless, driver_path=driver_path, use_auth=use_business_auth)
-
-        # Отслеживаем профиль для очистки
-        if use_business_auth:
-            for profile_path in CREATED_PROFILES:
-                if 'edge_profile_' in profile_path:
-                    current_profile_path = profile_path
-                    break
+        if session is not None:
+            driver = session.acquire()
         else:
-            for profile_path in CREATED_PROFILES:
-                if 'edge_temp_' in profile_path:
-                    current_profile_path = profile_path
-                    break
+            driver = create_driver(headless=headless, driver_path=driver_path, use_auth=use_business_auth)
 
-        # Загрузка cookies для авторизации
-        if use_business_auth and not STOP_PARSING:
-            auth_success = load_cookies_for_auth(driver)
-            if auth_success:
-                logger.info("✓ Авторизация успешна")
-            else:
-                logger.warning("⚠ Авторизация не удалась, продолжаю без неё")
+            # Отслеживаем профиль для очистки
+            current_profile_path = getattr(driver, 'profile_dir', None)
+
+            # Загрузка cookies для авторизации
+            if use_business_auth and not stop_requested():
+                auth_success = load_cookies_for_auth(driver)
+                if auth_success:
+                    logger.info("✓ Авторизация успешна")
+                else:
+                    logger.warning("⚠ Авторизация не удалась, продолжаю без неё")
 
-        if STOP_PARSING:
+        if stop_requested():
             return result
 
+        # Таймаут загрузки не больше остатка бюджета (карточки сузят его ещё)
+        if deadline is not None:
+            deadline.check("создание драйвера")
+            set_page_load_timeout(driver, min(15, deadline.remaining()))
+
         # Переход на маркет (только если не на странице поиска)
         # cookies уже загружены в load_cookies_for_auth, поэтому пропускаем если уже на маркете
         current_url = driver.current_url
-        if 'market.yandex.ru' not in current_url:
+        if not on_market(current_url):
             try:
-                driver.get("https://market.yandex.ru")
-                time.sleep(1.0)  # Немного увеличено время ожидания
+                PAGE_LOAD_RETRY.call(open_url, driver, MARKET_URL, deadline=deadline,
+                                     should_stop=stop_requested)
+                pause(1.0)  # Немного увеличено время ожидания
             except Exception as e:
                 logger.error(f"Ошибка перехода на маркет: {e}")
-                return result
+                if session is not None:
+                    session.mark_broken()
+                return error_result()
 
-        if STOP_PARSING:
+        if stop_requested():
             return result
 
         # УЛУЧШЕННЫЙ поиск с определением состояния страницы
-        search_success = smart_search_input(driver, product_name)
+        search_success = smart_search_input(driver, product_name, deadline=deadline)
         if not search_success:
+            throttled = detect_throttle_page(driver)
+            if throttled:
+                logger.warning(f"🚦 Поиск упёрся в капчу/ограничение ({throttled})")
+                return throttle_result()
             logger.error("Не удалось выполнить поиск")
-            return result
+            return error_result()
 
-        if STOP_PARSING:
+        if stop_requested():
             return result
 
         # Извлечение товаров
         products = extract_products_smart(driver)
         if not products:
+            throttled = detect_throttle_page(driver)
+            if throttled:
+                logger.warning(f"🚦 Вместо выдачи пришла капча/ограничение ({throttled})")
+                return throttle_result()
             logger.warning("Товары не найдены")
             return result
 
-        if STOP_PARSING:
+        if stop_requested():
             return result
 
         # Собираем цены со ВСЕХ товаров и выбираем НАИМЕНЬШУЮ
-        result = collect_prices_from_all_products(driver, products, product_name)
+        result = collect_prices_from_all_products(driver, products, product_name, deadline=deadline)
+
+        if not result.price and deadline is not None and deadline.expired():
+            result = timeout_result()
 
         return result
 
+    except ItemTimeout as e:
+        logger.warning(f"⏱️ Товар {product_name[:30]}... не уложился в бюджет: {e}")
+        return timeout_result()
+
     except Exception as e:
-        logger.error(f"Ошибка обработки товара {product_name[:30]}...: {e}")
+        if (session is not None and session.timed_out) or (deadline is not None and deadline.expired()):
+            logger.warning(f"⏱️ Товар {product_name[:30]}... прерван по таймауту: {e}")
+            result = timeout_result()
+        else:
+            logger.error(f"Ошибка обработки товара {product_name[:30]}...: {e}")
+            result = error_result()
+        if session is not None:
+            session.mark_broken()
         return result
 
     finally:
-        if driver:
+        if driver and session is None:
+            # Дочерние процессы браузера появляются по ходу работы - дописываем их до quit()
+            REGISTRY.register(current_profile_path, driver)
             try:
                 driver.quit()
             except:
                 pass
 
-        # Очистка профиля
+        # Очистка профиля - в фоне
         if current_profile_path:
-            success = cleanup_single_profile(current_profile_path)
-            if success:
-                CREATED_PROFILES.discard(current_profile_path)
+            REAPER.submit(current_profile_path)
 
 def parse_tender_excel(input_file: str, output_file: str, headless: bool = True,
                       workers: int = 1, driver_path: Optional[str] = None,
-                      auto_save: bool = True, use_business_auth: bool = False) -> pd.DataFrame:
-    """ОСНОВНАЯ функция парсинга с автосохранением и ТЕНДЕРНЫМ ФОРМАТОМ"""
-    global STOP_PARSING, CURRENT_DATAFRAME, CURRENT_OUTPUT_FILE, CURRENT_INPUT_FILE
+                      auto_save: bool = True, use_business_auth: bool = False,
+                      recycle_policy: Optional[RecyclePolicy] = None,
+                      item_budget: float = 90.0, timings_file: Optional[str] = None,
+                      trace_webdriver: bool = False,
+                      context: Optional[RunContext] = None,
+                      db_path: Optional[str] = None,
+                      refresh_older_than: Optional[float] = None,
+                      engine=None) -> pd.DataFrame:
+    """ОСНОВНАЯ функция парсинга с автосохранением и ТЕНДЕРНЫМ ФОРМАТОМ
+
+    timings_file - включает замеры этапов: строки JSON по товарам пишутся в файл,
+    сводка p50/p95/max по этапам выводится в лог в конце.
+    trace_webdriver - считает команды WebDriver по типам и местам вызова и
+    выводит самые частые/долгие в конце прогона.
+
+    Браузеры (и авторизация) запускаются в фоне сразу, файл тендера читается
+    параллельно, а первый товар уходит в работу, как только он прочитан.
+    context - состояние прогона (остановка, профили, результаты); по умолчанию
+    создаётся новый, так что несколько тендеров могут идти одновременно.
+    Переданный контекст не сбрасывается: если он уже остановлен, тендер не
+    начинается и возвращается пустой DataFrame.
+    db_path - база истории цен (price_db): каждый результат пишется в неё,
+    а итоговая тендерная таблица собирается из базы; id тендера - в df.attrs.
+    refresh_older_than - режим обновления (нужна db_path): товары, чья последняя
+    цена в истории успешна и не старше стольких секунд, не парсятся - цена берётся
+    из истории и помечается в выгрузке датой; число таких товаров - df.attrs['reused'].
+    engine - готовый ScrapeEngine (обычно с keep_sessions): тендер идёт на его уже
+    запущенных браузерах, а headless/workers/driver_path/use_business_auth/
+    recycle_policy/item_budget берутся из движка. Контекст прогона - engine.context;
+    браузеры движка после тендера не закрываются.
+    """
+    from scrape_engine import ScrapeEngine
+
+    if refresh_older_than is not None and not db_path:
+        raise ValueError("Режим обновления работает только с базой истории цен (db_path)")
+    own_engine = engine is None
+    if not own_engine:
+        if context is not None and context is not engine.context:
+            raise ValueError("context должен совпадать с контекстом движка (engine.context)")
+        context = engine.context
+        workers = engine.workers
+        use_business_auth = engine.use_auth
 
     # Настройка автосохранения при завершении
     setup_signal_handlers()
 
-    STOP_PARSING = False
-    CURRENT_INPUT_FILE = input_file
-    CURRENT_OUTPUT_FILE = output_file
-
-    kill_zombie_edges()
-
-    items = extract_products_from_excel(input_file)
-    if items.empty:
-        raise ValueError("Не найдены товары в файле")
-
-    # DataFrame для хранения результатов парсинга
-    df = pd.DataFrame({
-        'наименование': items['name'],
-        'цена': '',
-        'цена для юрлиц': '',
-        'ссылка': ''
-    })
-
-    CURRENT_DATAFRAME = df  # Для автосохранения
+    if context is None:
+        context = RunContext(input_file, output_file)
+    else:
+        # Контекст вызывающего (или движка) не сбрасывается: остановка, пришедшая
+        # до вызова, не должна потеряться - тендер тогда не начинается
+        if context.stopped:
+            logger.info("Прогон уже остановлен, тендер не начат")
+            return ResultStore().to_dataframe()
+        context.input_file = input_file
+        context.output_file = output_file
+
+    own_timer = timings_file is not None and timing.TIMER is None
+    if own_timer:
+        timing.enable_timing(timings_file)
+        logger.info(f"⏱️ Замеры этапов включены: {timings_file}")
+
+    own_tracer = trace_webdriver and driver_tracer.TRACER is None
+    if own_tracer:
+        driver_tracer.enable_tracing()
+        logger.info("🔌 Трассировка команд WebDriver включена")
+
+    if own_engine:
+        engine = ScrapeEngine(headless=headless, driver_path=driver_path, use_auth=use_business_auth,
+                              workers=workers, policy=recycle_policy, item_budget=item_budget,
+                              context=context)
+        # Старые процессы Edge закрываются до запуска новых, пока читается файл
+        engine.prestart(prepare=prepare_browsers)
 
     auth_text = "с авторизацией" if use_business_auth else "без авторизации"
-    logger.info(f"Начинаю обработку {len(df)} товаров {auth_text}")
+    logger.info(f"Начинаю обработку товаров {auth_text} по мере чтения файла")
     logger.info("🔄 Автосохранение при принудительном завершении АКТИВНО")
     logger.info("📋 РЕЗУЛЬТАТ: тендерная таблица с колонкой 'Яндекс Маркет'")
     logger.info("Режим: поиск наименьшей цены среди 5 карточек")
 
-    try:
-        for idx, row in df.iterrows():
-            if STOP_PARSING:
-                logger.info("Парсинг остановлен")
-                break
-
+    results = ResultStore()  # строки добавляются по мере чтения файла
+    context.results = results  # Для автосохранения и снимка
+
+    db = tender_id = None
+    if db_path:
+        from price_db import PriceDB
+        db = PriceDB(db_path)
+        tender_id = db.start_tender(input_file, output_file)
+        logger.info(f"🗄️ История цен: {db_path}, тендер #{tender_id}")
+    results_lock = threading.Lock()
+    read_done = False
+    done_count = 0
+
+    def products():
+        """Товары по мере чтения файла"""
+        nonlocal read_done
+        for item in iter_products_from_excel(input_file):
+            idx = results.add(item['name'])
+            if refresh_older_than is not None:
+                cached = db.reusable(item['name'], refresh_older_than)
+                if cached is not None:
+                    price_id, result, scraped_at = cached
+                    results.set(idx, result, cached_at=scraped_at)
+                    db.reuse(tender_id, idx, item['name'], price_id)
+                    continue
+            yield idx, item['name']
+        read_done = True
+        logger.info(f"📦 Файл прочитан: {len(results)} товаров")
+        if db is not None:
+            db.add_items(tender_id, results.names)
+        if refresh_older_than is not None:
+            reused = results.reused()
+            oldest = min((results.cached_at[i] for i in reused), default=None)
+            logger.info(f"♻️ Цены из истории: {len(reused)} товаров"
+                        + (f" (самой старой {format_age(time.time() - oldest)})" if oldest else "")
+                        + f", к обновлению: {len(results) - len(reused)}")
+
+    def on_result(idx: int, result: ProductResult):
+        nonlocal done_count
+        results.set(idx, result)
+        if db is not None:
             try:
-                logger.info(f"Обработка: {idx + 1}/{len(df)} - {row['наименование'][:40]}...")
-
-                prices = get_prices(row['наименование'], headless, driver_path, 20, use_business_auth)
-
-                df.at[idx, 'цена'] = prices.get('цена', '')
-                df.at[idx, 'цена для юрлиц'] = prices.get('цена для юрлиц', '')
-                df.at[idx, 'ссылка'] = prices.get('ссылка', '')
+                db.record(tender_id, idx, results.names[idx], result)
+            except Exception as e:
+                logger.warning(f"Ошибка записи в историю цен: {e}")
+        with results_lock:
+            done_count += 1
+            total = len(results) if read_done else "?"
+
+            # Лог результата
+            price_summary = []
+            if result.price:
+                price_summary.append(f"Лучшая цена: {result.price[:15]}")
+            if result.business_price:
+                price_summary.append(f"Для юрлиц: {result.business_price[:15]}")
+
+            if price_summary:
+                logger.info(f"Результат {idx + 1}/{total}: {', '.join(price_summary)}")
+            else:
+                logger.info(f"Результат {idx + 1}/{total}: цены не найдены")
 
-                # Лог результата
-                price_summary = []
-                if prices.get('цена'):
-                    price_summary.append(f"Лучшая цена: {prices['цена'][:15]}")
-                if prices.get('цена для юрлиц'):
-                    price_summary.append(f"Для юрлиц: {prices['цена для юрлиц'][:15]}")
+            # Автосохранение каждые 3 товара В ТЕНДЕРНОМ ФОРМАТЕ (когда файл прочитан целиком)
+            if auto_save and read_done and done_count % 3 == 0:
+                try:
+                    save_results_into_tender_format(input_file, output_file, results.to_dataframe())
+                    logger.info(f"Автосохранение тендера: {done_count}/{len(results)}")
+                except Exception as e:
+                    logger.warning(f"Ошибка автосохранения: {e}")
 
-                if price_summary:
-                    logger.info(f"Результат {idx + 1}/{len(df)}: {', '.join(price_summary)}")
-                else:
-                    logger.info(f"Результат {idx + 1}/{len(df)}: цены не найдены")
+    # Свои таймер и трассировщик выключаются при любом исходе - иначе следующий прогон
+    # в этом процессе посчитал бы их чужими и не записал свои замеры
+    try:
+        try:
+            run_stats = engine.run(products(), on_result)
+            if context.stopped:
+                logger.info("Парсинг остановлен")
+            if db is not None:
+                if not read_done:
+                    db.add_items(tender_id, results.names)  # остановлен до конца чтения файла
+                db.finish_tender(tender_id, len(results))
+
+        finally:
+            if own_engine:
+                cleanup_profiles(context)
+            context.results = None
+            if db is not None:
+                db.close()
+
+        if not len(results):
+            raise NoProductsError("Не найдены товары в файле")
+
+        # DataFrame собирается один раз - для выгрузки и вызывающего кода
+        df = results.to_dataframe()
+
+        logger.info(f"📈 Статистика прогона: товаров {run_stats.get('items', 0)}, "
+                    f"драйверов создано {run_stats.get('drivers_created', 0)}, "
+                    f"пересозданий {run_stats.get('recycled', 0)}, "
+                    f"таймаутов {run_stats.get('timeouts', 0)} (убито драйверов: {run_stats.get('watchdog_kills', 0)}), "
+                    f"капч {run_stats.get('throttle_events', 0)}, потоков в конце {run_stats.get('concurrency', workers)}, "
+                    f"отложено {run_stats.get('deferred', 0)}, спасено повтором {run_stats.get('recovered', 0)}")
+        df.attrs['run_stats'] = run_stats
+
+        # Финальное сохранение В ТЕНДЕРНОМ ФОРМАТЕ (из базы истории, если она ведётся)
+        if db is not None:
+            df.attrs['tender_id'] = tender_id
+            df.attrs['reused'] = len(results.reused())
+        if output_file != "auto":
+            if db is not None:
+                from price_db import PriceDB
+                with PriceDB(db_path) as export_db:
+                    export_db.export_tender(tender_id, output_file)
+            else:
+                save_results_into_tender_format(input_file, output_file, df)
+            logger.info(f"🎯 ТЕНДЕРНАЯ ТАБЛИЦА ГОТОВА: {output_file}")
+            logger.info("📊 Создана точная копия оригинала + колонка 'Яндекс Маркет'")
 
-                # Автосохранение каждые 3 товара В ТЕНДЕРНОМ ФОРМАТЕ
-                if auto_save and (idx + 1) % 3 == 0:
-                    try:
-                        save_results_into_tender_format(input_file, output_file, df)
-                        logger.info(f"Автосохранение тендера: {idx + 1}/{len(df)}")
-                    except Exception as e:
-                        logger.warning(f"Ошибка автосохранения: {e}")
+        if driver_tracer.TRACER is not None:
+            driver_tracer.TRACER.log_report()
+            df.attrs['webdriver_calls'] = driver_tracer.TRACER.summary()
 
-            except Exception as e:
-                logger.error(f"Ошибка товара {idx + 1}: {e}")
-                df.at[idx, 'цена'] = "ОШИБКА"
-                df.at[idx, 'цена для юрлиц'] = "ОШИБКА"
+        if timing.TIMER is not None:
+            timing.TIMER.log_summary()
+            df.attrs['stage_timings'] = timing.TIMER.summary()
 
+        return df
     finally:
-        cleanup_profiles()
-        CURRENT_DATAFRAME = None  # Очищаем глобальную переменную
-
-    # Финальное сохранение В ТЕНДЕРНОМ ФОРМАТЕ
-    if output_file != "auto":
-        save_results_into_tender_format(input_file, output_file, df)
-        logger.info(f"🎯 ТЕНДЕРНАЯ ТАБЛИЦА ГОТОВА: {output_file}")
-        logger.info("📊 Создана точная копия оригинала + колонка 'Яндекс Маркет'")
-
-    return df
+        if own_tracer:
+            driver_tracer.disable_tracing()
+        if own_timer:
+            timing.disable_timing()
 
 if __name__ == "__main__":
     test_product = "Точка доступа Ubiquiti UniFi AC Pro AP"
@@ -1024,7 +1316,7 @@ if __name__ == "__main__":
     result = get_prices(test_product, headless=False, use_business_auth=True)
 
     print(f"Товар: {test_product}")
-    print(f"Лучшая цена: {result['цена']}")
-    print(f"Цена для юрлиц: {result['цена для юрлиц'] or 'НЕ НАЙДЕНА'}")
-    print(f"Ссылка: {result['ссылка']}")
+    print(f"Лучшая цена: {result.price}")
+    print(f"Цена для юрлиц: {result.business_price or 'НЕ НАЙДЕНА'}")
+    print(f"Ссылка: {result.url}")
     print("-" * 50)
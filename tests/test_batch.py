@@ -0,0 +1,121 @@
+# Пакетная обработка: дедупликация товаров между тендерами, запись по готовности и flush
+
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "bench"))
+
+import timing
+import waits
+import scrape_engine
+import tender_parser
+from fake_driver import FakeMarket
+from synthetic_tender import make_tender
+from batch import TenderBatch, find_tender_files, output_path_for, parse_tender_batch, product_key
+from price_db import PriceDB
+from results import ProductResult
+
+
+@pytest.fixture
+def tenders(tmp_path):
+    """a и b - одни и те же 4 товара, c - 3 других"""
+    inbox = tmp_path / "tenders"
+    return [make_tender(str(inbox / "a.xlsx"), items=4, seed=1),
+            make_tender(str(inbox / "b.xlsx"), items=4, seed=1),
+            make_tender(str(inbox / "c.xlsx"), items=3, seed=2)]
+
+
+@pytest.fixture
+def fake_market(monkeypatch):
+    market = FakeMarket()
+    monkeypatch.setattr(tender_parser, "setup_signal_handlers", lambda: None)
+    tender_parser.set_driver_factory(market.factory)
+    waits.set_pause_scale(0)
+    yield market
+    tender_parser.set_driver_factory(None)
+    waits.set_pause_scale(1)
+
+
+def test_find_tender_files_skips_outputs_and_temp_files(tenders, tmp_path):
+    inbox = os.path.dirname(tenders[0])
+    open(os.path.join(inbox, "a_results.xlsx"), "w").close()
+    open(os.path.join(inbox, "~$a.xlsx"), "w").close()
+    open(os.path.join(inbox, "notes.txt"), "w").close()
+    assert find_tender_files(inbox) == sorted(os.path.abspath(path) for path in tenders)
+    assert product_key("  Мышь   Logitech ") == product_key("мышь logitech")
+
+
+def test_duplicates_are_scraped_once_and_every_tender_is_written(tenders, tmp_path):
+    batch = TenderBatch(str(tmp_path / "out"))
+    os.makedirs(batch.output_dir)
+    items = list(batch.items(tenders))
+    assert [uidx for uidx, _ in items] == list(range(7))
+    assert (batch.unique_count, batch.duplicates) == (7, 4)
+
+    for uidx, name in items:
+        batch.on_result(uidx, ProductResult(f"{uidx + 1} 000 ₽"))
+    batch.close()
+
+    for job in batch.jobs:
+        summary = job.summary()
+        assert summary['output_file'] == output_path_for(job.input_file, batch.output_dir)
+        assert os.path.exists(summary['output_file'])
+        assert summary['priced'] == summary['items']
+    assert batch.jobs[0].results.prices == batch.jobs[1].results.prices
+
+
+def test_flush_writes_unfinished_tenders(tenders, tmp_path):
+    output_dir = str(tmp_path / "out")
+    os.makedirs(output_dir)
+    with PriceDB(str(tmp_path / "prices.db")) as db:
+        batch = TenderBatch(output_dir, db=db)
+        items = batch.items(tenders)
+        uidx, _ = next(items)
+        next(items)
+        batch.on_result(uidx, ProductResult("1 000 ₽"))
+        items.close()  # остановка посреди чтения файла
+        batch.flush()
+        batch.close()
+
+        job = batch.jobs[0]
+        assert job.waiting > 0
+        assert os.path.exists(job.output_file)
+        # Товары, прочитанные до остановки, есть в выгрузке из истории
+        assert len(db.tender_results(job.tender_id)) == len(job.results)
+
+
+def test_parse_tender_batch_on_fake_driver(tenders, tmp_path, fake_market):
+    db_path = str(tmp_path / "prices.db")
+    summary = parse_tender_batch(tenders, str(tmp_path / "out"), workers=2, db_path=db_path)
+
+    assert summary['written'] == 3
+    assert (summary['unique_items'], summary['duplicates'], summary['scraped']) == (7, 4, 7)
+    assert [tender['items'] for tender in summary['tenders']] == [4, 4, 3]
+    assert all(tender['priced'] == tender['items'] for tender in summary['tenders'])
+
+    # Повторный пакет в режиме обновления берёт все цены из истории
+    again = parse_tender_batch(tenders, str(tmp_path / "again"), db_path=db_path, refresh_older_than=3600)
+    assert (again['scraped'], again['reused']) == (0, 7)
+    assert again['written'] == 3
+
+
+def test_engine_error_still_writes_tenders_and_releases_timer(tenders, tmp_path, fake_market, monkeypatch):
+    def failing_run(self, items, on_result, on_start=None):
+        for n, (uidx, name) in enumerate(items):
+            if n == 5:
+                raise RuntimeError("движок упал")
+            on_result(uidx, ProductResult("1 000 ₽"))
+
+    monkeypatch.setattr(scrape_engine.ScrapeEngine, "prestart", lambda self, prepare=None: None)
+    monkeypatch.setattr(scrape_engine.ScrapeEngine, "run", failing_run)
+    output_dir = str(tmp_path / "out")
+
+    with pytest.raises(RuntimeError):
+        parse_tender_batch(tenders, output_dir, timings_file=str(tmp_path / "timings.jsonl"))
+
+    assert timing.TIMER is None
+    assert sorted(os.listdir(output_dir)) == ["a_results.xlsx", "b_results.xlsx", "c_results.xlsx"]
@@ -0,0 +1,96 @@
+# Бюджет времени на товар (ItemDeadline) и сторожевой поток драйверов (DriverWatchdog)
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadline import ItemDeadline, ItemTimeout, clamp_wait
+from driver_session import DriverWatchdog
+
+
+def test_budget_is_split_between_search_and_cards():
+    deadline = ItemDeadline(100, search_share=0.25)
+    assert deadline.search_budget() == pytest.approx(25, abs=0.5)
+    assert deadline.card_budget(4) == pytest.approx(25, abs=0.5)
+    assert deadline.card_budget(0) == pytest.approx(100, abs=0.5)
+
+
+def test_check_raises_only_after_expiry():
+    ItemDeadline(60).check("поиск")
+
+    deadline = ItemDeadline(0.01)
+    time.sleep(0.02)
+    assert deadline.expired()
+    assert not deadline.expired(grace=5)
+    assert deadline.search_budget() == 0.0
+    with pytest.raises(ItemTimeout, match="поиск"):
+        deadline.check("поиск")
+
+
+def test_clamp_wait():
+    assert clamp_wait(5, None) == 5
+    assert clamp_wait(5, ItemDeadline(60)) == 5
+    assert clamp_wait(5, ItemDeadline(1)) <= 1
+
+    expired = ItemDeadline(0.01)
+    time.sleep(0.02)
+    assert clamp_wait(5, expired) == 0.1
+
+
+class _Session:
+    """Сессия для сторожа: бюджет текущего товара и отметка об убийстве драйвера"""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.timed_out = False
+        self.kills = 0
+
+    def kill(self):
+        self.kills += 1
+        self.timed_out = True
+
+
+def _wait(condition, timeout: float = 2.0):
+    stop_at = time.monotonic() + timeout
+    while not condition() and time.monotonic() < stop_at:
+        time.sleep(0.01)
+
+
+def test_watchdog_kills_only_expired_sessions_once():
+    hung = _Session(ItemDeadline(0.01))
+    busy = _Session(ItemDeadline(60))
+    idle = _Session(None)
+
+    watchdog = DriverWatchdog(grace=0.0, interval=0.01)
+    for session in (hung, busy, idle):
+        watchdog.watch(session)
+    watchdog.start()
+    try:
+        _wait(lambda: hung.kills)
+        time.sleep(0.05)
+    finally:
+        watchdog.stop()
+
+    assert hung.kills == 1
+    assert busy.kills == 0
+    assert idle.kills == 0
+
+
+def test_watchdog_respects_grace_and_unwatch():
+    late = _Session(ItemDeadline(0.01))
+    gone = _Session(ItemDeadline(0.01))
+
+    watchdog = DriverWatchdog(grace=60.0, interval=0.01)
+    watchdog.watch(late)
+    watchdog.watch(gone)
+    watchdog.unwatch(gone)
+    watchdog.start()
+    time.sleep(0.1)
+    watchdog.stop()
+
+    assert late.kills == 0
+    assert gone.kills == 0
@@ -0,0 +1,74 @@
+# Политика пересоздания драйвера DriverSession - без браузера, на заглушке драйвера
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_session import DriverSession, RecyclePolicy
+
+
+class _Driver:
+    """Драйвер без процессов: память не измеряется, переходы задаются тестом"""
+
+    def __init__(self, navigations: int = 0):
+        self.navigations = navigations
+
+
+class _Stats:
+    def __init__(self):
+        self.counters = {}
+
+    def incr(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+
+def _session(policy: RecyclePolicy, navigations: int = 0, age_minutes: float = 0.0, stats=None) -> DriverSession:
+    session = DriverSession(policy=policy, stats=stats)
+    session.driver = _Driver(navigations)
+    session.started_at = time.time() - age_minutes * 60
+    return session
+
+
+def test_no_driver_needs_no_recycle():
+    assert DriverSession(policy=RecyclePolicy()).recycle_reason() is None
+
+
+def test_fresh_driver_is_kept():
+    assert _session(RecyclePolicy(), navigations=10, age_minutes=1).recycle_reason() is None
+
+
+def test_recycle_reasons():
+    policy = RecyclePolicy(max_navigations=5, max_age_minutes=10, max_memory_mb=0)
+    assert _session(policy, navigations=5).recycle_reason() == 'navigations'
+    assert _session(policy, age_minutes=11).recycle_reason() == 'age'
+
+    broken = _session(policy)
+    broken.mark_broken()
+    assert broken.recycle_reason() == 'broken'
+
+
+def test_zero_limits_are_not_checked():
+    policy = RecyclePolicy(max_navigations=0, max_age_minutes=0, max_memory_mb=0)
+    assert _session(policy, navigations=10 ** 6, age_minutes=10 ** 4).recycle_reason() is None
+
+
+def test_maybe_recycle_closes_driver_and_counts_reason():
+    stats = _Stats()
+    session = _session(RecyclePolicy(max_navigations=3, max_memory_mb=0), navigations=3, stats=stats)
+    closed = []
+    session.close = lambda: closed.append(True)
+
+    assert session.maybe_recycle()
+    assert closed == [True]
+    assert stats.counters == {'recycled': 1, 'recycled_navigations': 1}
+
+
+def test_maybe_recycle_keeps_good_driver():
+    session = _session(RecyclePolicy(max_memory_mb=0), navigations=1)
+    closed = []
+    session.close = lambda: closed.append(True)
+
+    assert not session.maybe_recycle()
+    assert not closed
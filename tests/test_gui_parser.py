@@ -0,0 +1,66 @@
+# Конструктор ParserGUI: бенчмарк GUI работает с SimpleNamespace и __init__ не вызывает
+
+import os
+import sys
+import tkinter as tk
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gui_parser
+from gui_parser import ParserGUI
+
+
+class _StubRoot:
+    """Окно без дисплея: только то, что ParserGUI.__init__ вызывает у root"""
+
+    def __init__(self):
+        self.tcl = tk.Tcl()  # интерпретатор для StringVar/IntVar без Tk
+
+    def title(self, *args):
+        pass
+
+    def geometry(self, *args):
+        pass
+
+    def minsize(self, *args):
+        pass
+
+    def protocol(self, *args):
+        pass
+
+    def after(self, *args):
+        pass
+
+    def destroy(self):
+        pass
+
+
+@pytest.fixture
+def root(monkeypatch):
+    try:
+        real = tk.Tk()
+        real.withdraw()
+    except tk.TclError:
+        # Нет дисплея: переменные Tk на голом Tcl, виджеты не строятся
+        stub = _StubRoot()
+        monkeypatch.setattr(tk, "_default_root", stub.tcl)
+        monkeypatch.setattr(ParserGUI, "create_widgets", lambda self: None)
+        monkeypatch.setattr(ParserGUI, "process_queue", lambda self: None)
+        monkeypatch.setattr(ParserGUI, "update_metrics", lambda self: None)
+        monkeypatch.setattr(ParserGUI, "log_message", lambda self, message, level="INFO": None)
+        yield stub
+        return
+    yield real
+    real.destroy()
+
+
+def test_parser_gui_constructs(root):
+    app = ParserGUI(root)
+    assert len(app.rate_samples) == 0
+    assert app.rate_samples.maxlen == 61
+    assert not app.is_parsing
+    assert len(app.results) == 0
+    assert app.workers_count.get() == 2
+    assert gui_parser.DONE_STATUSES
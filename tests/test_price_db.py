@@ -0,0 +1,103 @@
+# История цен PriceDB: запись результатов, тендер из базы, выгрузка и режим обновления
+
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "bench"))
+
+import price_db
+from synthetic_tender import make_tender
+from price_db import PriceDB, parse_age, resolve_db_path
+from results import CACHED_COLUMN, ERROR_MARK, ProductResult
+
+
+@pytest.fixture
+def db(tmp_path):
+    with PriceDB(str(tmp_path / "prices.db")) as db:
+        yield db
+
+
+def _tender(db, tmp_path, names, items: int = 3):
+    input_file = make_tender(str(tmp_path / "tender.xlsx"), items=items)
+    tender_id = db.start_tender(input_file, str(tmp_path / "out.xlsx"))
+    db.add_items(tender_id, names)
+    return tender_id
+
+
+def test_default_path_does_not_depend_on_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert resolve_db_path() == os.path.abspath(price_db.DEFAULT_DB_PATH)
+    assert not resolve_db_path().startswith(str(tmp_path))
+    assert resolve_db_path("my.db") == str(tmp_path / "my.db")
+
+
+def test_tender_results_take_last_result_per_position(db, tmp_path):
+    tender_id = _tender(db, tmp_path, ["Мышь", "Клавиатура", "Монитор"])
+    db.record(tender_id, 0, "Мышь", ProductResult.marked(ERROR_MARK))
+    db.record(tender_id, 0, "Мышь", ProductResult("1 200 ₽", "", "https://market.yandex.ru/product/1"))
+    db.record(tender_id, 2, "Монитор", ProductResult("15 000 ₽"))
+    db.finish_tender(tender_id, 3)
+
+    results = db.tender_results(tender_id)
+    assert results.names == ["Мышь", "Клавиатура", "Монитор"]
+    assert results.prices == ["1 200 ₽", "", "15 000 ₽"]
+    assert db.tender(tender_id)['items'] == 3
+    assert db.last_tender_id() == tender_id
+    assert [row['status'] for row in db.history("Мышь")] == ["success", "error"]
+
+
+def test_export_tender_writes_table_from_history(db, tmp_path):
+    tender_id = _tender(db, tmp_path, ["Мышь", "Клавиатура", "Монитор"])
+    db.record(tender_id, 1, "Клавиатура", ProductResult("2 500 ₽"))
+
+    output_file = db.export_tender(tender_id)
+    assert output_file == str(tmp_path / "out.xlsx")
+    assert os.path.exists(output_file)
+
+    with pytest.raises(ValueError):
+        db.export_tender(tender_id + 1)
+
+
+def test_reusable_returns_only_fresh_successful_prices(db, tmp_path):
+    now = time.time()
+    db.record(None, None, "Мышь", ProductResult("1 200 ₽"), scraped_at=now - 3600)
+    db.record(None, None, "Клавиатура", ProductResult("2 500 ₽"), scraped_at=now - 3 * 86400)
+    db.record(None, None, "Монитор", ProductResult("15 000 ₽"), scraped_at=now - 7200)
+    db.record(None, None, "Монитор", ProductResult.marked(ERROR_MARK), scraped_at=now - 60)
+
+    price_id, result, scraped_at = db.reusable("Мышь", max_age=86400, now=now)
+    assert result.price == "1 200 ₽"
+    assert scraped_at == pytest.approx(now - 3600)
+    assert db.reusable("Клавиатура", max_age=86400, now=now) is None
+    assert db.reusable("Монитор", max_age=86400, now=now) is None
+    assert db.reusable("Кабель", max_age=86400, now=now) is None
+
+
+def test_reused_position_keeps_history_time(db, tmp_path):
+    scraped_at = time.time() - 3600
+    db.record(None, None, "Мышь", ProductResult("1 200 ₽"), scraped_at=scraped_at)
+    price_id, _, _ = db.reusable("Мышь", max_age=86400)
+
+    tender_id = _tender(db, tmp_path, ["Мышь", "Монитор"])
+    db.reuse(tender_id, 0, "Мышь", price_id)
+    db.record(tender_id, 1, "Монитор", ProductResult("15 000 ₽"))
+
+    results = db.tender_results(tender_id)
+    assert results.prices == ["1 200 ₽", "15 000 ₽"]
+    assert results.reused() == [0]
+    assert results.cached_at[0] == pytest.approx(scraped_at)
+    assert CACHED_COLUMN in results.to_dataframe().columns
+
+
+def test_parse_age():
+    assert parse_age("90m") == 90 * 60
+    assert parse_age("36h") == 36 * 3600
+    assert parse_age("7д") == 7 * 86400
+    assert parse_age("2") == 2 * 3600
+    with pytest.raises(ValueError):
+        parse_age("неделю")
@@ -0,0 +1,102 @@
+# Результаты товаров: ProductResult и колоночное хранилище ResultStore
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results import (CACHED_COLUMN, ERROR_MARK, NO_PRICE, THROTTLE_MARK, TIMEOUT_MARK, ProductResult,
+                     ResultStore, format_age, is_priced, parse_price_to_number)
+
+
+def test_parse_price_to_number():
+    assert parse_price_to_number("1 234 ₽") == 1234.0
+    assert parse_price_to_number("1 234,50 ₽") == 1234.5
+    assert parse_price_to_number("") == NO_PRICE
+    assert parse_price_to_number("цена не указана") == NO_PRICE
+
+
+def test_product_result_numbers_and_status():
+    result = ProductResult("1 500 ₽", "1 800 ₽", "https://market.yandex.ru/product/1")
+    assert (result.price_num, result.business_num) == (1500.0, 1800.0)
+    assert result.status == "success"
+    assert not result.failed
+
+    assert ProductResult().status == "not_found"
+    assert not ProductResult()
+
+
+def test_marked_results_have_no_price():
+    for mark, status in ((ERROR_MARK, "error"), (TIMEOUT_MARK, "timeout"), (THROTTLE_MARK, "throttled")):
+        result = ProductResult.marked(mark)
+        assert result.failed
+        assert result.status == status
+        assert result.price_num == NO_PRICE
+        assert not is_priced(result.price)
+    assert is_priced("990 ₽")
+    assert not is_priced("")
+
+
+def test_store_grows_while_results_arrive():
+    store = ResultStore(["a"])
+    assert store.add("b") == 1
+    store.set(1, ProductResult("100 ₽"))
+    assert len(store) == 2
+    assert store.statuses == ["pending", "success"]
+    assert store.filled() == [1]
+    assert store.get(1).price_num == 100.0
+    assert store.get(0).price_num == NO_PRICE
+
+
+def test_store_counts_and_history_rows():
+    store = ResultStore(["a", "b", "c", "d"])
+    store.set(0, ProductResult("100 ₽", "120 ₽"))
+    store.set(1, ProductResult.marked(ERROR_MARK))
+    store.set(2, ProductResult("300 ₽"), cached_at=1700000000.0)
+
+    assert store.priced_count() == 2
+    assert store.priced_count(business=True) == 1
+    assert store.filled() == [0, 1, 2]
+    assert store.reused() == [2]
+    assert store.statuses == ["success", "error", "cached", "pending"]
+
+
+def test_to_dataframe_adds_history_column_only_when_needed():
+    store = ResultStore(["a", "b"])
+    store.set(0, ProductResult("100 ₽"))
+    df = store.to_dataframe()
+    assert list(df.columns) == ['наименование', 'цена', 'цена для юрлиц', 'ссылка']
+    assert df['цена'].tolist() == ["100 ₽", ""]
+
+    store.set(1, ProductResult("200 ₽"), cached_at=1700000000.0)
+    df = store.to_dataframe()
+    assert df[CACHED_COLUMN].tolist()[0] == ""
+    assert df[CACHED_COLUMN].tolist()[1].startswith("из истории: ")
+
+
+def test_concurrent_add_and_set():
+    store = ResultStore()
+    positions = [store.add(f"товар {i}") for i in range(100)]
+
+    def writer(offset):
+        for i in positions[offset::4]:
+            store.set(i, ProductResult(f"{i} ₽"))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(100):
+        store.add("ещё")
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 200
+    assert store.filled() == positions
+    assert store.priced_count() == 100
+
+
+def test_format_age():
+    assert format_age(30) == "1 мин"
+    assert format_age(2 * 3600) == "2 ч"
+    assert format_age(3 * 86400) == "3 дн."
@@ -0,0 +1,121 @@
+# Политика повторов RetryPolicy, отложенный повтор товаров в ScrapeEngine и доля бюджета поиска
+
+import os
+import sys
+import threading
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape_engine
+import tender_parser
+from deadline import ItemDeadline, ItemTimeout
+from retry_policy import RetryPolicy
+from results import ProductResult, ERROR_MARK, TIMEOUT_MARK
+
+
+def _policy(**kwargs) -> RetryPolicy:
+    kwargs.setdefault('base_delay', 0.0)
+    return RetryPolicy("тест", **kwargs)
+
+
+def test_attempts_are_numbered_and_last_is_marked():
+    attempts = list(_policy(max_attempts=3).attempts())
+    assert [a.number for a in attempts] == [0, 1, 2]
+    assert [a.last for a in attempts] == [False, False, True]
+    assert _policy(max_attempts=3).with_attempts(1).max_attempts == 1
+
+
+def test_attempts_stop_on_budget_deadline_and_stop():
+    assert len(list(_policy(max_attempts=5, base_delay=10.0, jitter=0, budget=5).attempts())) == 1
+    assert len(list(_policy(max_attempts=5, base_delay=10.0, jitter=0).attempts(deadline=ItemDeadline(5)))) == 1
+    assert list(_policy(max_attempts=5).attempts(should_stop=lambda: True)) == []
+
+
+def test_backoff_grows_and_is_capped():
+    policy = _policy(base_delay=1.0, max_delay=4.0, jitter=0)
+    assert [policy.backoff(n) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 4.0]
+
+
+def test_call_retries_only_retryable_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutException("медленная страница")
+        return "ok"
+
+    assert _policy(max_attempts=3).call(flaky) == "ok"
+    assert len(calls) == 3
+
+    def dead():
+        calls.append(1)
+        raise InvalidSessionIdException("сессия закрыта")
+
+    calls.clear()
+    with pytest.raises(InvalidSessionIdException):
+        _policy(max_attempts=3).call(dead)
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Движок без браузеров: get_prices подменяется, повтор отложенных - без пауз"""
+    monkeypatch.setattr(scrape_engine, "ITEM_RETRY", _policy(max_attempts=2))
+    engine = scrape_engine.ScrapeEngine(workers=2, item_budget=0)
+    yield engine
+    engine.close()
+
+
+def _run(engine, monkeypatch, answers, names):
+    calls = {}
+    lock = threading.Lock()
+
+    def fake_get_prices(product_name, *args, **kwargs):
+        with lock:
+            attempt = calls.get(product_name, 0)
+            calls[product_name] = attempt + 1
+        price = answers.get(product_name, ["1 000 ₽"])[attempt]
+        if price in (ERROR_MARK, TIMEOUT_MARK):
+            return ProductResult.marked(price)
+        return ProductResult(price, "", f"https://market.yandex.ru/{product_name}")
+
+    monkeypatch.setattr(scrape_engine, "get_prices", fake_get_prices)
+    results = {}
+    stats = engine.run(list(enumerate(names)), lambda idx, result: results.__setitem__(idx, result.price))
+    return results, stats, calls
+
+
+def test_failed_item_is_deferred_and_recovered(engine, monkeypatch):
+    results, stats, calls = _run(engine, monkeypatch, {'b': [TIMEOUT_MARK, "2 000 ₽"]}, ['a', 'b', 'c'])
+    assert results == {0: "1 000 ₽", 1: "2 000 ₽", 2: "1 000 ₽"}
+    assert calls['b'] == 2
+    assert stats['deferred'] == 1
+    assert stats['recovered'] == 1
+    assert 'timeouts' not in stats
+
+
+def test_item_failing_every_pass_keeps_its_mark(engine, monkeypatch):
+    results, stats, calls = _run(engine, monkeypatch, {'b': [ERROR_MARK, ERROR_MARK]}, ['a', 'b'])
+    assert results == {0: "1 000 ₽", 1: ERROR_MARK}
+    assert calls['b'] == 2
+    assert stats['errors'] == 1
+    assert 'recovered' not in stats
+
+
+class _MainPage:
+    current_url = "https://market.yandex.ru/"
+
+
+def test_exhausted_search_share_is_a_failed_search():
+    # Доля поиска исчерпана, а бюджет товара ещё есть - поиск неудачен, товар не в таймауте
+    assert tender_parser.smart_search_input(_MainPage(), "мышь", deadline=ItemDeadline(60, search_share=0.0)) is False
+
+
+def test_expired_item_budget_is_a_timeout():
+    deadline = ItemDeadline(0.0)
+    with pytest.raises(ItemTimeout):
+        tender_parser.smart_search_input(_MainPage(), "мышь", deadline=deadline)
@@ -0,0 +1,87 @@
+# Экстренный снимок результатов: запись, восстановление выгрузки (rebuild_pending) и путь сигнала
+
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "bench"))
+
+from synthetic_tender import make_tender
+from run_context import RunContext
+from results import ProductResult, ResultStore
+from snapshot import SNAPSHOT_SUFFIX, load_snapshot, rebuild_pending, snapshot_results, write_snapshot
+
+
+@pytest.fixture
+def context(tmp_path):
+    input_file = make_tender(str(tmp_path / "tender.xlsx"), items=4)
+    context = RunContext(input_file, str(tmp_path / "tender_out.xlsx"), name="snapshot")
+    results = ResultStore(["Мышь", "Клавиатура", "Монитор", "Кабель"])
+    results.set(0, ProductResult("1 200 ₽", "1 400 ₽", "https://market.yandex.ru/product/1"))
+    results.set(2, ProductResult("15 000 ₽", "", "https://market.yandex.ru/product/3"), cached_at=1700000000.0)
+    context.results = results
+    return context
+
+
+def test_nothing_to_write_without_results(tmp_path):
+    assert write_snapshot(RunContext(str(tmp_path / "t.xlsx"), name="empty")) is None
+
+
+def test_snapshot_keeps_only_filled_rows(context):
+    path = write_snapshot(context)
+    assert path == f"{context.output_file}{SNAPSHOT_SUFFIX}"
+
+    record = load_snapshot(path)
+    assert record['names'] == ["Мышь", "Клавиатура", "Монитор", "Кабель"]
+    assert [row[0] for row in record['rows']] == [0, 2]
+
+    restored = snapshot_results(record)
+    assert restored.prices == ["1 200 ₽", "", "15 000 ₽", ""]
+    assert restored.reused() == [2]
+    assert restored.cached_at[2] == 1700000000.0
+
+
+def test_rows_of_old_snapshots_load_without_history_time(context):
+    record = load_snapshot(write_snapshot(context))
+    record['rows'] = [row[:4] for row in record['rows']]
+    restored = snapshot_results(record)
+    assert restored.prices[2] == "15 000 ₽"
+    assert restored.reused() == []
+
+
+def test_rebuild_pending_round_trip(context, tmp_path):
+    path = write_snapshot(context)
+
+    rebuilt = rebuild_pending(str(tmp_path))
+    assert rebuilt == [os.path.abspath(context.output_file)]
+    assert os.path.exists(context.output_file)
+    assert not os.path.exists(path)
+
+
+def test_broken_snapshot_stays_for_manual_rebuild(tmp_path):
+    broken = tmp_path / f"broken{SNAPSHOT_SUFFIX}"
+    broken.write_text(json.dumps({'version': 999}), encoding='utf-8')
+    assert rebuild_pending(str(tmp_path)) == []
+    assert broken.exists()
+
+
+def test_signal_path_does_not_wait_for_context_lock(context):
+    # Обработчик сигнала мог прервать главный поток, держащий блокировку контекста
+    written = []
+
+    def handler():
+        context.signal_stop()
+        written.append(write_snapshot(context))
+
+    with context._lock:
+        thread = threading.Thread(target=handler, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive(), "путь сигнала ждёт блокировку контекста"
+    assert context.stopped
+    assert written and os.path.exists(written[0])
@@ -0,0 +1,87 @@
+# Распознавание капчи (detect_throttle_page) и регулятор нагрузки AdaptiveConcurrency
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from throttle import AdaptiveConcurrency, detect_throttle_page
+
+
+class _Driver:
+    """Отвечает на execute_script заготовленной страницей"""
+
+    def __init__(self, page=None, error=None):
+        self.page = page
+        self.error = error
+
+    def execute_script(self, script, *args):
+        if self.error is not None:
+            raise self.error
+        return self.page
+
+
+def test_detects_captcha_by_url_and_text():
+    assert detect_throttle_page(_Driver({'url': 'https://market.yandex.ru/showcaptcha?retpath=x'})) == "url:showcaptcha"
+    page = {'url': 'https://market.yandex.ru/search', 'title': 'Ой!',
+            'text': 'Нам очень жаль, но запросы с вашего устройства похожи на автоматические'}
+    assert detect_throttle_page(_Driver(page)).startswith("text:")
+
+
+def test_regular_page_and_driver_errors_are_not_throttling():
+    page = {'url': 'https://market.yandex.ru/search?text=мышь', 'title': 'Мышь', 'text': 'Мышь беспроводная'}
+    assert detect_throttle_page(_Driver(page)) is None
+    assert detect_throttle_page(_Driver(None)) is None
+    assert detect_throttle_page(_Driver(error=RuntimeError("окно закрыто"))) is None
+
+
+def test_throttle_halves_workers_and_doubles_delay():
+    controller = AdaptiveConcurrency(8, max_delay=10.0)
+    controller.on_throttle("тест")
+    assert (controller.limit, controller.delay) == (4, 2.0)
+    controller.on_throttle("тест")
+    assert (controller.limit, controller.delay) == (2, 4.0)
+    for _ in range(5):
+        controller.on_throttle("тест")
+    assert (controller.limit, controller.delay) == (1, 10.0)
+    assert controller.throttle_events == 7
+
+
+def test_clean_streak_restores_load_step_by_step():
+    controller = AdaptiveConcurrency(4, increase_after=3)
+    controller.on_throttle()
+    assert controller.limit == 2
+
+    for _ in range(2):
+        controller.on_clean()
+    assert controller.limit == 2
+    controller.on_clean()
+    assert controller.limit == 3
+
+    for _ in range(30):
+        controller.on_clean()
+    assert controller.limit == 4
+    assert controller.delay == 0.0
+
+
+def test_acquire_waits_for_free_slot_and_stops():
+    controller = AdaptiveConcurrency(1)
+    assert controller.acquire()
+    assert controller.active == 1
+
+    stop = threading.Event()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(controller.acquire(stop.is_set)))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    stop.set()
+    controller.wake()
+    waiter.join(2)
+    assert acquired == [False]
+
+    controller.release()
+    assert controller.active == 0
+    assert controller.acquire()
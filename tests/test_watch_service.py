@@ -0,0 +1,118 @@
+# Служба --watch: очередь из inbox на тёплом пуле, status.json и продолжение после перезапуска
+
+import os
+import sys
+import json
+import time
+import threading
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "bench"))
+
+import waits
+import tender_parser
+from fake_driver import FakeMarket
+from synthetic_tender import make_tender
+from watch_service import SERVICE_DIRS, WatchJob, WatchService
+
+
+@pytest.fixture
+def fake_market():
+    market = FakeMarket()
+    tender_parser.set_driver_factory(market.factory)
+    waits.set_pause_scale(0)
+    yield market
+    tender_parser.set_driver_factory(None)
+    waits.set_pause_scale(1)
+
+
+def _wait(condition, timeout: float = 60.0):
+    stop_at = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop_at, "служба не успела"
+        time.sleep(0.05)
+
+
+def _service(root, **kwargs) -> WatchService:
+    kwargs.setdefault('poll_interval', 0.05)
+    kwargs.setdefault('settle_seconds', 0.0)
+    return WatchService(str(root), workers=2, item_budget=3600, auto_save=False, **kwargs)
+
+
+def test_tenders_from_inbox_share_one_browser_pool(tmp_path, fake_market):
+    service = _service(tmp_path, db_path=str(tmp_path / "prices.db"))
+    thread = threading.Thread(target=service.run, daemon=True)
+    thread.start()
+    try:
+        _wait(lambda: service.engine is not None and service.state == "idle")
+        make_tender(str(tmp_path / "inbox" / "a.xlsx"), items=5, seed=1)
+        make_tender(str(tmp_path / "inbox" / "b.xlsx"), items=3, seed=2)
+        _wait(lambda: service.done_count == 2)
+    finally:
+        service.stop()
+        thread.join(30)
+
+    assert sorted(os.listdir(tmp_path / "outbox")) == ["a_results.xlsx", "b_results.xlsx"]
+    assert len(os.listdir(tmp_path / "done")) == 2
+    assert os.listdir(tmp_path / "queue") == []
+    assert fake_market.drivers == 2  # браузеры пула не пересоздавались между тендерами
+
+    status = json.loads((tmp_path / "status.json").read_text(encoding='utf-8'))
+    assert status['state'] == "stopped"
+    assert (status['done'], status['failed'], status['queue']) == (2, 0, [])
+    assert sorted((job['name'], job['items'], job['priced']) for job in status['recent']) == \
+        [("a.xlsx", 5, 5), ("b.xlsx", 3, 3)]
+
+
+def test_resume_keeps_queue_order_and_interrupted_job(tmp_path):
+    service = _service(tmp_path)
+    for name in SERVICE_DIRS:
+        os.makedirs(service.dirs[name])
+
+    interrupted = WatchJob("20260101-100000-001", "a.xlsx")
+    interrupted.state = "running"
+    interrupted.attempts = 1
+    interrupted.first_started_at = time.time() - 600
+    waiting = WatchJob("20260101-100000-002", "b.xlsx")
+    finished = WatchJob("20260101-090000-001", "old.xlsx")
+    finished.state = "done"
+    status = {'current': interrupted.to_dict(), 'queue': [waiting.to_dict()],
+              'recent': [finished.to_dict()], 'done': 1, 'failed': 0}
+    (tmp_path / "status.json").write_text(json.dumps(status), encoding='utf-8')
+    for job in (waiting, interrupted):
+        open(os.path.join(service.dirs['queue'], job.file_name), "w").close()
+    # Файл, положенный в queue/ вручную, тоже становится заданием
+    open(os.path.join(service.dirs['queue'], "20260101-100000-003__c.xlsx"), "w").close()
+    open(os.path.join(service.dirs['queue'], "readme.txt"), "w").close()
+
+    service._resume()
+
+    assert [job.id for job in service.jobs] == ["20260101-100000-001", "20260101-100000-002",
+                                                "20260101-100000-003"]
+    assert all(job.state == "queued" for job in service.jobs)
+    resumed = service.jobs[0]
+    assert resumed.attempts == 1
+    assert resumed.first_started_at == pytest.approx(interrupted.first_started_at, abs=1)
+    assert [job.name for job in service.recent] == ["old.xlsx"]
+    assert service.done_count == 1
+
+    report = service.status()
+    assert report['current'] is None
+    assert [job['name'] for job in report['queue']] == ["a.xlsx", "b.xlsx", "c.xlsx"]
+
+
+def test_inbox_file_waits_until_it_settles(tmp_path):
+    service = _service(tmp_path, settle_seconds=60)
+    for name in SERVICE_DIRS:
+        os.makedirs(service.dirs[name])
+    make_tender(os.path.join(service.dirs['inbox'], "a.xlsx"), items=1)
+
+    assert service.scan_inbox() == 0
+    assert service.scan_inbox() == 0
+    service.settle_seconds = 0
+    assert service.scan_inbox() == 1
+    assert os.listdir(service.dirs['inbox']) == []
+    assert [job.name for job in service.jobs] == ["a.xlsx"]
@@ -0,0 +1,141 @@
+# throttle.py - распознавание капчи/троттлинга и адаптивная регулировка нагрузки
+
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from waits import pause
+
+logger = logging.getLogger(__name__)
+
+# Признаки страницы капчи или ограничения запросов (сравниваются в нижнем регистре)
+THROTTLE_URL_MARKERS = ('showcaptcha', 'captcha', '/checkcaptcha')
+THROTTLE_TEXT_MARKERS = (
+    'smartcaptcha',
+    'подтвердите, что запросы отправляли вы',
+    'я не робот',
+    'похожи на автоматические',
+    'нам очень жаль, но запросы',
+    'suspicious traffic',
+    'too many requests',
+)
+
+
+def detect_throttle_page(driver) -> Optional[str]:
+    """Возвращает признак капчи/троттлинга на текущей странице или None (один вызов WebDriver)"""
+    script = """
+    var body = document.body ? document.body.innerText : "";
+    return {
+        url: String(location.href || ""),
+        title: String(document.title || ""),
+        text: body.slice(0, 3000)
+    };
+    """
+    try:
+        page = driver.execute_script(script) or {}
+    except Exception as e:
+        logger.debug(f"Не удалось проверить страницу на капчу: {e}")
+        return None
+
+    url = str(page.get('url', '')).lower()
+    for marker in THROTTLE_URL_MARKERS:
+        if marker in url:
+            return f"url:{marker}"
+
+    text = f"{page.get('title', '')}\n{page.get('text', '')}".lower()
+    for marker in THROTTLE_TEXT_MARKERS:
+        if marker in text:
+            return f"text:{marker}"
+    return None
+
+
+class AdaptiveConcurrency:
+    """AIMD-регулятор: при троттлинге вдвое режет число активных потоков и удваивает
+    паузу между запусками товаров, после серии чистых страниц добавляет по потоку
+    и уменьшает паузу.
+    """
+
+    def __init__(self, max_workers: int, min_workers: int = 1, base_delay: float = 0.0,
+                 max_delay: float = 30.0, increase_after: int = 5, stats=None):
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.increase_after = increase_after
+        self.stats = stats
+
+        self.limit = self.max_workers
+        self.delay = base_delay
+        self.active = 0
+        self.clean_streak = 0
+        self.throttle_events = 0
+        self._next_start = 0.0
+        self._cond = threading.Condition()
+        self._publish()
+
+    def acquire(self, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """Ждёт свободный слот и паузу между запусками; False - если пришла остановка"""
+        with self._cond:
+            while self.active >= self.limit:
+                if should_stop and should_stop():
+                    return False
+                self._cond.wait(0.5)
+            self.active += 1
+            wait = self._next_start - time.monotonic()
+            self._next_start = max(self._next_start, time.monotonic()) + self.delay
+
+        while wait > 0:
+            if should_stop and should_stop():
+                self.release()
+                return False
+            pause(min(wait, 0.5))
+            wait -= 0.5
+        return True
+
+    def wake(self):
+        """Будит потоки, ждущие слот, - чтобы они сразу увидели остановку"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            self._cond.notify_all()
+
+    def on_clean(self):
+        """Страница пришла без капчи"""
+        with self._cond:
+            self.clean_streak += 1
+            if self.clean_streak < self.increase_after:
+                return
+            self.clean_streak = 0
+            if self.limit >= self.max_workers and self.delay <= self.base_delay:
+                return
+            old_limit, old_delay = self.limit, self.delay
+            self.limit = min(self.max_workers, self.limit + 1)
+            self.delay = max(self.base_delay, self.delay / 2 if self.delay > 1 else self.base_delay)
+            self._cond.notify_all()
+            self._publish()
+        logger.info(f"🚦 Нагрузка восстанавливается: потоков {old_limit}→{self.limit}, "
+                    f"пауза {old_delay:.1f}→{self.delay:.1f} с")
+
+    def on_throttle(self, reason: str = ""):
+        """Получена капча или страница ограничения запросов"""
+        with self._cond:
+            self.clean_streak = 0
+            self.throttle_events += 1
+            old_limit, old_delay = self.limit, self.delay
+            self.limit = max(self.min_workers, self.limit // 2)
+            self.delay = min(self.max_delay, max(2.0, self.delay * 2))
+            self._next_start = time.monotonic() + self.delay
+            self._publish()
+            if self.stats is not None:
+                self.stats.incr('throttle_events')
+        logger.warning(f"🚦 Троттлинг ({reason or 'капча'}): потоков {old_limit}→{self.limit}, "
+                       f"пауза {old_delay:.1f}→{self.delay:.1f} с")
+
+    def _publish(self):
+        if self.stats is not None:
+            self.stats.set('concurrency', self.limit)
+            self.stats.set('delay', round(self.delay, 1))
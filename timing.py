@@ -0,0 +1,174 @@
+# timing.py - замеры времени по этапам обработки товара
+
+import json
+import math
+import time
+import logging
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Активный таймер; None - замеры выключены и span()/timed() ничего не делают
+TIMER: Optional["StageTimer"] = None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageTimer:
+    """Собирает длительности этапов: по товарам пишет строки JSON, по этапам - сводку"""
+
+    def __init__(self, jsonl_path: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = {}
+        self._totals: Dict[str, List[float]] = {}
+        self._file = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(stage, started, time.perf_counter() - started)
+
+    def _record(self, stage: str, started: float, duration: float):
+        self._add(stage, duration)
+
+        item = getattr(self._local, 'item', None)
+        if item is not None:
+            item['spans'].append({
+                'stage': stage,
+                'start': round(started - item['_t0'], 4),
+                'duration': round(duration, 4),
+            })
+        else:
+            self._write({'item': None, 'stage': stage, 'duration': round(duration, 4),
+                         'time': datetime.now().isoformat(timespec='seconds')})
+
+    @contextmanager
+    def item(self, index: int, name: str):
+        """Границы одного товара в текущем потоке; в record['status'] можно записать итог"""
+        record = {
+            'item': index + 1,
+            'name': name[:80],
+            'worker': threading.current_thread().name,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'status': '',
+            'spans': [],
+            '_t0': time.perf_counter(),
+        }
+        self._local.item = record
+        try:
+            yield record
+        finally:
+            self._local.item = None
+            total = time.perf_counter() - record.pop('_t0')
+            record['total'] = round(total, 4)
+            self._add('item', total)
+            self._write(record)
+
+    def _add(self, stage: str, duration: float):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(duration)
+            totals = self._totals.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+
+    def means(self) -> Dict[str, float]:
+        """Среднее по этапам без сортировки - для частого опроса (живая статистика GUI)"""
+        with self._lock:
+            return {stage: total / count for stage, (count, total) in self._totals.items() if count}
+
+    def _write(self, record: dict):
+        if self._file is None:
+            return
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/max и сумма по каждому этапу, секунды"""
+        with self._lock:
+            durations = {stage: list(values) for stage, values in self._durations.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'p50': round(percentile(values, 50), 3),
+                'p95': round(percentile(values, 95), 3),
+                'max': round(max(values), 3),
+                'total': round(sum(values), 3),
+            }
+            for stage, values in durations.items()
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        logger.info("⏱️ Время по этапам (p50 / p95 / max, сек):")
+        for stage, s in sorted(summary.items(), key=lambda kv: -kv[1]['total']):
+            logger.info(f"  {stage:<28} n={s['count']:<5} {s['p50']:>7.2f} {s['p95']:>7.2f} "
+                        f"{s['max']:>7.2f}  всего {s['total']:.1f}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def enable_timing(jsonl_path: Optional[str] = None) -> StageTimer:
+    """Включает замеры; jsonl_path - файл для строк JSON по товарам"""
+    global TIMER
+    TIMER = StageTimer(jsonl_path)
+    return TIMER
+
+
+def disable_timing():
+    global TIMER
+    if TIMER is not None:
+        TIMER.close()
+    TIMER = None
+
+
+def span(stage: str):
+    """Контекст замера этапа; при выключенных замерах - пустышка"""
+    timer = TIMER
+    if timer is None:
+        return nullcontext()
+    return timer.span(stage)
+
+
+def item_span(index: int, name: str):
+    """Контекст одного товара; при выключенных замерах отдаёт None"""
+    timer = TIMER
+    if timer is None:
+        return nullcontext()
+    return timer.item(index, name)
+
+
+def timed(stage: str):
+    """Декоратор: замеряет вызов функции как этап stage"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = TIMER
+            if timer is None:
+                return fn(*args, **kwargs)
+            with timer.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
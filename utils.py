@@ -10,6 +10,9 @@ import pickle
 from typing import Any
 import os
 import shutil
+from contextlib import closing
+from timing import timed
+from results import NoProductsError
 
 def normalize_text(text) -> str:
     """Нормализация текста для поиска"""
@@ -129,70 +132,91 @@ def debug_print_excel_rows(path: str, n: int = 50):
     except Exception as e:
         print(f"❌ Ошибка чтения Excel: {e}")
 
-def extract_products_from_excel(path: str):
-    """ОРИГИНАЛЬНАЯ функция извлечения товаров из Excel"""
-    all_sheets = pd.read_excel(path, header=None, sheet_name=None)
-    found_df = None
-    col_index = None
-    start_row = None
-    end_row = None
-    
+# Форматы, которые openpyxl читает построчно; остальные (.xls) pandas загружает целиком
+STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+
+def _iter_sheets(path: str):
+    """(имя листа, строки листа кортежами значений) - без загрузки книги в память, где это возможно"""
+    if os.path.splitext(path)[1].lower() not in STREAMING_EXTENSIONS:
+        for sheet_name, df in pd.read_excel(path, header=None, sheet_name=None).items():
+            yield sheet_name, (tuple(None if pd.isna(val) else val for val in row)
+                               for row in df.itertuples(index=False))
+        return
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            ws.reset_dimensions()  # размеры листа в файле бывают неверными - читаем все строки
+            yield ws.title, ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def iter_products_from_excel(path: str):
+    """Товары из Excel по одному ({'raw', 'name'}) - по мере чтения строк.
+
+    .xlsx/.xlsm читаются построчно (openpyxl read_only): первый товар выдаётся, когда
+    прочитаны только строки до него, и потребитель начинает обработку, не дожидаясь
+    конца файла. Товары - строки колонки "Наименование" до строки "Итого".
+    """
     print(f"📋 Анализирую Excel файл: {path}")
-    
-    for sheet_name, df in all_sheets.items():
-        print(f"   Лист: {sheet_name}")
-        for i, row in df.iterrows():
-            for j, val in row.items():
-                if isinstance(val, str) and 'наименование' in val.lower():
-                    found_df = df
-                    col_index = j
-                    start_row = i + 1
-                    print(f"   ✓ Найдена колонка 'Наименование' в столбце {j}, строка {i}")
+
+    count = 0
+    col_index = None
+    with closing(_iter_sheets(path)) as sheets:
+        for sheet_name, rows in sheets:
+            print(f"   Лист: {sheet_name}")
+            for i, row in enumerate(rows):
+                if col_index is None:
+                    for j, val in enumerate(row):
+                        if isinstance(val, str) and 'наименование' in val.lower():
+                            col_index = j
+                            print(f"   ✓ Найдена колонка 'Наименование' в столбце {j}, строка {i}")
+                            print(f"📊 Извлекаю товары со строки {i + 1}")
+                            break
+                    continue
+
+                text = row[col_index] if col_index < len(row) else None
+                if not isinstance(text, str):
+                    continue
+                if 'итого' in text.lower():
+                    print(f"   Строка 'Итого': {i}")
                     break
-            if found_df is not None:
+
+                raw = text.strip()
+                if not raw:
+                    continue
+
+                clean_name = clean_product_name_advanced(raw)
+
+                if clean_name and len(clean_name) > 3:
+                    count += 1
+                    print(f"   {count}. '{clean_name[:60]}{'...' if len(clean_name) > 60 else ''}'")
+
+                    if count <= 5:
+                        if raw != clean_name:
+                            print(f"      (исходно: '{raw[:40]}{'...' if len(raw) > 40 else ''}')")
+
+                    yield {
+                        'raw': raw,
+                        'name': clean_name
+                    }
+            else:
+                if col_index is not None:
+                    print("⚠️ Строка 'Итого' не найдена, беру до конца данных")
+
+            if col_index is not None:
                 break
-        if found_df is not None:
-            break
-    
-    if found_df is None:
-        raise ValueError("❌ Не найдена колонка 'Наименование'")
-    
-    for i, val in enumerate(found_df[col_index]):
-        if isinstance(val, str) and 'итого' in val.lower():
-            end_row = i
-            break
-    
-    if end_row is None:
-        print("⚠️ Строка 'Итого' не найдена, беру до конца данных")
-        end_row = len(found_df)
-    
-    print(f"📊 Извлекаю товары из строк {start_row} - {end_row-1}")
-    
-    items = []
-    for idx, text in enumerate(found_df.loc[start_row:end_row - 1, col_index]):
-        if not isinstance(text, str):
-            continue
-        
-        raw = text.strip()
-        if not raw:
-            continue
-        
-        clean_name = clean_product_name_advanced(raw)
-        
-        if clean_name and len(clean_name) > 3:
-            items.append({
-                'raw': raw,
-                'name': clean_name
-            })
-            print(f"   {len(items)}. '{clean_name[:60]}{'...' if len(clean_name) > 60 else ''}'")
-            
-            if len(items) <= 5:
-                if raw != clean_name:
-                    print(f"      (исходно: '{raw[:40]}{'...' if len(raw) > 40 else ''}')")
-    
-    print(f"✅ Извлечено {len(items)} товаров")
-    return pd.DataFrame(items)
 
+    if col_index is None:
+        raise NoProductsError("❌ Не найдена колонка 'Наименование'")
+
+    print(f"✅ Извлечено {count} товаров")
+
+def extract_products_from_excel(path: str):
+    """ОРИГИНАЛЬНАЯ функция извлечения товаров из Excel"""
+    return pd.DataFrame(list(iter_products_from_excel(path)))
+
+@timed('save_tender')
 def save_results_into_tender_format(original_path: str, output_path: str, df: pd.DataFrame,
                                    target_sheet_name: str = None):
     """
@@ -332,6 +356,8 @@ def save_results_into_tender_format(original_path: str, output_path: str, df: pd
             price_without_nds = parsed_item.get('цена', '')
             price_with_nds = parsed_item.get('цена для юрлиц', '')
             link = parsed_item.get('ссылка', '')
+            # Цена взята из истории (режим обновления устаревших) - пишем её дату и возраст
+            cached = parsed_item.get('из истории', '')
             
             # Автоматический расчет НДС
             if not price_with_nds and price_without_nds:
@@ -465,8 +491,12 @@ def save_results_into_tender_format(original_path: str, output_path: str, df: pd
                                       fill=fill_with_nds):
                         success_count += 1
                 
-                # Строки 4-11: пусто
-                for offset in range(4, 12):
+                # Строка 4: пометка о цене из истории, строки 5-11: пусто
+                if cached:
+                    safe_write_cell(base_row + 4, yandex_col, cached,
+                                    font=Font(italic=True, color="808080", size=9),
+                                    alignment=Alignment(horizontal='center', wrap_text=True))
+                for offset in range(5 if cached else 4, 12):
                     safe_write_cell(base_row + offset, yandex_col, "",
                                    alignment=Alignment(horizontal='center'))
                 
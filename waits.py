@@ -0,0 +1,52 @@
+# waits.py - паузы и ожидания в браузере, прерываемые остановкой прогона
+#
+# Все ожидания пути парсинга ждут на stop_event контекста текущего потока
+# (run_context.current()): остановка прогона обрывает их сразу, а не после
+# очередного time.sleep или таймаута WebDriverWait.
+
+import os
+
+import run_context
+
+# Множитель всех пауз: 1 - как есть, 0 - без пауз (фейковый драйвер в бенчмарках)
+PAUSE_SCALE = float(os.environ.get("PARSER_PAUSE_SCALE", "1"))
+
+# Шаг опроса условий в wait_for, сек - он же наибольшая задержка реакции на остановку
+POLL_INTERVAL = 0.1
+
+
+class Cancelled(Exception):
+    """Ожидание прервано остановкой прогона"""
+
+
+def set_pause_scale(scale: float):
+    """Меняет множитель пауз; 0 отключает их совсем"""
+    global PAUSE_SCALE
+    PAUSE_SCALE = max(0.0, scale)
+
+
+def pause(seconds: float) -> bool:
+    """Пауза с учётом множителя PAUSE_SCALE; True - прервана остановкой прогона"""
+    stop_event = run_context.current().stop_event
+    seconds *= PAUSE_SCALE
+    if seconds > 0:
+        return stop_event.wait(seconds)
+    return stop_event.is_set()
+
+
+def wait_for(driver, timeout: float, condition, poll: float = POLL_INTERVAL):
+    """WebDriverWait(driver, timeout).until(condition), прерываемый остановкой.
+
+    При остановке прогона бросает Cancelled не позже чем через poll секунд;
+    по таймауту, как и WebDriverWait, - TimeoutException.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    stop_event = run_context.current().stop_event
+
+    def checked(d):
+        if stop_event.is_set():
+            raise Cancelled("прогон остановлен")
+        return condition(d)
+
+    return WebDriverWait(driver, timeout, poll_frequency=poll).until(checked)
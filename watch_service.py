@@ -0,0 +1,409 @@
+# watch_service.py - служба: тендеры из папки входящих на постоянно запущенных браузерах
+#
+# Каталог службы:
+#   inbox/   - сюда кладут тендеры (xlsx/xlsm)
+#   queue/   - принятые задания: файл переносится из inbox, когда перестал меняться
+#   work/    - выгрузка задания во время парсинга (автосохранения, снимок при сигнале)
+#   outbox/  - готовые выгрузки <тендер>_results.xlsx
+#   done/, failed/ - исходные файлы выполненных и упавших заданий
+#   status.json - состояние службы, текущее задание с прогрессом, очередь, последние задания
+#
+# Браузеры и авторизация запускаются один раз при старте (ScrapeEngine с keep_sessions)
+# и ждут следующих тендеров; каждый тендер разбирает parse_tender_excel на этих браузерах.
+# Очередь - это каталог queue/: после перезапуска (в том числе по сигналу) задания из
+# него продолжаются по порядку. Прерванное задание при истории цен берёт из базы цены,
+# полученные до перезапуска, и парсит только остальные; без базы тендер парсится заново.
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from run_context import RunContext
+from results import ProductResult, NO_PRICE
+
+logger = logging.getLogger(__name__)
+
+SERVICE_DIRS = ('inbox', 'queue', 'work', 'outbox', 'done', 'failed')
+STATUS_FILE = "status.json"
+# Сколько завершённых заданий хранить в status.json
+RECENT_JOBS = 50
+# Разделитель id задания и имени файла в queue/, done/ и failed/
+JOB_SEPARATOR = "__"
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).isoformat(timespec='seconds') if ts else None
+
+
+def _epoch(text: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(text).timestamp() if text else None
+
+
+class WatchJob:
+    """Задание службы: тендер из очереди и его итог"""
+
+    TIMES = ('queued_at', 'started_at', 'first_started_at', 'finished_at')
+
+    def __init__(self, job_id: str, name: str):
+        self.id = job_id
+        self.name = name
+        self.state = "queued"
+        self.queued_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        # Первый запуск - от него считается, какие цены уже получены до перезапуска
+        self.first_started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.attempts = 0
+        self.output_file: Optional[str] = None
+        self.items: Optional[int] = None
+        self.priced: Optional[int] = None
+        self.reused: Optional[int] = None
+        self.tender_id: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def file_name(self) -> str:
+        return f"{self.id}{JOB_SEPARATOR}{self.name}"
+
+    @staticmethod
+    def parse_file_name(file_name: str) -> Optional[Tuple[str, str]]:
+        """(id, исходное имя) из имени файла задания или None для чужих файлов"""
+        job_id, sep, name = file_name.partition(JOB_SEPARATOR)
+        if not sep or not name or name.startswith("~$"):
+            return None
+        return job_id, name
+
+    def to_dict(self) -> dict:
+        data = {key: value for key, value in vars(self).items() if key not in self.TIMES}
+        data.update({key: _iso(getattr(self, key)) for key in self.TIMES})
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WatchJob":
+        job = cls(data['id'], data['name'])
+        for key, value in data.items():
+            if key in cls.TIMES:
+                value = _epoch(value)
+            if hasattr(job, key) and key not in ('id', 'name'):
+                setattr(job, key, value)
+        return job
+
+
+class WatchService:
+    """Очередь тендеров из inbox на тёплом пуле браузеров.
+
+    run() работает до остановки контекста (stop() или сигнал); поток "watch-status"
+    принимает новые файлы из inbox и раз в poll_interval переписывает status.json.
+    Файл принимается, когда его размер и время изменения не менялись settle_seconds.
+    """
+
+    def __init__(self, root: str, headless: bool = True, workers: int = 1,
+                 driver_path: Optional[str] = None, use_business_auth: bool = False,
+                 recycle_policy=None, item_budget: float = 90.0, auto_save: bool = True,
+                 db_path: Optional[str] = None, refresh_older_than: Optional[float] = None,
+                 poll_interval: float = 2.0, settle_seconds: float = 2.0,
+                 context: Optional[RunContext] = None):
+        if refresh_older_than is not None and not db_path:
+            raise ValueError("Режим обновления работает только с базой истории цен (db_path)")
+        self.root = os.path.abspath(root)
+        self.dirs = {name: os.path.join(self.root, name) for name in SERVICE_DIRS}
+        self.status_path = os.path.join(self.root, STATUS_FILE)
+        self.headless = headless
+        self.workers = workers
+        self.driver_path = driver_path
+        self.use_business_auth = use_business_auth
+        self.recycle_policy = recycle_policy
+        self.item_budget = item_budget
+        self.auto_save = auto_save
+        self.db_path = db_path
+        self.refresh_older_than = refresh_older_than
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.context = context or RunContext(name="watch")
+        self.engine = None
+        self.state = "starting"
+        self.started_at = time.time()
+        self.jobs: List[WatchJob] = []
+        self.recent: List[WatchJob] = []
+        self.current: Optional[WatchJob] = None
+        self.done_count = 0
+        self.failed_count = 0
+        self._lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # Файл inbox -> ((размер, время изменения), когда такими их увидели впервые)
+        self._seen: Dict[str, Tuple[Tuple[int, float], float]] = {}
+        self._seq = 0
+
+    # --- основной цикл ---
+
+    def run(self):
+        from scrape_engine import ScrapeEngine
+        from tender_parser import setup_signal_handlers, prepare_browsers, cleanup_profiles
+
+        setup_signal_handlers()
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+        self._resume()
+
+        self.engine = ScrapeEngine(headless=self.headless, driver_path=self.driver_path,
+                                   use_auth=self.use_business_auth, workers=self.workers,
+                                   policy=self.recycle_policy, item_budget=self.item_budget,
+                                   context=self.context, keep_sessions=True)
+        self.engine.prestart(prepare=prepare_browsers)
+        unsubscribe = self.context.on_stop(self._wakeup.set)
+        watcher = threading.Thread(target=self._watch_loop, name="watch-status", daemon=True)
+        watcher.start()
+        logger.info(f"👀 Служба запущена: {self.dirs['inbox']} → {self.dirs['outbox']}, "
+                    f"потоков {self.workers}, в очереди {len(self.jobs)}")
+        try:
+            while not self.context.stopped:
+                with self._lock:
+                    job = self.jobs[0] if self.jobs else None
+                if job is None:
+                    self.state = "idle"
+                    # Пока очереди нет, устаревшие браузеры пересоздаются заранее
+                    self.engine.rewarm()
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._process(job)
+        finally:
+            unsubscribe()
+            self.state = "stopped"
+            self.engine.close()
+            cleanup_profiles(self.context)
+            self.write_status()
+            logger.info(f"👀 Служба остановлена: выполнено {self.done_count}, с ошибкой {self.failed_count}, "
+                        f"в очереди {len(self.jobs)}")
+
+    def stop(self):
+        self.context.stop()
+
+    def _watch_loop(self):
+        while not self.context.stopped:
+            try:
+                self.scan_inbox()
+                self.write_status()
+            except Exception as e:
+                logger.warning(f"Служба: ошибка проверки inbox: {e}")
+            self.context.stop_event.wait(self.poll_interval)
+
+    # --- очередь ---
+
+    def scan_inbox(self) -> int:
+        """Переносит в очередь файлы inbox, которые перестали меняться; число новых заданий"""
+        from batch import find_tender_files
+
+        now = time.time()
+        added = 0
+        present = set()
+        for path in find_tender_files(self.dirs['inbox']):
+            present.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            seen = self._seen.get(path)
+            if seen is None or seen[0] != signature:
+                self._seen[path] = (signature, now)
+            elif now - seen[1] >= self.settle_seconds and self._enqueue(path):
+                added += 1
+        for path in list(self._seen):
+            if path not in present:
+                del self._seen[path]
+        return added
+
+    def _enqueue(self, path: str) -> bool:
+        name = os.path.basename(path)
+        with self._lock:
+            while True:
+                self._seq += 1
+                job = WatchJob(f"{datetime.now():%Y%m%d-%H%M%S}-{self._seq:03d}", name)
+                target = os.path.join(self.dirs['queue'], job.file_name)
+                if not os.path.exists(target):
+                    break
+        try:
+            # На Windows перенос не удастся, пока файл ещё открыт копированием - повторим позже
+            os.replace(path, target)
+        except OSError as e:
+            logger.debug(f"Служба: {name} пока не перенести в очередь: {e}")
+            return False
+        self._seen.pop(path, None)
+        job.queued_at = time.time()
+        with self._lock:
+            self.jobs.append(job)
+            queued = len(self.jobs)
+        logger.info(f"📥 В очереди: {name} (задание {job.id}, заданий в очереди {queued})")
+        self._wakeup.set()
+        return True
+
+    def _resume(self):
+        """Задания, оставшиеся в queue/ после прошлого запуска, - снова в очередь по порядку"""
+        status = self._load_status()
+        known = {}
+        for data in status.get('queue', []) + [status.get('current') or {}]:
+            if data.get('id'):
+                known[data['id']] = WatchJob.from_dict(data)
+        # В status.json последние задания - новые первыми
+        self.recent = [WatchJob.from_dict(data) for data in reversed(status.get('recent', []))][-RECENT_JOBS:]
+        self.done_count = status.get('done', 0)
+        self.failed_count = status.get('failed', 0)
+
+        for file_name in sorted(os.listdir(self.dirs['queue'])):
+            parsed = WatchJob.parse_file_name(file_name)
+            if parsed is None:
+                continue
+            job_id, name = parsed
+            job = known.get(job_id)
+            if job is None:
+                job = WatchJob(job_id, name)
+                job.queued_at = os.path.getmtime(os.path.join(self.dirs['queue'], file_name))
+            elif job.state == "running":
+                logger.info(f"🔁 Продолжаю прерванное задание {job.id}: {job.name} (попытка {job.attempts + 1})")
+            job.state = "queued"
+            self.jobs.append(job)
+        if self.jobs:
+            logger.info(f"📋 Очередь после перезапуска: {len(self.jobs)} заданий")
+
+    # --- задание ---
+
+    def _process(self, job: WatchJob):
+        from batch import output_path_for, OUTPUT_SUFFIX
+        from snapshot import SNAPSHOT_SUFFIX
+        from tender_parser import parse_tender_excel
+
+        input_file = os.path.join(self.dirs['queue'], job.file_name)
+        work_file = os.path.join(self.dirs['work'], f"{job.id}{OUTPUT_SUFFIX}.xlsx")
+        # Выгрузка и снимок прерванной попытки устарели - задание идёт заново
+        for stale in (work_file, f"{work_file}{SNAPSHOT_SUFFIX}"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        now = time.time()
+        with self._lock:
+            job.state = "running"
+            job.started_at = now
+            job.first_started_at = job.first_started_at or now
+            job.attempts += 1
+            job.error = None
+            self.current = job
+            self.state = "working"
+        self.write_status()
+
+        refresh_older_than = self.refresh_older_than
+        if self.db_path and job.attempts > 1:
+            # Цены, полученные до перезапуска, уже в истории - парсятся только остальные
+            refresh_older_than = max(refresh_older_than or 0.0, now - job.first_started_at)
+        logger.info(f"▶️ Задание {job.id}: {job.name}" + (f" (попытка {job.attempts})" if job.attempts > 1 else ""))
+
+        try:
+            df = parse_tender_excel(input_file, work_file, auto_save=self.auto_save,
+                                    db_path=self.db_path, refresh_older_than=refresh_older_than,
+                                    engine=self.engine)
+        except Exception as e:
+            if self.context.stopped:
+                self._requeue(job)
+            else:
+                self._finish(job, 'failed', error=str(e))
+            return
+        if self.context.stopped:
+            self._requeue(job)
+            return
+
+        job.output_file = output_path_for(job.name, self.dirs['outbox'])
+        try:
+            os.replace(work_file, job.output_file)
+        except OSError as e:
+            self._finish(job, 'failed', error=f"не удалось записать {job.output_file}: {e}")
+            return
+        job.items = len(df)
+        job.priced = sum(1 for price in df['цена'] if ProductResult(price).price_num != NO_PRICE)
+        job.reused = df.attrs.get('reused', 0)
+        job.tender_id = df.attrs.get('tender_id')
+        self._finish(job, 'done')
+
+    def _requeue(self, job: WatchJob):
+        """Остановка посреди задания: оно остаётся в queue/ и продолжится после перезапуска"""
+        with self._lock:
+            job.state = "queued"
+            self.current = None
+        logger.info(f"⏸️ Задание {job.id} остановлено, продолжится после перезапуска службы")
+
+    def _finish(self, job: WatchJob, state: str, error: Optional[str] = None):
+        source = os.path.join(self.dirs['queue'], job.file_name)
+        try:
+            os.replace(source, os.path.join(self.dirs[state], job.file_name))
+        except OSError as e:
+            logger.warning(f"Служба: не удалось перенести {source}: {e}")
+        with self._lock:
+            job.state = state
+            job.error = error
+            job.finished_at = time.time()
+            if job in self.jobs:
+                self.jobs.remove(job)
+            self.recent = (self.recent + [job])[-RECENT_JOBS:]
+            self.current = None
+            if state == 'done':
+                self.done_count += 1
+            else:
+                self.failed_count += 1
+        if state == 'done':
+            logger.info(f"📤 Задание {job.id} готово за {job.finished_at - job.started_at:.0f} с: "
+                        f"{job.priced}/{job.items} цен (из истории {job.reused}) → {job.output_file}")
+        else:
+            logger.error(f"❌ Задание {job.id} ({job.name}) не выполнено: {error}")
+        self.write_status()
+
+    # --- status.json ---
+
+    def status(self) -> dict:
+        with self._lock:
+            current = self.current.to_dict() if self.current is not None else None
+            queue = [job.to_dict() for job in self.jobs if job is not self.current]
+            recent = [job.to_dict() for job in reversed(self.recent)]
+        results = self.context.results
+        if current is not None and results is not None:
+            current['progress'] = {'items': len(results), 'done': len(results.filled()),
+                                   'priced': results.priced_count()}
+        return {
+            'pid': os.getpid(),
+            'state': self.state,
+            'started_at': _iso(self.started_at),
+            'updated_at': _iso(time.time()),
+            'inbox': self.dirs['inbox'],
+            'outbox': self.dirs['outbox'],
+            'pool': {'workers': self.workers, 'auth': self.use_business_auth, 'db': self.db_path},
+            'done': self.done_count,
+            'failed': self.failed_count,
+            'current': current,
+            'queue': queue,
+            'recent': recent,
+        }
+
+    def write_status(self):
+        """Атомарная запись status.json (читатель не увидит недописанный файл)"""
+        status = self.status()
+        tmp_path = f"{self.status_path}.tmp"
+        with self._status_lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(status, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.status_path)
+            except OSError as e:
+                logger.debug(f"Служба: не удалось записать {self.status_path}: {e}")
+
+    def _load_status(self) -> dict:
+        if not os.path.exists(self.status_path):
+            return {}
+        try:
+            with open(self.status_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Служба: {self.status_path} не прочитан, очередь восстановлю по queue/: {e}")
+            return {}